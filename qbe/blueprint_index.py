@@ -0,0 +1,46 @@
+"""Inverted index of the parts and tags of all objects, for 'haspart:' and 'hastag:' searches."""
+from typing import Dict, List, Set
+
+
+class BlueprintIndex:
+    """The names of the objects that have each part and tag, whether specified in their blueprint
+    or inherited, and each attribute of a part or tag.
+
+    Keys are written as in the virtual attributes of QudObject, without the 'part_' or 'tag_'
+    prefix: 'Render' for objects with a Render part, and 'Render_Tile' for those whose Render part
+    has a Tile attribute."""
+
+    def __init__(self):
+        self.parts: Dict[str, Set[str]] = {}
+        self.tags: Dict[str, Set[str]] = {}
+        # the names of the wiki-eligible objects, which are the only ones searches can match
+        self.wiki_eligible: Set[str] = set()
+
+    def add(self, qud_object):
+        """Add the parts and tags of an object (once its inheritance has been resolved)."""
+        name = qud_object.name
+        for element_tag, index in ('part', self.parts), ('tag', self.tags):
+            for element_name, attributes in qud_object.all_attributes.get(element_tag, {}).items():
+                index.setdefault(element_name, set()).add(name)
+                for attribute in attributes:
+                    index.setdefault(f'{element_name}_{attribute}', set()).add(name)
+        if qud_object.is_wiki_eligible():
+            self.wiki_eligible.add(name)
+
+    def objects_with_part(self, part: str) -> Set[str]:
+        """Return the names of the wiki-eligible objects that have a part, or a part attribute
+        such as 'Render_Tile' (case sensitive)."""
+        return self.parts.get(part, set()) & self.wiki_eligible
+
+    def objects_with_tag(self, tag: str) -> Set[str]:
+        """Return the names of the wiki-eligible objects that have a tag, or a tag attribute (case
+        sensitive)."""
+        return self.tags.get(tag, set()) & self.wiki_eligible
+
+    def part_names(self) -> List[str]:
+        """Return all part names and part attributes, in alphabetical order."""
+        return sorted(self.parts)
+
+    def tag_names(self) -> List[str]:
+        """Return all tag names and tag attributes, in alphabetical order."""
+        return sorted(self.tags)
@@ -0,0 +1,116 @@
+"""Diffs of generated templates against the wiki, and HTML reports of them for many objects."""
+import difflib
+import html
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Optional
+
+from qbe.wikitext import TemplateRegion, find_template, normalize_template
+
+DIFF_REPORT_FILE = 'template_diffs.html'
+# the possible results of diff_template(), in the order they are listed in reports
+STATUSES = {
+    'changed': 'Template changed',
+    'version': 'Only game version changed',
+    'unrecognized': 'Wiki template not recognized',
+    'missing': 'No article',
+    'same': 'Up to date',
+}
+
+
+class TemplateDiff(NamedTuple):
+    """The differences between the template generated for an object and its wiki article."""
+    object_name: str
+    article_name: str
+    # one of the keys of STATUSES
+    status: str
+    # the unified diff from the wiki template to ours, for 'changed' and 'version'
+    lines: List[str]
+
+
+def diff_template(object_name: str, article_name: str, template: str,
+                  wiki_text: Optional[str], wiki_region: Optional[TemplateRegion] = None
+                  ) -> TemplateDiff:
+    """Compare the template generated for an object against the template in its article.
+
+    Parameters:
+        object_name: the ID of the object
+        article_name: the title of the object's wiki article
+        template: the template generated for the object
+        wiki_text: the wikitext of the article, or None if there is no article
+        wiki_region: the article's template region, if already found (see wikitext.find_template)
+    """
+    if wiki_text is None:
+        return TemplateDiff(object_name, article_name, 'missing', [])
+    template = template.strip()
+    if template in wiki_text:
+        return TemplateDiff(object_name, article_name, 'same', [])
+    region = find_template(template)
+    if wiki_region is None:
+        wiki_region = find_template(wiki_text)
+    if region is None or wiki_region is None:
+        return TemplateDiff(object_name, article_name, 'unrecognized', [])
+    ours = region.template(template)
+    theirs = wiki_region.template(wiki_text)
+    lines = list(difflib.unified_diff(theirs.splitlines(), ours.splitlines(), 'wiki', 'QBE',
+                                      lineterm=''))
+    status = 'version' if normalize_template(ours) in normalize_template(theirs) else 'changed'
+    return TemplateDiff(object_name, article_name, status, lines)
+
+
+def render_report(diffs: Iterable[TemplateDiff], gamever: str) -> str:
+    """Return a standalone HTML page listing the given diffs, grouped by status, with summary
+    counts and links to each object's diff."""
+    diffs = list(diffs)
+    counts = Counter(diff.status for diff in diffs)
+    parts = [f'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+             f'<title>Template diffs for game version {html.escape(gamever)}</title>'
+             f'<style>{_STYLE}</style></head><body>',
+             f'<h1>Template diffs for game version {html.escape(gamever)}</h1>',
+             '<table class="summary">']
+    for status, label in STATUSES.items():
+        parts.append(f'<tr><td><a href="#{status}">{label}</a></td>'
+                     f'<td>{counts[status]}</td></tr>')
+    parts.append(f'<tr><td>Total</td><td>{len(diffs)}</td></tr></table>')
+    for status, label in STATUSES.items():
+        group = [diff for diff in diffs if diff.status == status]
+        parts.append(f'<h2 id="{status}">{label} ({len(group)})</h2>')
+        if not group:
+            continue
+        if not any(diff.lines for diff in group):
+            parts.append('<ul>' + ''.join(f'<li>{_describe(diff)}</li>' for diff in group)
+                         + '</ul>')
+            continue
+        # a list of links, so that long reports can be navigated
+        parts.append('<ul class="index">' + ''.join(
+            f'<li><a href="#{_anchor(diff)}">{_describe(diff)}</a></li>' for diff in group)
+            + '</ul>')
+        for diff in group:
+            parts.append(f'<h3 id="{_anchor(diff)}">{_describe(diff)}</h3><pre>')
+            for line in diff.lines:
+                css = {'+': 'add', '-': 'del', '@': 'hunk'}.get(line[:1])
+                if line.startswith(('+++', '---')):
+                    css = 'file'
+                line = html.escape(line)
+                parts.append(f'<span class="{css}">{line}</span>\n' if css else line + '\n')
+            parts.append('</pre>')
+    parts.append('</body></html>\n')
+    return ''.join(parts)
+
+
+def _describe(diff: TemplateDiff) -> str:
+    return f'{html.escape(diff.article_name)} <small>({html.escape(diff.object_name)})</small>'
+
+
+def _anchor(diff: TemplateDiff) -> str:
+    return 'object-' + html.escape(diff.object_name, quote=True).replace(' ', '_')
+
+
+_STYLE = '''
+body { font-family: sans-serif; margin: 2em; }
+table.summary td { padding: 0.1em 1em 0.1em 0; }
+pre { background: #f6f8fa; padding: 0.5em; overflow-x: auto; }
+.add { color: #116329; background: #dafbe1; }
+.del { color: #82071e; background: #ffebe9; }
+.hunk { color: #0550ae; }
+.file { color: #57606a; }
+'''
@@ -0,0 +1,30 @@
+"""Rendered images kept together with their encoded file data, so each is only encoded once."""
+from io import BytesIO
+from typing import NamedTuple
+
+from hagadias.tileanimator import GifHelper
+from PIL import Image
+
+
+class EncodedImage(NamedTuple):
+    """A rendered PNG or GIF image, and the file data it was encoded to.
+
+    The same data is hashed to compare against the wiki, shown in the image comparison dialog and
+    uploaded, without being copied: it is a memoryview of the buffer the image was encoded into."""
+    image: Image.Image
+    data: memoryview
+
+    @classmethod
+    def png(cls, image: Image.Image) -> 'EncodedImage':
+        """Encode a rendered tile (such as QudTile.get_big_image()) as a PNG."""
+        buffer = BytesIO()
+        image.save(buffer, format='png')
+        return cls(image, buffer.getbuffer())
+
+    @classmethod
+    def gif(cls, gif: Image.Image) -> 'EncodedImage':
+        """Encode a rendered animation (such as QudObject.gif_image()) as a GIF, keeping all of
+        its frames and their durations."""
+        buffer = BytesIO()
+        GifHelper.save(gif, buffer)
+        return cls(gif, buffer.getbuffer())
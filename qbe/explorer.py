@@ -1,33 +1,44 @@
 """Main file for Qud Blueprint Explorer."""
 import logging
-import difflib
+import hashlib
+import html
 import importlib.resources
 import io
 import os
-import re
 from pprint import pformat
-from typing import Union, Callable
+from typing import Union, Callable, List, Optional
 
 import yaml
 from PIL import Image, ImageQt
-from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QModelIndex, Qt, QThread, \
+    QStringListModel, QThreadPool, QUrl, Signal
 from PySide6.QtGui import QIcon, QImage, QMovie, QPixmap, QStandardItem, QStandardItemModel, \
-    QColor, QFont
+    QColor, QDesktopServices, QFont
 from PySide6.QtWidgets import QApplication, QFileDialog, QHeaderView, QMainWindow, QMessageBox, \
-    QDialog
+    QCompleter, QDialog, QLabel, QProgressBar, QPushButton
 from hagadias.gameroot import GameRoot
-from hagadias.qudobject import QudObject
-from hagadias.tileanimator import GifHelper
+from mwclient.image import Image as WikiImage
 
+from qbe.blueprint_index import BlueprintIndex
 from qbe.config import config
+from qbe.encoded_image import EncodedImage
+from qbe.diff_report import DIFF_REPORT_FILE, TemplateDiff, diff_template, render_report
+from qbe.field_index import FieldIndex
 from qbe.helpers import load_fonts_from_dir
+from qbe.image_match import gifs_match, images_match
+from qbe.index_builder import IndexBuilder
+from qbe.job_journal import JobJournal, JournalEntry
+from qbe.jobs import Job
+from qbe.object_model import OBJECT_ROLE, QudObjectModel
 from qbe.qud_explorer_image_modal import Ui_WikiImageUpload
 from qbe.qud_explorer_window import Ui_MainWindow
 from qbe.qudobject_wiki import QudObjectWiki
+from qbe.render_cache import RenderCache
 from qbe.search_filter import QudObjFilterModel, QudPopFilterModel, QudSearchBehaviorHandler
 from qbe.tree_view import QudObjTreeView, QudPopTreeView
-from qbe.wiki_config import site
-from qbe.wiki_page import TEMPLATE_RE, TEMPLATE_RE_OLD, WikiPage, upload_wiki_image
+from qbe.wiki_config import wiki_config
+from qbe.wiki_page import WikiPage, article_name, fetch_images, fetch_pages, upload_wiki_image
+from qbe.wikitext import normalize_template
 
 log = logging.getLogger(__name__)
 OBJ_HEADER_LABELS = [
@@ -43,11 +54,14 @@ OBJ_HEADER_LABELS = [
     'Namespace'
 ]
 POP_HEADER_LABELS = ['Name', 'Type']
+UPLOAD_WORKERS = wiki_config.get('upload_workers', 4)
 OBJ_TAB_INDEX = 0
 POP_TAB_INDEX = 1
 
-blank_image = Image.new('RGBA', (16, 24), color=(0, 0, 0, 0))
-blank_qtimage = ImageQt.ImageQt(blank_image)
+# remembers which objects each scan or upload has finished, so interrupted jobs can be resumed
+job_journal = JobJournal()
+# renders of big tiles and animations, kept across launches
+render_cache = RenderCache()
 
 
 def set_gamedir():
@@ -70,6 +84,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     The UI layout is derived from qud_explorer_window.py, which is compiled from
     qud_explorer_window.ui (designed graphically in Qt Designer) by the UIC executable that comes
     with PySide6."""
+    # emitted by background jobs to update a status column cell from the GUI thread
+    icon_changed = Signal(object, str)
+    # emitted by background jobs to show the image comparison dialog on the GUI thread
+    image_prompt = Signal(object)
 
     def __init__(self, app: QApplication, *args, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
@@ -82,16 +100,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         icon = QIcon("qbe/icon.png")
         self.setWindowIcon(icon)
         self.obj_view_type = 'wiki'
-        self.qud_object_model = QStandardItemModel()
+        self.qud_object_model = QudObjectModel(OBJ_HEADER_LABELS)
         self.qud_object_proxyfilter = QudObjFilterModel()
         self.qud_object_proxyfilter.setSourceModel(self.qud_object_model)
-        self.objects_to_expand = []  # filled out during recursion of the Qud object tree
         self.objTreeView = QudObjTreeView(
             self.tree_selection_handler, OBJ_HEADER_LABELS, self.tree_target_widget)
         self.verticalLayout_3.addWidget(self.objTreeView)
         self.objTreeSearchHandler = QudSearchBehaviorHandler(
             self.search_line_edit, self.qud_object_proxyfilter, self.objTreeView)
         self.search_line_edit.textChanged.connect(self.objTreeSearchHandler.search_changed)
+        self.search_completer = QCompleter(self.search_line_edit)
+        self.search_completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.search_line_edit.setCompleter(self.search_completer)
         self.search_line_edit.returnPressed.connect(self.objTreeSearchHandler.search_changed_forced)
 
         self.qud_pop_model = QStandardItemModel()
@@ -106,6 +126,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.pop_search_line_edit.returnPressed.connect(
             self.popTreeSearchHandler.search_changed_forced)
         self._prompt_for_image_changes = True
+        self.icon_changed.connect(self.set_icon)
+        self.image_prompt.connect(self.prompt_image_replacement, Qt.BlockingQueuedConnection)
 
         # Set up menus
         # File menu:
@@ -119,6 +141,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Wiki menu:
         self.actionScan_wiki.triggered.connect(self.wiki_check_selected)
         self.actionDiff_template_against_wiki.triggered.connect(self.show_simple_diff)
+        self.actionDiff_templates_for_selected_objects.triggered.connect(self.diff_selected)
         self.actionUpload_templates.triggered.connect(self.upload_selected_templates)
         self.actionUpload_tiles.triggered.connect(self.upload_selected_tiles)
         self.actionUpload_extra_image_s_for_selected_objects.triggered\
@@ -134,6 +157,28 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.objTreeView.context_action_upload_tile.triggered.connect(self.upload_selected_tiles)
         self.objTreeView.context_action_upload_extra.triggered.connect(self.upload_extra_images)
         self.objTreeView.context_action_diff.triggered.connect(self.show_simple_diff)
+        self.objTreeView.context_action_diff_report.triggered.connect(self.diff_selected)
+        # Background jobs: status bar widgets and the actions disabled while a job runs
+        self.current_job: Union[Job, None] = None
+        self.job_label = QLabel()
+        self.job_progress_bar = QProgressBar()
+        self.job_progress_bar.setMaximumWidth(200)
+        self.job_cancel_button = QPushButton('Cancel')
+        self.job_cancel_button.clicked.connect(self.cancel_job)
+        for widget in self.job_label, self.job_progress_bar, self.job_cancel_button:
+            self.statusbar.addPermanentWidget(widget)
+            widget.hide()
+        self.job_actions = [self.actionScan_wiki,
+                            self.actionDiff_templates_for_selected_objects,
+                            self.actionUpload_templates,
+                            self.actionUpload_tiles,
+                            self.actionUpload_extra_image_s_for_selected_objects,
+                            self.actionSuppress_image_comparison_popups,
+                            self.objTreeView.context_action_scan,
+                            self.objTreeView.context_action_diff_report,
+                            self.objTreeView.context_action_upload_page,
+                            self.objTreeView.context_action_upload_tile,
+                            self.objTreeView.context_action_upload_extra]
         self.gameroot: Union[GameRoot, None] = None
         while self.gameroot is None:
             try:
@@ -143,8 +188,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         title_string = f'Qud Blueprint Explorer: CoQ version {self.gameroot.gamever} at ' \
                        f'{self.gameroot.pathstr}'
         self.setWindowTitle(title_string)
-        self.qud_object_root, qindex_throwaway = self.gameroot.get_object_tree(QudObjectWiki)
+        self.qud_object_root, self.qindex = self.gameroot.get_object_tree(QudObjectWiki)
         self.init_obj_tree_model()
+        self.index_builders: List[IndexBuilder] = []
+        self.build_index(BlueprintIndex(), self.blueprint_index_built)
+        self.build_field_index()
         self.tabWidget.currentChanged.connect(self.tab_changed)
         self.population_data = None
 
@@ -193,96 +241,61 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def init_obj_tree_model(self):
         """Initialize the Qud object model tree by setting up the root object."""
         self.objTreeView.setModel(self.qud_object_proxyfilter)
-        self.qud_object_model.setHorizontalHeaderLabels(OBJ_HEADER_LABELS)
         header = self.objTreeView.header()
         header.setSectionResizeMode(QHeaderView.ResizeToContents)
         header.setStretchLastSection(False)
 
-        # We only need to add Object to the model, since all other Objects are loaded as children:
-        self.qud_object_model.appendRow(self.init_qud_object_children(self.qud_object_root))
+        # the model reads the rows of all other Objects from their parents as they are shown
+        self.qud_object_model.set_root(self.qud_object_root)
         self.expand_default()
 
-    def init_qud_object_children(self, qud_object: QudObject):
-        """Recursive function to translate hierarchy from the Qud object AnyTree model to the
-        Qt StandardItemModel model.
-
-        Returns a list, which will be the list of column entries for the row."""
-        row = []
-        # first column: displays the object ID and holds a reference to the actual qud_object
-        item = QStandardItem(qud_object.name)
-        item.setData(qud_object)
-        row.append(item)
-        # second column: the ingame display name
-        display_name = QStandardItem(qud_object.displayname)
-        display_name.setSizeHint(QSize(250, 25))
-        if qud_object.tile is None:
-            display_name.setIcon(QIcon(QPixmap.fromImage(blank_qtimage)))
-        elif qud_object.tile.hasproblems:
-            display_name.setIcon(QIcon(QPixmap.fromImage(blank_qtimage)))
-        else:
-            display_name.setIcon(QIcon(QPixmap.fromImage(ImageQt.ImageQt(qud_object.tile.image))))
-        row.append(display_name)
-        # third column: what the name of the wiki article will be (usually same as second column)
-        override_name = QStandardItem('')
-        if qud_object.name in config['Wiki']['Article overrides']:
-            override_name.setText(config['Wiki']['Article overrides'][qud_object.name])
-        row.append(override_name)
-        # fourth column: indicator for whether the wiki article exists (after scanning)
-        wiki_article_exists = QStandardItem('')
-        wiki_article_exists.setTextAlignment(Qt.AlignCenter)
-        row.append(wiki_article_exists)
-        # fifth column: indicator for whether the wiki article matches our generated template
-        wiki_article_matches = QStandardItem('')
-        wiki_article_matches.setTextAlignment(Qt.AlignCenter)
-        row.append(wiki_article_matches)
-        # sixth column: indicator for whether the tile image exists on the wiki (after scanning)
-        image_exists = QStandardItem('')
-        image_exists.setTextAlignment(Qt.AlignCenter)
-        row.append(image_exists)
-        # seventh column: indicator for whether the tile image on the wiki matches generated tile
-        image_matches = QStandardItem('')
-        image_matches.setTextAlignment(Qt.AlignCenter)
-        row.append(image_matches)
-        # eighth column: indicator for whether the GIF or other additional images exist on the wiki
-        # (after scanning)
-        extra_image_exists = QStandardItem('')
-        extra_image_exists.setTextAlignment(Qt.AlignCenter)
-        row.append(extra_image_exists)
-        # ninth column: indicator for whether the GIF or other additional images match what's
-        # already on the wiki
-        extra_image_matches = QStandardItem('')
-        extra_image_matches.setTextAlignment(Qt.AlignCenter)
-        row.append(extra_image_matches)
-        # tenth column: namespace that the object should be put in (or empty for the default
-        # namespace)
-        object_namespace = QStandardItem('')
-        namespace = qud_object.wiki_namespace()
-        object_namespace.setText(namespace)
-        object_namespace.setTextAlignment(Qt.AlignCenter)
-        row.append(object_namespace)
-
-        if not qud_object.is_wiki_eligible():
-            row[0].setForeground(QColor.fromRgb(100, 100, 100))
-            # for _ in row:
-            #     _.setSelectable(False)
+    def build_index(self, index, built: Callable):
+        """Start adding all objects to an empty search index in the background, calling built
+        with the index once it is finished."""
+        builder = IndexBuilder(index, self.qindex.values())
+        builder.signals.built.connect(built)
+        self.index_builders.append(builder)
+        QThreadPool.globalInstance().start(builder)
+
+    def index_finished(self, index):
+        """Forget the builder of a finished index."""
+        self.index_builders = [builder for builder in self.index_builders
+                               if builder.index is not index]
+
+    def build_field_index(self):
+        """Start indexing the wiki template fields of all objects in the background, for
+        'hasfield:' searches."""
+        self.build_index(FieldIndex(config['Templates']['Fields'], self.gameroot.gamever),
+                         self.field_index_built)
+
+    def field_index_built(self, index: FieldIndex):
+        """Use a newly built field index for searches, unless the fields or game have changed
+        since it was started."""
+        self.index_finished(index)
+        if index.is_current(config['Templates']['Fields'], self.gameroot.gamever):
+            self.qud_object_proxyfilter.field_index = index
+            self.update_search_completions()
         else:
-            font = QFont()
-            font.setBold(True)
-            row[0].setFont(font)
-        if qud_object.name in config['Interface']['Initial expansion targets']:
-            self.objects_to_expand.append(item)
-        # recurse through children before returning self
-        if not qud_object.is_leaf:
-            for child in qud_object.children:
-                item.appendRow(self.init_qud_object_children(child))
-        return row
-
-    def recursive_expand(self, item: QStandardItem):
-        """Expand the currently selected item in the QudTreeView and all its children."""
-        index = self.qud_object_model.indexFromItem(item)
+            self.build_field_index()
+
+    def blueprint_index_built(self, index: BlueprintIndex):
+        """Use a newly built index of parts and tags for searches."""
+        self.index_finished(index)
+        self.qud_object_proxyfilter.blueprint_index = index
+        self.update_search_completions()
+
+    def update_search_completions(self):
+        """Offer the search modifiers the object search can now complete, such as
+        'haspart:Render', as completions in the search box."""
+        self.search_completer.setModel(QStringListModel(
+            self.qud_object_proxyfilter.search_modifiers(), self.search_completer))
+
+    def recursive_expand(self, index: QModelIndex):
+        """Expand an object's row in the QudTreeView, given its index in the object model, and the
+        rows of all its ancestors."""
         self.objTreeView.expand(self.qud_object_proxyfilter.mapFromSource(index))
-        if item.parent() is not None:
-            self.recursive_expand(item.parent())
+        if index.parent().isValid():
+            self.recursive_expand(index.parent())
 
     def tree_selection_handler(self, indices: list):
         """Registered with custom QudTreeView class as the handler for selection."""
@@ -292,8 +305,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         for num, index in enumerate(indices):
             model_index = self.qud_object_proxyfilter.mapToSource(index)
             if model_index.column() == 0:
-                item = self.qud_object_model.itemFromIndex(model_index)
-                qud_object = item.data()
+                qud_object = model_index.data(OBJECT_ROLE)
                 if self.obj_view_type == 'wiki':
                     if qud_object.is_wiki_eligible():
                         text += qud_object.wiki_template(self.gameroot.gamever) + '\n'
@@ -333,10 +345,10 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                     # can take a few moments for some animations
                     QApplication.setOverrideCursor(Qt.WaitCursor)
                     try:
-                        gif_img = qud_object.gif_image(0)
+                        gif = render_cache.animation(qud_object, self.gameroot.gamever)
                     finally:
                         QApplication.restoreOverrideCursor()
-                    self.qbytearray = QByteArray(GifHelper.get_bytes(gif_img))
+                    self.qbytearray = QByteArray(gif.data.tobytes())
                     self.qbuffer = QBuffer(self.qbytearray, self)
                     self.qbuffer.open(QIODevice.ReadOnly)
                     self.qmovie = QMovie(self.qbuffer, b'GIF', self)
@@ -346,7 +358,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         self.qmovie.start()
                         display_success = True
                 else:
-                    pil_qt_image = ImageQt.ImageQt(qud_object.tile.get_big_image())
+                    big_tile = render_cache.big_tile(qud_object, qud_object.tile,
+                                                     self.gameroot.gamever)
+                    pil_qt_image = ImageQt.ImageQt(big_tile.image)
                     self.tile_label.setPixmap(QPixmap.fromImage(pil_qt_image))
                     display_success = True
                 self.save_tile_button.setDisabled(True if not display_success else False)
@@ -367,23 +381,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def expand_default(self):
         """Expand the QudTreeView to the levels configured in config.yml."""
         self.collapse_all()
-        for item in self.objects_to_expand:
-            self.recursive_expand(item)
+        for name in config['Interface']['Initial expansion targets']:
+            if name in self.qindex:
+                self.recursive_expand(self.qud_object_model.index_of(self.qindex[name]))
         self.objTreeSearchHandler.clear_search_filter(True)
 
-    def get_icon_cell(self, index_in_items_selected: int) -> QStandardItem:
-        qmodelindex = self.qud_object_proxyfilter\
+    def get_icon_cell(self, index_in_items_selected: int) -> QModelIndex:
+        return self.qud_object_proxyfilter\
             .mapToSource(self.objTreeView.items_selected[index_in_items_selected])
-        cell = self.qud_object_model.itemFromIndex(qmodelindex)
-        return cell
 
-    def set_icon(self, index_in_items_selected: int, icon: str = '✅', update_ui: bool = False):
-        cell = self.get_icon_cell(index_in_items_selected)
-        cell.setText(icon)
-        if icon == '⮿':
-            cell.setForeground(QColor.fromRgb(100, 100, 100))  # grey
-        if update_ui is True:
-            self.app.processEvents()
+    def set_icon(self, cell: QModelIndex, icon: str = '✅'):
+        """Set the status icon shown in a cell, given its index in the object model. May be called
+        from a background job, in which case the update is handed over to the GUI thread."""
+        if QThread.currentThread() != self.thread():
+            self.icon_changed.emit(cell, icon)
+            return
+        self.qud_object_model.setData(cell, icon)
 
     def tab_changed(self, idx: int):
         if idx == POP_TAB_INDEX:
@@ -455,173 +468,270 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.pop_plainTextEdit.clear()
             pass
 
-    def wiki_check_selected(self):
-        """Check the wiki for the existence of the article and image(s) for selected objects, and
-        update the columns for those states."""
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        statusbar_current = self.statusbar.currentMessage()
-        check_total = self.objTreeView.selected_row_count()
-        check_count = 0
+    def selected_object_rows(self) -> list:
+        """Return a (qud_object, cells) tuple for each object currently selected in the tree,
+        where cells is the list of the object model's indexes of each column of its row."""
+        rows = []
         for num, index in enumerate(self.objTreeView.items_selected):
             model_index = self.qud_object_proxyfilter.mapToSource(index)
             if model_index.column() == 0:
-                if check_total > 1:
-                    check_count += 1
-                    self.statusbar.showMessage("comparing selected entries against wiki:  " +
-                                               str(check_count) + "/" + str(check_total))
-                qitem = self.qud_object_model.itemFromIndex(model_index)
-                wiki_exists = self.get_icon_cell(num + 3)
-                wiki_matches = self.get_icon_cell(num + 4)
-                tile_exists = self.get_icon_cell(num + 5)
-                tile_matches = self.get_icon_cell(num + 6)
-                extra_imgs_exist = self.get_icon_cell(num + 7)
-                extra_imgs_match = self.get_icon_cell(num + 8)
+                qud_object = model_index.data(OBJECT_ROLE)
+                cells = [self.get_icon_cell(num + column)
+                         for column in range(len(OBJ_HEADER_LABELS))]
+                rows.append((qud_object, cells))
+        return rows
+
+    def journal_rows(self, journal: JournalEntry) -> list:
+        """Return a (qud_object, cells, state, result) tuple for each object in a job journal, where
+        cells is the list of the object model's indexes of each column of its row, and state and
+        result are as recorded in the journal."""
+        rows = []
+        for name, state, result in journal.items():
+            qud_object = self.qindex.get(name)
+            if qud_object is None:
+                continue  # objects can disappear from the game between versions
+            cells = [self.qud_object_model.index_of(qud_object, column)
+                     for column in range(len(OBJ_HEADER_LABELS))]
+            rows.append((qud_object, cells, state, result))
+        return rows
+
+    def interrupted_job(self, description: str) -> Optional[JournalEntry]:
+        """If the last job with this description didn't finish every object, ask whether to
+        resume it. Returns its journal if it should be resumed, or None to start a new job."""
+        journal = job_journal.unfinished(description, self.gameroot.gamever)
+        if journal is None:
+            return None
+        items = journal.items()
+        remaining = sum(state != 'done' for _, state, _ in items)
+        reply = QMessageBox.question(self, 'Resume interrupted job?',
+                                     f'{description} was interrupted with {remaining} of '
+                                     f'{len(items)} object(s) left to do.\n\nResume it? Choose '
+                                     f'No to start over with the selected objects instead.')
+        if reply == QMessageBox.Yes:
+            return journal
+        journal.complete()
+        return None
+
+    def start_job(self, job: Job):
+        """Run a background job, showing its progress in the status bar until it finishes.
+
+        Only one job runs at a time; the wiki actions are disabled while it does."""
+        if self.current_job is not None:
+            self.statusbar.showMessage('Please wait for the current wiki job to finish.')
+            return
+        self.current_job = job
+        job.signals.progress.connect(self.job_progress)
+        job.signals.message.connect(self.job_label.setText)
+        job.signals.finished.connect(self.job_finished)
+        for action in self.job_actions:
+            action.setDisabled(True)
+        self.job_label.setText(job.description)
+        self.job_progress_bar.setRange(0, 0)  # busy indicator until the first progress report
+        self.job_cancel_button.setEnabled(True)
+        for widget in self.job_label, self.job_progress_bar, self.job_cancel_button:
+            widget.show()
+        QThreadPool.globalInstance().start(job)
+
+    def job_progress(self, done: int, total: int, rate: float, eta: float):
+        """Show the progress, throughput and estimated time remaining of the running job."""
+        if self.current_job is None:
+            return
+        self.job_progress_bar.setRange(0, total)
+        self.job_progress_bar.setValue(done)
+        text = f'{self.current_job.description}: {done}/{total}'
+        if rate > 0:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f'  ({rate:.1f}/s, {minutes}:{seconds:02} remaining)'
+        if self.current_job.cancelled:
+            text += '  [cancelling...]'
+        self.job_label.setText(text)
+
+    def job_finished(self, done: int, failed: int, cancelled: bool):
+        """Clean up after the running job has finished or been cancelled."""
+        description = self.current_job.description
+        self.current_job = None
+        for widget in self.job_label, self.job_progress_bar, self.job_cancel_button:
+            widget.hide()
+        for action in self.job_actions:
+            action.setEnabled(True)
+        message = f'{description}: {"cancelled" if cancelled else "finished"} after {done} ' \
+                  f'object(s)'
+        if failed > 0:
+            message += f', {failed} failed (see log)'
+        self.statusbar.showMessage(message)
+
+    def cancel_job(self):
+        """Ask the running job to stop after the objects it is currently working on."""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.job_cancel_button.setDisabled(True)
+            self.job_label.setText(f'{self.current_job.description}  [cancelling...]')
+
+    def closeEvent(self, event):
+        """Cancel any running background job or search when the window is closed."""
+        if self.current_job is not None:
+            self.current_job.cancel()
+        for builder in self.index_builders:
+            builder.cancel()
+        self.objTreeSearchHandler.cancel_search()
+        self.popTreeSearchHandler.cancel_search()
+        super().closeEvent(event)
+
+    def wiki_check_selected(self):
+        """Check the wiki for the existence of the article and image(s) for selected objects, and
+        update the columns for those states. Runs as a background job.
+
+        If the last scan was interrupted, offers to resume it instead: the objects it already
+        checked get their results back from the job journal, and only the rest are checked."""
+        to_check = []
+        journal = self.interrupted_job('Scanning wiki')
+        if journal is not None:
+            for qud_object, cells, state, icons in self.journal_rows(journal):
+                cells = cells[3:9]
+                if state == 'done':
+                    for cell, icon in zip(cells, icons):
+                        self.set_icon(cell, icon)
+                else:
+                    for _ in cells:
+                        self.set_icon(_, '')
+                    to_check.append((qud_object, cells))
+        else:
+            for qud_object, cells in self.selected_object_rows():
+                cells = cells[3:9]
                 # first, blank the cells
-                for _ in wiki_exists, wiki_matches, tile_exists,\
-                        tile_matches, extra_imgs_exist, extra_imgs_match:
-                    _.setText('')
-                # now, do the actual checking and update the cells with 'yes' or 'no'
-                qud_object = qitem.data()
-                # Check wiki article first:
+                for _ in cells:
+                    self.set_icon(_, '')
                 if not qud_object.is_wiki_eligible():
-                    wiki_exists.setText('⮿')
-                    wiki_exists.setForeground(QColor.fromRgb(100, 100, 100))  # grey
-                    wiki_matches.setText('⮿')
-                    wiki_matches.setForeground(QColor.fromRgb(100, 100, 100))
-                    tile_exists.setText('⮿')
-                    tile_exists.setForeground(QColor.fromRgb(100, 100, 100))
-                    tile_matches.setText('⮿')
-                    tile_matches.setForeground(QColor.fromRgb(100, 100, 100))
-                    extra_imgs_exist.setText('⮿')
-                    extra_imgs_exist.setForeground(QColor.fromRgb(100, 100, 100))
-                    extra_imgs_match.setText('⮿')
-                    extra_imgs_match.setForeground(QColor.fromRgb(100, 100, 100))
+                    for _ in cells:
+                        self.set_icon(_, '⮿')
                     continue
-                article = WikiPage(qud_object, self.gameroot.gamever)
-                if article.page.exists:
-                    wiki_exists.setText('✅')
-                    # does the template match the article?
-                    new_template = qud_object.wiki_template(self.gameroot.gamever).strip()
-                    if self.check_template_match(new_template, article.page.text().strip()):
-                        wiki_matches.setText('✅')
-                    else:
-                        wiki_matches.setText('❌')
-                else:
-                    wiki_exists.setText('❌')
-                    wiki_matches.setText('-')
-                # Now check whether tile image exists:
-                wiki_tile_file = site.images[qud_object.image]
-                if wiki_tile_file.exists:
-                    tile_exists.setText('✅')
-                    # It exists, but does it match?
-                    img_match = False
-                    with io.BytesIO() as f:
-                        wiki_tile_file.download(f)
-                        img1 = Image.open(f)
-                        img2 = qud_object.tile.get_big_image()
-                        img_match = self.check_image_match(img1, img2)
-                    if img_match:
-                        tile_matches.setText('✅')
-                    else:
-                        tile_matches.setText('❌')
-                elif qud_object.has_tile():
-                    tile_exists.setText('❌')
-                    tile_matches.setText('❌')
-                else:
-                    tile_exists.setText('⮿')
-                    tile_exists.setForeground(QColor.fromRgb(100, 100, 100))  # grey
-                    tile_matches.setText('⮿')
-                    tile_matches.setForeground(QColor.fromRgb(100, 100, 100))
-                # Now check whether GIF or other images exist:
-                wiki_gif_file = site.images[qud_object.gif]
-                gif_exists = wiki_gif_file.exists
-                altimages_exist = False
+                to_check.append((qud_object, cells))
+            journal = job_journal.start('Scanning wiki', self.gameroot.gamever,
+                                        (qud_object.name for qud_object, _ in to_check))
+        wiki_data = {}
+
+        def fetch_wiki_data(items: list):
+            """Fetch all of the articles and image hashes in as few requests as possible."""
+            wiki_data['pages'] = fetch_pages(article_name(qud_object) for qud_object, _ in items)
+            filenames = []
+            for qud_object, _ in items:
+                filenames += [qud_object.image, qud_object.gif]
                 if qud_object.number_of_tiles() > 1:
-                    altimages_exist = True
-                    alt_tiles, alt_metas = qud_object.tiles_and_metadata()
-                    total_altimages = len(alt_tiles)
-                    msg_prefix = self.statusbar.currentMessage()
-                    current_index = -1
-                    for alt_tile, alt_meta in zip(alt_tiles, alt_metas):
-                        current_index += 1
-                        self.statusbar.showMessage(msg_prefix +
-                                                   '    [scanning wiki for extra images ' +
-                                                   f'{current_index + 1}/{total_altimages}]')
-                        self.app.processEvents()
-                        alt_file = site.images[alt_meta.filename]
-                        if not alt_file.exists:
-                            altimages_exist = False
-                    self.statusbar.showMessage(msg_prefix)
-                    self.app.processEvents()
-                if gif_exists or altimages_exist:
-                    extra_imgs_exist.setText('✅')
-                    gif_matches = True
-                    altimages_match = True
-
-                    # does the GIF match what's already on the wiki?
-                    if gif_exists:
-                        with io.BytesIO() as f:
-                            wiki_gif_file.download(f)
-                            gif1 = Image.open(f)
-                            gif2 = qud_object.gif_image(0)
-                            if gif1 is not None and gif2 is not None:
-                                gif_matches = self.check_gif_match(gif1, gif2, qud_object.name)
-                            else:
-                                gif_matches = False
-
-                    # do all of the alt images match what's already on the wiki?
-                    if altimages_exist:
-                        alt_tiles, alt_metas = qud_object.tiles_and_metadata()
-                        total_altimages = len(alt_tiles)
-                        msg_prefix = self.statusbar.currentMessage()
-                        current_index = -1
-                        for alt_tile, alt_meta in zip(alt_tiles, alt_metas):
-                            current_index += 1
-                            self.statusbar.showMessage(f'{msg_prefix}    ' +
-                                                       '[comparing extra images to wiki images ' +
-                                                       f'{current_index + 1}/{total_altimages}]')
-                            self.app.processEvents()
-                            alt_file = site.images[alt_meta.filename]
-                            if alt_file.exists:
-                                with io.BytesIO() as f:
-                                    alt_file.download(f)
-                                    wiki_alt_img = Image.open(f)
-                                    if not self.check_image_match(wiki_alt_img,
-                                                                  alt_tile.get_big_image()):
-                                        altimages_match = False
-
-                            if alt_meta.is_animated():
-                                alt_file_gif = site.images[alt_meta.gif_filename]
-                                if alt_file_gif.exists:
-                                    with io.BytesIO() as f:
-                                        alt_file_gif.download(f)
-                                        wiki_alt_gif = Image.open(f)
-                                        qbe_alt_gif = qud_object.gif_image(current_index)
-                                        if not self.check_gif_match(wiki_alt_gif, qbe_alt_gif,
-                                                                    qud_object.name):
-                                            altimages_match = False
-                        self.statusbar.showMessage(msg_prefix)
-                        self.app.processEvents()
-                    if gif_matches and altimages_match:
-                        extra_imgs_match.setText('✅')
-                    else:
-                        extra_imgs_match.setText('❌')
+                    for alt_meta in qud_object.tiles_and_metadata()[1]:
+                        filenames += [alt_meta.filename, alt_meta.gif_filename]
+            wiki_data['files'] = fetch_images(filenames)
+
+        def check_object(item: tuple) -> list:
+            qud_object, cells = item
+            return self.wiki_check_object(qud_object, cells, wiki_data['pages'],
+                                          wiki_data['files'])
+
+        self.start_job(Job('Scanning wiki', to_check, check_object, prepare=fetch_wiki_data,
+                           describe=lambda item: item[0].name, journal=journal))
+
+    def wiki_check_object(self, qud_object: QudObjectWiki, cells: list, pages: dict,
+                          files: dict) -> list:
+        """Compare one object against its prefetched wiki article and images, and update its
+        status cells. Called from the background job started by wiki_check_selected().
+
+        Parameters:
+            qud_object: the object to check
+            cells: the object's status cells, from 'Article?' to 'Extra images match?'
+            pages: the articles returned by fetch_pages()
+            files: the images returned by fetch_images()
+
+        Returns:
+            the icons shown in each of the cells, to be kept in the job journal
+        """
+        icons = {}
+
+        def set_icon(cell: QModelIndex, icon: str):
+            self.set_icon(cell, icon)
+            icons[id(cell)] = icon
+
+        wiki_exists, wiki_matches, tile_exists, tile_matches, extra_imgs_exist, \
+            extra_imgs_match = cells
+        # now, do the actual checking and update the cells with 'yes' or 'no'
+        # Check wiki article first:
+        article = WikiPage(qud_object, self.gameroot.gamever, pages.get(article_name(qud_object)))
+        if article.page.exists:
+            set_icon(wiki_exists, '✅')
+            # does the template match the article?
+            new_template = article.template_text.strip()
+            if self.check_template_match(new_template, article.text().strip()):
+                set_icon(wiki_matches, '✅')
+            else:
+                set_icon(wiki_matches, '❌')
+        else:
+            set_icon(wiki_exists, '❌')
+            set_icon(wiki_matches, '-')
+        # Now check whether tile image exists:
+        wiki_tile_file = files.get(qud_object.image)
+        if wiki_tile_file is not None and wiki_tile_file.exists:
+            set_icon(tile_exists, '✅')
+            # It exists, but does it match?
+            if self.check_wiki_image_match(wiki_tile_file, render_cache.big_tile(
+                    qud_object, qud_object.tile, self.gameroot.gamever)):
+                set_icon(tile_matches, '✅')
+            else:
+                set_icon(tile_matches, '❌')
+        elif qud_object.has_tile():
+            set_icon(tile_exists, '❌')
+            set_icon(tile_matches, '❌')
+        else:
+            set_icon(tile_exists, '⮿')
+            set_icon(tile_matches, '⮿')
+        # Now check whether GIF or other images exist:
+        wiki_gif_file = files.get(qud_object.gif)
+        gif_exists = wiki_gif_file is not None and wiki_gif_file.exists
+        altimages_exist = False
+        if qud_object.number_of_tiles() > 1:
+            alt_metas = qud_object.tiles_and_metadata()[1]
+            altimages_exist = all(alt_meta.filename in files and files[alt_meta.filename].exists
+                                  for alt_meta in alt_metas)
+        if gif_exists or altimages_exist:
+            set_icon(extra_imgs_exist, '✅')
+            gif_matches = True
+            altimages_match = True
+
+            # does the GIF match what's already on the wiki?
+            if gif_exists:
+                gif = render_cache.animation(qud_object, self.gameroot.gamever)
+                if gif is not None:
+                    gif_matches = self.check_wiki_image_match(wiki_gif_file, gif, qud_object.name)
                 else:
-                    if qud_object.has_gif_tile() or qud_object.number_of_tiles() > 1:
-                        extra_imgs_exist.setText('❌')
-                        extra_imgs_match.setText('-')
-                    else:
-                        extra_imgs_exist.setText('⮿')
-                        extra_imgs_exist.setForeground(QColor.fromRgb(100, 100, 100))  # grey
-                        extra_imgs_match.setText('⮿')
-                        extra_imgs_match.setForeground(QColor.fromRgb(100, 100, 100))  # grey
-                self.app.processEvents()
-        # restore cursor and status bar text:
-        if self.objTreeView.top_selected_item is not None:
-            self.statusbar.showMessage(self.objTreeView.top_selected_item.ui_inheritance_path())
-        self.statusbar.showMessage(statusbar_current)
-        self.app.processEvents()
-        QApplication.restoreOverrideCursor()
+                    gif_matches = False
+
+            # do all of the alt images match what's already on the wiki?
+            if altimages_exist:
+                alt_tiles, alt_metas = qud_object.tiles_and_metadata()
+                for current_index, (alt_tile, alt_meta) in enumerate(zip(alt_tiles, alt_metas)):
+                    alt_file = files.get(alt_meta.filename)
+                    if alt_file is not None and alt_file.exists:
+                        if not self.check_wiki_image_match(alt_file, render_cache.big_tile(
+                                qud_object, alt_tile, self.gameroot.gamever, current_index)):
+                            altimages_match = False
+
+                    if alt_meta.is_animated():
+                        alt_file_gif = files.get(alt_meta.gif_filename)
+                        if alt_file_gif is not None and alt_file_gif.exists:
+                            qbe_alt_gif = render_cache.animation(qud_object, self.gameroot.gamever,
+                                                                 current_index)
+                            if not self.check_wiki_image_match(alt_file_gif, qbe_alt_gif,
+                                                               qud_object.name):
+                                altimages_match = False
+            if gif_matches and altimages_match:
+                set_icon(extra_imgs_match, '✅')
+            else:
+                set_icon(extra_imgs_match, '❌')
+        else:
+            if qud_object.has_gif_tile() or qud_object.number_of_tiles() > 1:
+                set_icon(extra_imgs_exist, '❌')
+                set_icon(extra_imgs_match, '-')
+            else:
+                set_icon(extra_imgs_exist, '⮿')
+                set_icon(extra_imgs_match, '⮿')
+        return [icons.get(id(cell), '') for cell in cells]
 
     def toggle_img_comparisons(self):
         """Toggle whether image comparison pop-ups are shown when uploading tiles or extra images.
@@ -631,126 +741,100 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
     def upload_selected_templates(self):
         """Upload the generated templates for all currently selected objects to the wiki."""
-        self.upload_wikidata(self.upload_wiki_template, 'templates')
+        self.upload_wikidata(self.upload_wiki_template, 'templates', concurrent=True)
 
     def upload_selected_tiles(self):
         """Upload the generated tiles for all currently selected objects to the wiki."""
-        self.upload_wikidata(self.upload_wiki_tile, 'tiles')
+        # image comparison pop-ups are shown one at a time, so only upload concurrently without them
+        self.upload_wikidata(self.upload_wiki_tile, 'tiles',
+                             concurrent=not self._prompt_for_image_changes)
 
     def upload_extra_images(self):
         """Upload extra image(s) for all currently selected objects to the wiki."""
-        self.upload_wikidata(self.upload_wiki_extra_images, 'extra images')
+        self.upload_wikidata(self.upload_wiki_extra_images, 'extra images',
+                             concurrent=not self._prompt_for_image_changes)
+
+    def upload_wikidata(self, object_handler: Callable[[QudObjectWiki, list], None],
+                        data_descriptor: str, concurrent: bool = False):
+        """Generic wiki data upload template. Starts a background job that calls the
+        object_handler() method on each selected object in the tree, along with the list of
+        cells in that object's row. The handler method is responsible for performing the upload.
 
-    def upload_wikidata(self, object_handler: Callable[[QudObjectWiki, int], None],
-                        data_descriptor: str):
-        """Generic wiki data upload template. Iterates through all selected objects in the tree,
-        calling the object_handler() method on each of them. The handler method is responsible
-        for performing the upload.
+        If concurrent is True, the handler is run for up to UPLOAD_WORKERS objects at once, and
+        the status columns are updated as each upload finishes.
+
+        If the last upload of the same data was interrupted, offers to resume it instead, skipping
+        the objects that were already uploaded.
         """
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        check_total = self.objTreeView.selected_row_count()
-        check_count = 0
-        for num, index in enumerate(self.objTreeView.items_selected):
-            model_index = self.qud_object_proxyfilter.mapToSource(index)
-            if model_index.column() == 0:
-                if check_total > 1:
-                    check_count += 1
-                    self.statusbar.showMessage(f'uploading selected {data_descriptor} to wiki:  ' +
-                                               str(check_count) + "/" + str(check_total))
-                item = self.qud_object_model.itemFromIndex(model_index)
-                qud_object = item.data()
+        description = f'Uploading {data_descriptor}'
+        journal = self.interrupted_job(description)
+        if journal is not None:
+            to_upload = [(qud_object, cells) for qud_object, cells, state, _
+                         in self.journal_rows(journal) if state != 'done']
+        else:
+            to_upload = []
+            for qud_object, cells in self.selected_object_rows():
                 if not qud_object.is_wiki_eligible():
                     print(f'{qud_object.name} is not wiki eligible.')
                 else:
-                    upload_processed = False
-                    try:  # wrapped in try to ensure we always restore the mouse cursor
-                        object_handler(qud_object, num)
-                        upload_processed = True
-                    finally:
-                        if not upload_processed:
-                            QApplication.restoreOverrideCursor()
-                            if self.objTreeView.top_selected_item is not None:
-                                self.statusbar.showMessage(
-                                    self.objTreeView.top_selected_item.ui_inheritance_path())
-        # restore cursor and status bar text:
-        QApplication.restoreOverrideCursor()
-        if self.objTreeView.top_selected_item is not None:
-            self.statusbar.showMessage(self.objTreeView.top_selected_item.ui_inheritance_path())
-
-    def upload_wiki_template(self, qud_object: QudObjectWiki, selection_index: int):
+                    to_upload.append((qud_object, cells))
+            journal = job_journal.start(description, self.gameroot.gamever,
+                                        (qud_object.name for qud_object, _ in to_upload))
+        self.start_job(Job(description, to_upload, lambda item: object_handler(*item),
+                           workers=UPLOAD_WORKERS if concurrent else 1,
+                           describe=lambda item: item[0].name, journal=journal))
+
+    def upload_wiki_template(self, qud_object: QudObjectWiki, cells: list):
         """Uploads a single template to the relevant wiki page.
 
         Intended for use as an object_handler provided to the upload_wikidata() method.
         """
-        wiki_exists_cell_index = selection_index + 3
-        wiki_matches_cell_index = selection_index + 4
         try:
             page = WikiPage(qud_object, self.gameroot.gamever)
-            if page.upload_template() == 'Success':
-                self.set_icon(wiki_exists_cell_index, '✅')
-                self.set_icon(wiki_matches_cell_index, '✅')
-                self.app.processEvents()
+            if page.upload_template() in ('Success', 'Unchanged'):
+                self.set_icon(cells[3], '✅')
+                self.set_icon(cells[4], '✅')
         except ValueError:
             print(f"Not uploading: page exists but format not recognized ({qud_object.name})")
 
-    def upload_wiki_tile(self, qud_object: QudObjectWiki, selection_index: int):
+    def upload_wiki_tile(self, qud_object: QudObjectWiki, cells: list):
         """Uploads a single image to the relevant wiki page.
 
         Intended for use as an object_handler provided to the upload_wikidata() method.
         """
-        tile_exists_cell_index = selection_index + 5
-        tile_matches_cell_index = selection_index + 6
+        tile_exists_cell = cells[5]
+        tile_matches_cell = cells[6]
         if qud_object.tile is None:
             print(f'{qud_object.name} has no tile, so not uploading.')
-            self.set_icon(tile_exists_cell_index, '❌', True)
+            self.set_icon(tile_exists_cell, '❌')
             return
         if qud_object.tile.hasproblems:
             print(f'{qud_object.name} had a tile, but bad rendering, so not uploading.')
             return
-        wiki_tile_file = site.images[qud_object.image]
-        if wiki_tile_file.exists:
-            self.set_icon(tile_exists_cell_index, '✅', True)
-
-            img_match = False
-            with io.BytesIO() as f:
-                wiki_tile_file.download(f)
-                img1 = Image.open(f)
-                img2 = qud_object.tile.get_big_image()
-                img_match = self.check_image_match(img1, img2)
-            if img_match:
-                self.set_icon(tile_matches_cell_index, '✅', True)
+        wiki_tile_file = fetch_images([qud_object.image]).get(qud_object.image)
+        # rendered once, both to compare against the wiki and to upload
+        qbe_tile = render_cache.big_tile(qud_object, qud_object.tile, self.gameroot.gamever)
+        if wiki_tile_file is not None and wiki_tile_file.exists:
+            self.set_icon(tile_exists_cell, '✅')
+            if self.check_wiki_image_match(wiki_tile_file, qbe_tile):
+                self.set_icon(tile_matches_cell, '✅')
                 print(f'Image {qud_object.image} already exists and matches our version.')
                 return
             else:
-                self.set_icon(tile_matches_cell_index, '❌', True)
+                self.set_icon(tile_matches_cell, '❌')
                 if self._prompt_for_image_changes:
-                    QApplication.restoreOverrideCursor()  # temp. restore cursor for dialog
-
-                    dialog = QDialog()
-                    dialog.ui = Ui_WikiImageUpload()
-                    dialog.ui.setupUi(dialog)
-                    dialog.setAttribute(Qt.WA_DeleteOnClose)
-                    # add images
-                    qbe_image = ImageQt.ImageQt(img2)
-                    wiki_image = ImageQt.ImageQt(img1)
-                    dialog.ui.comparison_tile_1.setPixmap(QPixmap.fromImage(qbe_image))
-                    dialog.ui.comparison_tile_2.setPixmap(QPixmap.fromImage(wiki_image))
-                    # show compare dialog
-                    result = dialog.exec()
-
-                    QApplication.setOverrideCursor(Qt.WaitCursor)
-                    if result == QDialog.Rejected:
+                    if not self.ask_image_replacement(qbe_tile, wiki_tile_file):
                         return
 
         # upload or replace the wiki file
         filename = qud_object.image
-        result = upload_wiki_image(qud_object.tile.get_big_bytesio(), filename,
-                                   self.gameroot.gamever, qud_object.tile.filename)
+        result = upload_wiki_image(qbe_tile.data, filename, self.gameroot.gamever,
+                                   qud_object.tile.filename)
         if result.get('result', None) == 'Success':
-            self.set_icon(tile_exists_cell_index, '✅')
-            self.set_icon(tile_matches_cell_index, '✅', True)
+            self.set_icon(tile_exists_cell, '✅')
+            self.set_icon(tile_matches_cell, '✅')
 
-    def upload_wiki_extra_images(self, qud_object: QudObjectWiki, selection_index: int):
+    def upload_wiki_extra_images(self, qud_object: QudObjectWiki, cells: list):
         """Uploads a single object's extra image(s) to the relevant wiki page.
 
         Intended for use as an object_handler provided to the upload_wikidata() method.
@@ -758,13 +842,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Extra images include GIF animations and alternate tiles (such as those associated with
         the RandomTile builders or Harvestable parts).
         """
-        extraimages_exist_cell_index = selection_index + 7
-        extraimages_match_cell_index = selection_index + 8
+        extraimages_exist_cell = cells[7]
+        extraimages_match_cell = cells[8]
         has_gif = qud_object.has_gif_tile()
         has_altimages = qud_object.number_of_tiles() > 1
         if not has_gif and not has_altimages:
-            self.set_icon(extraimages_exist_cell_index, '⮿', True)
-            self.set_icon(extraimages_match_cell_index, '⮿', True)
+            self.set_icon(extraimages_exist_cell, '⮿')
+            self.set_icon(extraimages_match_cell, '⮿')
             print(f'{qud_object.name} has no extra images, so not uploading.')
             return
 
@@ -772,69 +856,40 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         fail_ct = 0
         mismatch_ct = 0
 
+        # look up all of the object's extra images on the wiki in one request
+        filenames = [qud_object.gif]
+        if has_altimages:
+            for meta in qud_object.tiles_and_metadata()[1]:
+                filenames += [meta.filename, meta.gif_filename]
+        files = fetch_images(filenames)
+
         if has_gif:
             attempt_upload = False
-            wiki_gif_file = site.images[qud_object.gif]
-            if wiki_gif_file.exists:
-                self.set_icon(extraimages_exist_cell_index, '✅', True)
+            wiki_gif_file = files.get(qud_object.gif)
+            # rendered once, both to compare against the wiki and to upload
+            qbe_gif = render_cache.animation(qud_object, self.gameroot.gamever)
+            if wiki_gif_file is not None and wiki_gif_file.exists:
+                self.set_icon(extraimages_exist_cell, '✅')
                 gif_matches = False
-                with io.BytesIO() as f:
-                    wiki_gif_file.download(f)
-                    gif1 = Image.open(f)
-                    gif2 = qud_object.gif_image(0)
-                    if gif1 is not None and gif2 is not None:
-                        gif_matches = self.check_gif_match(gif1, gif2, qud_object.name)
+                if qbe_gif is not None:
+                    gif_matches = self.check_wiki_image_match(wiki_gif_file, qbe_gif,
+                                                              qud_object.name)
                 if gif_matches:
                     print(f'Image "{qud_object.gif}" already exists and matches our version.')
                     success_ct += 1
                 elif not self._prompt_for_image_changes:
                     attempt_upload = True
+                elif self.ask_image_replacement(qbe_gif, wiki_gif_file):
+                    attempt_upload = True
                 else:
-                    QApplication.restoreOverrideCursor()  # temporarily restore cursor for dialog
-
-                    dialog = QDialog()
-                    dialog.ui = Ui_WikiImageUpload()
-                    dialog.ui.setupUi(dialog)
-                    dialog.setAttribute(Qt.WA_DeleteOnClose)
-                    # add QBE GIF
-                    qbe_gif_bytearray = QByteArray(GifHelper.get_bytes(qud_object.gif_image(0)))
-                    qbe_gif_buffer = QBuffer(qbe_gif_bytearray)
-                    qbe_gif_buffer.open(QIODevice.ReadOnly)
-                    qbe_gif_player = QMovie(qbe_gif_buffer, b'GIF')
-                    if qbe_gif_player.isValid():
-                        qbe_gif_player.setCacheMode(QMovie.CacheAll)
-                        dialog.ui.comparison_tile_1.setMovie(qbe_gif_player)
-                        qbe_gif_player.start()
-                    # add wiki GIF
-                    wiki_gif_bytearray = QByteArray(wiki_gif_file.download())
-                    wiki_gif_buffer = QBuffer(wiki_gif_bytearray)
-                    wiki_gif_buffer.open(QIODevice.ReadOnly)
-                    wiki_gif_player = QMovie(wiki_gif_buffer, b'GIF')
-                    if wiki_gif_player.isValid():
-                        wiki_gif_player.setCacheMode(QMovie.CacheAll)
-                        dialog.ui.comparison_tile_2.setMovie(wiki_gif_player)
-                        wiki_gif_player.start()
-                    # show compare dialog
-                    result = dialog.exec()
-                    # close buffers
-                    qbe_gif_player.stop()
-                    qbe_gif_buffer.close()
-                    wiki_gif_player.stop()
-                    wiki_gif_buffer.close()
-
-                    QApplication.setOverrideCursor(Qt.WaitCursor)
-                    if result != QDialog.Rejected:
-                        attempt_upload = True
-                    else:
-                        mismatch_ct += 1
+                    mismatch_ct += 1
             else:
                 attempt_upload = True
 
             if attempt_upload:
                 # upload or replace the extra image(s) on the wiki
                 filename = qud_object.gif
-                result = upload_wiki_image(GifHelper.get_bytesio(qud_object.gif_image(0)), filename,
-                                           self.gameroot.gamever)
+                result = upload_wiki_image(qbe_gif.data, filename, self.gameroot.gamever)
                 if result.get('result', None) == 'Success':
                     success_ct += 1
                 else:
@@ -842,124 +897,53 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         if has_altimages:
             tiles, metadata = qud_object.tiles_and_metadata()
-            statusbar_current = self.statusbar.currentMessage()
-            total_altimages = len(tiles)
-            current_index = -1
-
-            for tile, meta in zip(tiles, metadata):
-                # update statusbar message
-                current_index += 1
-                self.statusbar.showMessage(f'{statusbar_current}    [uploading image ' +
-                                           f'{current_index + 1}/{total_altimages}]')
-                self.app.processEvents()
-
+            for current_index, (tile, meta) in enumerate(zip(tiles, metadata)):
                 # first, handle .png image
                 should_upload_image = False
-                image_file = site.images[meta.filename]
-                if not image_file.exists:
+                qbe_image = render_cache.big_tile(qud_object, tile, self.gameroot.gamever,
+                                                  current_index)
+                image_file = files.get(meta.filename)
+                if image_file is None or not image_file.exists:
                     should_upload_image = True
                 else:
-                    self.set_icon(extraimages_exist_cell_index, '✅', True)
-                    img_match = False
-                    with io.BytesIO() as f:
-                        image_file.download(f)
-                        img1 = Image.open(f)
-                        img2 = tile.get_big_image()
-                        img_match = self.check_image_match(img1, img2)
-                    if img_match:
+                    self.set_icon(extraimages_exist_cell, '✅')
+                    if self.check_wiki_image_match(image_file, qbe_image):
                         print(f'Extra image "{meta.filename}" already exists and ' +
                               'matches our version.')
                         success_ct += 1
                     else:
-                        self.set_icon(extraimages_match_cell_index, '❌', True)
+                        self.set_icon(extraimages_match_cell, '❌')
                         if not self._prompt_for_image_changes:
                             should_upload_image = True
+                        elif self.ask_image_replacement(qbe_image, image_file):
+                            should_upload_image = True
                         else:
-                            # temporarily restore cursor for dialog
-                            QApplication.restoreOverrideCursor()
-
-                            dialog = QDialog()
-                            dialog.ui = Ui_WikiImageUpload()
-                            dialog.ui.setupUi(dialog)
-                            dialog.setAttribute(Qt.WA_DeleteOnClose)
-                            # add images
-                            qbe_image = ImageQt.ImageQt(img2)
-                            wiki_image = ImageQt.ImageQt(img1)
-                            dialog.ui.comparison_tile_1.setPixmap(QPixmap.fromImage(qbe_image))
-                            dialog.ui.comparison_tile_2.setPixmap(QPixmap.fromImage(wiki_image))
-                            # show compare dialog
-                            result = dialog.exec()
-
-                            QApplication.setOverrideCursor(Qt.WaitCursor)
-                            if result == QDialog.Rejected:
-                                mismatch_ct += 1
-                            else:
-                                should_upload_image = True
+                            mismatch_ct += 1
 
                 # then, handle .gif image
                 should_upload_gif = False
-                qbe_gif = qud_object.gif_image(current_index)
-                wiki_gif = site.images[meta.gif_filename]
-                if not wiki_gif.exists:
+                qbe_gif = render_cache.animation(qud_object, self.gameroot.gamever, current_index)
+                wiki_gif = files.get(meta.gif_filename)
+                if wiki_gif is None or not wiki_gif.exists:
                     should_upload_gif = True if qbe_gif is not None else False
                 elif qbe_gif is not None:
-                    self.set_icon(extraimages_exist_cell_index, '✅', True)
-                    gif_matches = False
-                    with io.BytesIO() as f:
-                        wiki_gif.download(f)
-                        gif1 = Image.open(f)
-                        gif2 = qbe_gif
-                        if gif1 is not None and gif2 is not None:
-                            gif_matches = self.check_gif_match(gif1, gif2, qud_object.name)
+                    self.set_icon(extraimages_exist_cell, '✅')
+                    gif_matches = self.check_wiki_image_match(wiki_gif, qbe_gif,
+                                                              qud_object.name)
                     if gif_matches:
                         print(f'Extra image "{meta.filename}" already exists ' +
                               'and matches our version.')
                         success_ct += 1
                     elif not self._prompt_for_image_changes:
                         should_upload_gif = True
+                    elif self.ask_image_replacement(qbe_gif, wiki_gif):
+                        should_upload_gif = True
                     else:
-                        # temporarily restore cursor for dialog
-                        QApplication.restoreOverrideCursor()
-
-                        dialog = QDialog()
-                        dialog.ui = Ui_WikiImageUpload()
-                        dialog.ui.setupUi(dialog)
-                        dialog.setAttribute(Qt.WA_DeleteOnClose)
-                        # add QBE GIF
-                        qbe_gif_bytearray = QByteArray(GifHelper.get_bytes(qbe_gif))
-                        qbe_gif_buffer = QBuffer(qbe_gif_bytearray)
-                        qbe_gif_buffer.open(QIODevice.ReadOnly)
-                        qbe_gif_player = QMovie(qbe_gif_buffer, b'GIF')
-                        if qbe_gif_player.isValid():
-                            qbe_gif_player.setCacheMode(QMovie.CacheAll)
-                            dialog.ui.comparison_tile_1.setMovie(qbe_gif_player)
-                            qbe_gif_player.start()
-                        # add wiki GIF
-                        wiki_gif_bytearray = QByteArray(wiki_gif.download())
-                        wiki_gif_buffer = QBuffer(wiki_gif_bytearray)
-                        wiki_gif_buffer.open(QIODevice.ReadOnly)
-                        wiki_gif_player = QMovie(wiki_gif_buffer, b'GIF')
-                        if wiki_gif_player.isValid():
-                            wiki_gif_player.setCacheMode(QMovie.CacheAll)
-                            dialog.ui.comparison_tile_2.setMovie(wiki_gif_player)
-                            wiki_gif_player.start()
-                        # show compare dialog
-                        result = dialog.exec()
-                        # close buffers
-                        qbe_gif_player.stop()
-                        qbe_gif_buffer.close()
-                        wiki_gif_player.stop()
-                        wiki_gif_buffer.close()
-
-                        QApplication.setOverrideCursor(Qt.WaitCursor)
-                        if result == QDialog.Rejected:
-                            mismatch_ct += 1
-                        else:
-                            should_upload_gif = True
+                        mismatch_ct += 1
 
                 if should_upload_image:
                     # upload or replace the extra image(s) on the wiki
-                    result = upload_wiki_image(tile.get_big_bytesio(), meta.filename,
+                    result = upload_wiki_image(qbe_image.data, meta.filename,
                                                self.gameroot.gamever, tile.filename)
                     if result.get('result', None) == 'Success':
                         success_ct += 1
@@ -967,31 +951,81 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         fail_ct += 1
 
                 if should_upload_gif:
-                    result = upload_wiki_image(GifHelper.get_bytesio(qbe_gif), meta.gif_filename,
+                    result = upload_wiki_image(qbe_gif.data, meta.gif_filename,
                                                self.gameroot.gamever)
                     if result.get('result', None) == 'Success':
                         success_ct += 1
                     else:
                         fail_ct += 1
 
-            # restore statusbar message
-            self.statusbar.showMessage(statusbar_current)
-
-        self.set_icon(extraimages_exist_cell_index, '✅')
+        self.set_icon(extraimages_exist_cell, '✅')
         if success_ct > 0 and fail_ct == 0 and mismatch_ct == 0:
-            self.set_icon(extraimages_match_cell_index, '✅', True)
+            self.set_icon(extraimages_match_cell, '✅')
         else:
-            self.set_icon(extraimages_match_cell_index, '❌', True)
+            self.set_icon(extraimages_match_cell, '❌')
+
+    def ask_image_replacement(self, qbe_image: EncodedImage, wiki_file: WikiImage) -> bool:
+        """Show our rendered PNG or GIF image next to the wiki's version of it, and ask whether
+        the wiki's version should be replaced. Returns True if the user accepted.
+
+        May be called from a background job, which waits until the user has answered."""
+        request = {'qbe_image': qbe_image, 'wiki_bytes': wiki_file.download(), 'accepted': False}
+        if QThread.currentThread() != self.thread():
+            self.image_prompt.emit(request)  # blocks until prompt_image_replacement() returns
+        else:
+            self.prompt_image_replacement(request)
+        return request['accepted']
+
+    def prompt_image_replacement(self, request: dict):
+        """Show the image comparison dialog for ask_image_replacement() on the GUI thread, and
+        record the user's answer in the request."""
+        dialog = QDialog()
+        dialog.ui = Ui_WikiImageUpload()
+        dialog.ui.setupUi(dialog)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+        players = []
+        if request['qbe_image'].image.format == 'GIF':
+            # add QBE GIF and wiki GIF
+            for gif_bytes, label in ((request['qbe_image'].data.tobytes(),
+                                      dialog.ui.comparison_tile_1),
+                                     (request['wiki_bytes'], dialog.ui.comparison_tile_2)):
+                gif_bytearray = QByteArray(gif_bytes)
+                gif_buffer = QBuffer(gif_bytearray)
+                gif_buffer.open(QIODevice.ReadOnly)
+                gif_player = QMovie(gif_buffer, b'GIF')
+                if gif_player.isValid():
+                    gif_player.setCacheMode(QMovie.CacheAll)
+                    label.setMovie(gif_player)
+                    gif_player.start()
+                players.append((gif_player, gif_buffer, gif_bytearray))
+        else:
+            # add images
+            qbe_image = ImageQt.ImageQt(request['qbe_image'].image)
+            wiki_image = ImageQt.ImageQt(Image.open(io.BytesIO(request['wiki_bytes'])))
+            dialog.ui.comparison_tile_1.setPixmap(QPixmap.fromImage(qbe_image))
+            dialog.ui.comparison_tile_2.setPixmap(QPixmap.fromImage(wiki_image))
+        # show compare dialog
+        result = dialog.exec()
+        # close buffers
+        for gif_player, gif_buffer, _ in players:
+            gif_player.stop()
+            gif_buffer.close()
+        request['accepted'] = result != QDialog.Rejected
 
     def save_selected_tile(self):
         """Save the currently displayed tile as a PNG or GIF to the local filesystem."""
+        qud_object = self.objTreeView.top_selected_item
         if self.gif_mode:
-            if self.objTreeView.top_selected_item.gif_image(0) is not None:
+            gif = render_cache.animation(qud_object, self.gameroot.gamever)
+            if gif is not None:
                 filename = QFileDialog.getSaveFileName()[0]
-                GifHelper.save(self.objTreeView.top_selected_item.gif_image(0), filename)
-        elif self.objTreeView.top_selected_item.tile is not None:
+                with open(filename, 'wb') as f:
+                    f.write(gif.data)
+        elif qud_object.tile is not None:
             filename = QFileDialog.getSaveFileName()[0]
-            self.objTreeView.top_selected_item.tile.get_big_image().save(filename, format='png')
+            with open(filename, 'wb') as f:
+                f.write(render_cache.big_tile(qud_object, qud_object.tile,
+                                              self.gameroot.gamever).data)
 
     def swap_tile_mode(self):
         """Swap between the .png and .gif preview"""
@@ -1002,103 +1036,117 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """Checks if the new template text and the wiki's current template text match. Ignores the
         'gameversion' line in the template - otherwise every single page is marked as not matching
         whenever there's a new update, which makes the 'Article Matches?' column kind of useless."""
-        new = re.sub(r'^\| gameversion = .*?$', '', new, flags=re.MULTILINE)
-        current = re.sub(r'^\| gameversion = .*?$', '', current, flags=re.MULTILINE)
-        return new in current
+        return normalize_template(new) in normalize_template(current)
 
     def check_image_match(self, img1: Image, img2: Image) -> bool:
         """Determines if two images are the same through pixel-by-pixel comparison. Only accepts
         RGBA images. Will ignore any color differences in fully transparent pixels."""
         if img1.mode != 'RGBA' or img2.mode != 'RGBA':
             raise ValueError('Unexpected non-RGBA image type')
-        if img1.height != img2.height or img1.width != img2.width:
-            return False
-        pixels1 = list(img1.getdata())
-        pixels2 = list(img2.getdata())
-
-        # Normalize the color of all fully transparent pixels
-        pixels1 = [i if i[3] > 0 else (0, 0, 0, 0) for i in pixels1]
-        pixels2 = [i if i[3] > 0 else (0, 0, 0, 0) for i in pixels2]
-
-        return pixels1 == pixels2
+        return images_match(img1, img2)
 
     def check_gif_match(self, gif1: Image, gif2: Image, name: str = "Unknown Object") -> bool:
-        """Determines if two GIF images are the same through pixel-by-pixel comparison. Only accepts
-        GIF images. Will ignore any color differences in fully transparent pixels. The 'name'
-        parameter is provided only for debug purposes."""
-        if gif1.height != gif2.height or gif1.width != gif2.width:
-            return False  # Image resolutions don't match
+        """Determines if two GIF images are the same through frame-by-frame comparison, stopping at
+        the first frame that differs. Only accepts GIF images, and gif2 must be our own rendered
+        GIF, whose frame digests are cached. Will ignore any color differences in fully
+        transparent pixels. The 'name' parameter is provided only for debug purposes."""
         gif1_frames = getattr(gif1, "n_frames", 1)
         gif2_frames = getattr(gif2, "n_frames", 1)
         if gif1_frames <= 1 or gif2_frames <= 0:
             log.error("Expected multi-frame GIF images to compare, but the GIF for %s does not " +
                       "have multiple frames.", name)
             return False
-        if gif1_frames != gif2_frames:
-            return False  # GIFs have different number of frames, so they're different
-        for i in range(gif1_frames):
-            try:
-                gif1.seek(i)
-                gif2.seek(i)
-                if not self.check_image_match(gif1.convert('RGBA'), gif2.convert('RGBA')):
-                    return False  # Frame image doesn't match
-            except EOFError:
-                log.error("Encountered EOF during attempt to read GIF image sequence for %s", name)
-                return False
-        return True
+        try:
+            return gifs_match(gif1, gif2)
+        except EOFError:
+            log.error("Encountered EOF during attempt to read GIF image sequence for %s", name)
+            return False
+
+    def check_wiki_image_match(self, wiki_file: WikiImage, qbe_image: EncodedImage,
+                               name: str = "Unknown Object") -> bool:
+        """Determines if an image on the wiki matches our rendered PNG or GIF image.
+
+        The SHA-1 hash the wiki reports for the file is compared against the hash of our encoded
+        image data first. Only if those differ is the wiki file downloaded for a pixel-by-pixel
+        comparison, since the wiki copy may have been encoded differently. The 'name' parameter
+        is provided only for debug purposes."""
+        if wiki_file.imageinfo.get('sha1') == hashlib.sha1(qbe_image.data).hexdigest():
+            return True
+        with io.BytesIO() as f:
+            wiki_file.download(f)
+            wiki_image = Image.open(f)
+            if qbe_image.image.format == 'GIF':
+                return self.check_gif_match(wiki_image, qbe_image.image, name)
+            return self.check_image_match(wiki_image, qbe_image.image)
+
+    def diff_article(self, article: WikiPage, cells: list) -> TemplateDiff:
+        """Diff our template against an article, and update the object's 'Article?' and
+        'Article matches?' cells (given in that order) to match. May be called from a background
+        job."""
+        wiki_text = article.text() if article.page.exists else None
+        diff = diff_template(article.qud_object.name, article.article_name, article.template_text,
+                             wiki_text, article.template_region())
+        exists_cell, matches_cell = cells
+        self.set_icon(exists_cell, '❌' if diff.status == 'missing' else '✅')
+        self.set_icon(matches_cell, {'same': '✅', 'version': '✅', 'changed': '❌'}
+                      .get(diff.status, '-'))
+        return diff
 
     def show_simple_diff(self):
         """Display a popup showing the diff between our template and the version on the wiki."""
         qud_object = self.objTreeView.top_selected_item
         if qud_object is None or not qud_object.is_wiki_eligible():
             return
-        article_exists_index = self.objTreeView.top_selected_item_index + 3
-        article_matches_index = self.objTreeView.top_selected_item_index + 4
+        article_exists_cell = self.get_icon_cell(self.objTreeView.top_selected_item_index + 3)
+        article_matches_cell = self.get_icon_cell(self.objTreeView.top_selected_item_index + 4)
         article = WikiPage(qud_object, self.gameroot.gamever)
-        if not article.page.exists:
-            self.set_icon(article_exists_index, '❌', True)
+        diff = self.diff_article(article, [article_exists_cell, article_matches_cell])
+        if diff.status == 'missing':
             return
-        self.set_icon(article_exists_index, '✅')
-        txt = qud_object.wiki_template(self.gameroot.gamever).strip()
-        wiki_txt = article.page.text().strip()
-        # Capture TEMPLATE_RE from wiki page, but ignore things outside the template.
-        template_re = '(?:.*?)' + TEMPLATE_RE + '(?:.*)'
-        template_re_old = '(?:.*?)' + TEMPLATE_RE_OLD + '(?:.*)'
-        wiki_pattern = re.compile(template_re, re.MULTILINE | re.DOTALL)
-        basic_pattern = re.compile(template_re_old, re.MULTILINE | re.DOTALL)
         msg_box = QMessageBox()
         msg_box.setTextFormat(Qt.RichText)
-        if txt in wiki_txt:
+        if diff.status == 'same':
             msg_box.setText("No template differences detected.")
-            match_icon = '✅'
+        elif diff.status == 'unrecognized':
+            msg_box.setText('Unable to compare because the wiki template'
+                            ' is not formatted as expected.')
         else:
-            m = basic_pattern.match(txt)
-            m_wiki = wiki_pattern.match(wiki_txt)
-            if m is None:
-                msg_box.setText('Unable to compare because the QBE template'
-                                ' is not formatted as expected.')
-                match_icon = '-'
-            elif m_wiki is None:
-                # fallback to old logic (doesn't require START QBE and END QBE tags)
-                m_wiki = basic_pattern.match(wiki_txt)
-                if m_wiki is None:
-                    msg_box.setText('Unable to compare because the wiki template'
-                                    ' is not formatted as expected.')
-                    match_icon = '-'
-            if None not in [m, m_wiki]:
-                lines = m.group(1).splitlines()
-                wiki_lines = m_wiki.group(1).splitlines()
-                diff_lines = ''
-                for line in difflib.unified_diff(wiki_lines, lines, "wiki", "QBE", lineterm=""):
-                    diff_lines += '\n' + line
-                msg_box.setText(f'Unified diff of the QBE template and the currently published'
-                                f' wiki template:\n<pre>{diff_lines}</pre>')
-                match_icon = '❌'
-                if self.check_template_match(m.group(1), m_wiki.group(1)):
-                    match_icon = '✅'  # only difference is gameversion
-        self.set_icon(article_matches_index, match_icon, True)
+            diff_lines = html.escape('\n'.join(diff.lines))
+            msg_box.setText(f'Unified diff of the QBE template and the currently published'
+                            f' wiki template:\n<pre>\n{diff_lines}</pre>')
         msg_box.exec()
 
+    def diff_selected(self):
+        """Diff the templates of all selected objects against the wiki, and open a report of the
+        differences (saved as DIFF_REPORT_FILE) in the browser. Runs as a background job, which
+        fetches all of the articles in as few requests as possible before diffing them."""
+        to_diff = [(qud_object, cells) for qud_object, cells in self.selected_object_rows()
+                   if qud_object.is_wiki_eligible()]
+        pages = {}
+        diffs = {}
+
+        def fetch_articles(items: list):
+            pages.update(fetch_pages(article_name(qud_object) for qud_object, _ in items))
+
+        def diff_object(item: tuple):
+            qud_object, cells = item
+            article = WikiPage(qud_object, self.gameroot.gamever,
+                               pages.get(article_name(qud_object)))
+            diffs[qud_object.name] = self.diff_article(article, cells[3:5])
+
+        def write_report(done: int, failed: int, cancelled: bool):
+            report = render_report((diffs[qud_object.name] for qud_object, _ in to_diff
+                                    if qud_object.name in diffs), self.gameroot.gamever)
+            with open(DIFF_REPORT_FILE, 'w', encoding='utf-8') as f:
+                f.write(report)
+            print(f'Template diff report saved to {os.path.abspath(DIFF_REPORT_FILE)}')
+            QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.abspath(DIFF_REPORT_FILE)))
+
+        job = Job('Diffing templates', to_diff, diff_object, workers=UPLOAD_WORKERS,
+                  prepare=fetch_articles, describe=lambda item: item[0].name)
+        job.signals.finished.connect(write_report)
+        self.start_job(job)
+
     def setview(self, view: str):
         """Process a request to set the view type and update the checkmarks in the View menu.
 
@@ -1174,9 +1222,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                         'limited to &lt;value&gt;)'
                         '\n<pre> </pre>'
                         '\n<pre>haspart:&lt;PartName&gt;</pre>'
-                        '\nshows only objects that have a specific part (case sensitive)'
+                        '\n<pre>haspart:&lt;PartName&gt;_&lt;Attribute&gt;=&lt;value&gt;</pre>'
+                        '\nshows only objects that have a specific part (case sensitive), '
+                        'optionally with an attribute or attribute value'
                         '\n<pre> </pre>'
                         '\n<pre>hastag:&lt;TagName&gt;</pre>'
                         '\nshows only objects that have a specific tag (case sensitive)'
-                        '\n<pre> </pre>')
+                        '\n<pre> </pre>'
+                        '\n<pre>inherits:&lt;ObjectName&gt;</pre>'
+                        '\nshows only an object and the objects that inherit from it'
+                        '\n<pre> </pre>'
+                        '\n<pre>&lt;fieldname&gt;&gt;=50</pre>'
+                        '\n<pre>&lt;fieldname&gt;:3..5</pre>'
+                        '\nshows only objects with a wiki field compared to a number (also '
+                        '&gt;, &lt;, &lt;=, = and !=) or in a range of numbers'
+                        '\n<pre> </pre>'
+                        '\nSearches can be combined with AND, OR, NOT and parentheses, for '
+                        'example:'
+                        '\n<pre>inherits:Item tier=8 NOT hasfield:image</pre>')
         msg_box.exec()
@@ -0,0 +1,586 @@
+"""A local stand-in for the Caves of Qud wiki's MediaWiki API, for testing and benchmarking offline.
+
+Implements the parts of the API that QBE uses through mwclient: login, query (page info,
+revisions, image info, recent changes, tokens, site and user info), edit and upload. Everything
+is kept in memory, so the fake wiki starts out empty every time it is started.
+
+Point QBE at it by adding a fake_wiki section to wiki.yml (see wiki.yml.example), or run it on
+its own with `python -m qbe.fake_wiki` and set base and scheme in wiki.yml to match."""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import secrets
+from collections import deque
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Optional
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+from PIL import Image, UnidentifiedImageError
+
+log = logging.getLogger(__name__)
+
+NAMESPACES = {0: '', 2: 'User', 4: 'Project', 6: 'File', 10: 'Template', 14: 'Category'}
+INVALID_TITLE_CHARS = set('#<>[]|{}')
+SESSION_COOKIE = 'fakewiki_session'
+ANON_CSRF_TOKEN = '+\\'
+USER_RIGHTS = ['read', 'edit', 'createpage', 'upload', 'reupload', 'bot', 'writeapi']
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _split(value: Optional[str]) -> list:
+    """Split a multi-value API parameter like 'info|revisions' into a list."""
+    return value.split('|') if value else []
+
+
+class ApiError(Exception):
+    """An error to be returned to the client in the MediaWiki API error format."""
+
+    def __init__(self, code: str, info: str):
+        super().__init__(info)
+        self.code = code
+        self.info = info
+
+
+class FakeWiki:
+    """In-memory state of the fake wiki, and the API actions that read and change it."""
+    base_url = 'http://localhost/'  # set by FakeWikiServer once it knows its address
+    retry_after = 5  # seconds the wiki tells clients to wait when its replicas are lagged
+
+    def __init__(self, username: str, password: str, latency: float = 0.0,
+                 edit_limit: Optional[int] = None, lag_rate: float = 0.0):
+        """Create an empty fake wiki.
+
+        Args:
+            username: the username that can log in (like a bot password username)
+            password: the password for that user
+            latency: seconds to wait before answering every request, to simulate the network
+            edit_limit: the number of edits and uploads allowed per minute before the wiki
+                        answers with ratelimited errors, or None for no limit
+            lag_rate: the fraction of requests sent with a maxlag parameter that are refused as
+                      if the database replicas were lagged
+        """
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.edit_limit = edit_limit
+        self.lag_rate = lag_rate
+        self.lock = Lock()
+        self.pages = {}  # title -> list of revisions, oldest first
+        self.page_ids = {}  # title -> page id
+        self.files = {}  # title (including File:) -> list of file versions, oldest first
+        self.sessions = {}  # session id -> {'user': username or None, 'csrf': token}
+        self.recent_changes = []
+        self.request_count = 0
+        self._next_id = 1
+        self._edit_times = deque()
+
+    def add_page(self, title: str, text: str, user: str = 'Caves of Qud'):
+        """Create or edit a page directly, as if another user had edited it."""
+        with self.lock:
+            self._save_revision(self._normalize(title), text, user, 'Fake wiki setup')
+
+    def add_file(self, filename: str, data: bytes, user: str = 'Caves of Qud'):
+        """Upload a file directly, as if another user had uploaded it."""
+        with self.lock:
+            self._save_file(self._normalize(f'File:{filename}'), data, user, '')
+
+    # ---- request handling ----
+
+    def handle(self, params: dict, session_id: Optional[str]) -> tuple:
+        """Answer one API request.
+
+        Args:
+            params: the request parameters, including any uploaded files as bytes
+            session_id: the session cookie sent with the request, if any
+
+        Returns:
+            a tuple of (response dictionary, session id for the client to keep)
+        """
+        if self.latency:
+            sleep(self.latency)
+        with self.lock:
+            self.request_count += 1
+            if session_id not in self.sessions:
+                session_id = secrets.token_hex(16)
+                self.sessions[session_id] = {'user': None, 'csrf': ANON_CSRF_TOKEN}
+            session = self.sessions[session_id]
+            try:
+                if 'maxlag' in params and random.random() < self.lag_rate:
+                    raise ApiError('maxlag', f'Waiting for a database server: '
+                                             f'{float(params["maxlag"]) + 1} seconds lagged.')
+                action = params.get('action')
+                if action == 'query':
+                    result = self._query(params, session)
+                elif action == 'login':
+                    result = self._login(params, session)
+                elif action == 'logout':
+                    session.update(user=None, csrf=ANON_CSRF_TOKEN)
+                    result = {}
+                elif action == 'edit':
+                    result = self._edit(params, session)
+                elif action == 'upload':
+                    result = self._upload(params, session)
+                else:
+                    raise ApiError('badvalue', f'Unrecognized value for parameter "action": '
+                                               f'{action}.')
+            except ApiError as err:
+                result = {'error': {'code': err.code, 'info': err.info}}
+        return result, session_id
+
+    def file_data(self, filename: str) -> Optional[bytes]:
+        """Return the contents of the current version of a file, or None if there is none."""
+        with self.lock:
+            versions = self.files.get(self._normalize(f'File:{filename}'))
+        return versions[-1]['data'] if versions else None
+
+    # ---- API actions ----
+
+    def _query(self, params: dict, session: dict) -> dict:
+        query = {}
+        meta = _split(params.get('meta'))
+        if 'tokens' in meta:
+            token_type = params.get('type', 'csrf')
+            if token_type == 'login':
+                query['tokens'] = {'logintoken': secrets.token_hex(16) + '+\\'}
+            else:
+                query['tokens'] = {'csrftoken': session['csrf']}
+        if 'siteinfo' in meta:
+            query['general'] = {'sitename': 'Fake Caves of Qud Wiki',
+                                'generator': 'MediaWiki 1.39.3', 'case': 'first-letter'}
+            query['namespaces'] = {str(ns): {'id': ns, '*': name}
+                                   for ns, name in NAMESPACES.items()}
+        if 'userinfo' in meta:
+            if session['user'] is None:
+                query['userinfo'] = {'id': 0, 'name': '127.0.0.1', 'anon': '',
+                                     'groups': ['*'], 'rights': ['read']}
+            else:
+                query['userinfo'] = {'id': 1, 'name': session['user'],
+                                     'groups': ['*', 'user', 'bot'], 'rights': USER_RIGHTS}
+        if params.get('list') == 'recentchanges':
+            query['recentchanges'] = self._recent_changes(params)
+        if 'titles' in params:
+            self._query_titles(params, query)
+        return {'batchcomplete': '', 'query': query}
+
+    def _query_titles(self, params: dict, query: dict):
+        props = _split(params.get('prop'))
+        normalized = []
+        redirects = []
+        pages = {}
+        missing_id = -1
+        for title in _split(params['titles']):
+            name = self._normalize(title)
+            if name != title:
+                normalized.append({'from': title, 'to': name})
+            if not name or INVALID_TITLE_CHARS & set(name):
+                pages[str(missing_id)] = {'title': title, 'invalidreason': 'Bad title',
+                                          'invalid': ''}
+                missing_id -= 1
+                continue
+            if 'redirects' in params:
+                target = self._redirect_target(name)
+                if target is not None:
+                    redirects.append({'from': name, 'to': target})
+                    name = target
+            info = self._page_info(name, props, params)
+            if name in self.pages:
+                pages[str(self.page_ids[name])] = info
+            else:
+                pages[str(missing_id)] = info
+                missing_id -= 1
+        if normalized:
+            query['normalized'] = normalized
+        if redirects:
+            query['redirects'] = redirects
+        query['pages'] = pages
+
+    def _page_info(self, title: str, props: list, params: dict) -> dict:
+        namespace = self._namespace(title)
+        info = {'ns': namespace, 'title': title}
+        if namespace == 6 and 'imageinfo' in props:
+            info['imagerepository'] = 'local' if title in self.files else ''
+        if title not in self.pages:
+            info['missing'] = ''
+            if 'info' in props and 'protection' in _split(params.get('inprop')):
+                info['protection'] = []
+            return info
+        revisions = self.pages[title]
+        current = revisions[-1]
+        info['pageid'] = self.page_ids[title]
+        if 'info' in props:
+            info.update(contentmodel='wikitext', pagelanguage='en', touched=current['timestamp'],
+                        lastrevid=current['revid'], length=len(current['text'].encode()))
+            if self._redirect_target(title) is not None:
+                info['redirect'] = ''
+            if 'protection' in _split(params.get('inprop')):
+                info['protection'] = []
+        if 'revisions' in props:
+            info['revisions'] = [self._revision_info(current, params)]
+        if 'imageinfo' in props and title in self.files:
+            info['imageinfo'] = [self._image_info(title, self.files[title][-1], params)]
+        return info
+
+    @staticmethod
+    def _revision_info(revision: dict, params: dict) -> dict:
+        rvprop = _split(params.get('rvprop', 'ids|timestamp|flags|comment|user'))
+        info = {}
+        if 'ids' in rvprop:
+            info.update(revid=revision['revid'], parentid=revision['parentid'])
+        for prop in ('timestamp', 'user', 'comment', 'sha1'):
+            if prop in rvprop:
+                info[prop] = revision[prop]
+        if 'size' in rvprop:
+            info['size'] = len(revision['text'].encode())
+        if 'content' in rvprop:
+            if 'rvslots' in params:
+                info['slots'] = {'main': {'contentmodel': 'wikitext',
+                                          'contentformat': 'text/x-wiki',
+                                          '*': revision['text']}}
+            else:
+                info.update({'contentformat': 'text/x-wiki', 'contentmodel': 'wikitext',
+                             '*': revision['text']})
+        return info
+
+    def _image_info(self, title: str, version: dict, params: dict) -> dict:
+        iiprop = _split(params.get('iiprop', 'timestamp|user'))
+        info = {}
+        for prop in ('timestamp', 'user', 'comment', 'sha1'):
+            if prop in iiprop:
+                info[prop] = version[prop]
+        if 'size' in iiprop:
+            info.update(size=version['size'], width=version['width'], height=version['height'])
+        if 'url' in iiprop:
+            filename = title.split(':', 1)[1]
+            info['url'] = f'{self.base_url}images/{quote(filename)}'
+            info['descriptionurl'] = f'{self.base_url}index.php?title={quote(title)}'
+        if 'mime' in iiprop:
+            info['mime'] = version['mime']
+        return info
+
+    def _recent_changes(self, params: dict) -> list:
+        newer = params.get('rcdir', 'older') == 'newer'
+        start = params.get('rcstart')
+        end = params.get('rcend')
+        types = _split(params.get('rctype', 'edit|new|log'))
+        changes = []
+        for change in self.recent_changes:
+            if change['type'] not in types:
+                continue
+            if start is not None and (change['timestamp'] < start if newer
+                                      else change['timestamp'] > start):
+                continue
+            if end is not None and (change['timestamp'] > end if newer
+                                    else change['timestamp'] < end):
+                continue
+            changes.append(dict(change))
+        return changes if newer else changes[::-1]
+
+    def _login(self, params: dict, session: dict) -> dict:
+        if not params.get('lgtoken'):
+            return {'login': {'result': 'NeedToken', 'token': secrets.token_hex(16) + '+\\'}}
+        if params.get('lgname') != self.username or params.get('lgpassword') != self.password:
+            return {'login': {'result': 'Failed',
+                              'reason': 'Incorrect username or password entered.'}}
+        # bot passwords log in as User@BotName, but the edits are made by User
+        user = self.username.split('@')[0]
+        session.update(user=user, csrf=secrets.token_hex(16) + '+\\')
+        return {'login': {'result': 'Success', 'lguserid': 1, 'lgusername': user}}
+
+    def _check_write(self, params: dict, session: dict):
+        """Raise the error the wiki would give for a bad edit or upload request, if any."""
+        if params.get('assert') == 'user' and session['user'] is None:
+            raise ApiError('assertuserfailed', 'You are no longer logged in.')
+        if params.get('token') != session['csrf']:
+            raise ApiError('badtoken', 'Invalid CSRF token.')
+        if session['user'] is None:
+            raise ApiError('mustbeloggedin', 'You must be logged in to edit or upload.')
+        if self.edit_limit is not None:
+            now = monotonic()
+            while self._edit_times and now - self._edit_times[0] > 60:
+                self._edit_times.popleft()
+            if len(self._edit_times) >= self.edit_limit:
+                raise ApiError('ratelimited', "As an anti-abuse measure, you are limited from "
+                                              "performing this action too many times in a short "
+                                              "space of time, and you have exceeded this limit. "
+                                              "Please try again in a few minutes.")
+            self._edit_times.append(now)
+
+    def _edit(self, params: dict, session: dict) -> dict:
+        self._check_write(params, session)
+        title = self._normalize(params.get('title', ''))
+        if not title or INVALID_TITLE_CHARS & set(title):
+            raise ApiError('invalidtitle', f'Bad title "{params.get("title")}".')
+        if 'text' not in params:
+            raise ApiError('missingparam', 'The text parameter must be set.')
+        revisions = self.pages.get(title)
+        base = params.get('basetimestamp')
+        if revisions and base:
+            base = datetime.strptime(base, '%Y%m%d%H%M%S').strftime('%Y-%m-%dT%H:%M:%SZ')
+            if any(revision['timestamp'] > base and revision['user'] != session['user']
+                   for revision in revisions):
+                raise ApiError('editconflict', 'Edit conflict.')
+        result = {'result': 'Success', 'title': title, 'contentmodel': 'wikitext'}
+        if revisions and revisions[-1]['text'] == params['text']:
+            result.update(pageid=self.page_ids[title], nochange='')
+            return {'edit': result}
+        old_revid = revisions[-1]['revid'] if revisions else 0
+        revision = self._save_revision(title, params['text'], session['user'],
+                                       params.get('summary', ''))
+        if old_revid == 0:
+            result['new'] = ''
+        result.update(pageid=self.page_ids[title], oldrevid=old_revid,
+                      newrevid=revision['revid'], newtimestamp=revision['timestamp'])
+        return {'edit': result}
+
+    def _upload(self, params: dict, session: dict) -> dict:
+        self._check_write(params, session)
+        if params.get('stash') or params.get('filekey'):
+            raise ApiError('notimplemented', 'The fake wiki does not support chunked uploads.')
+        data = params.get('file')
+        if not isinstance(data, bytes):
+            raise ApiError('missingparam', 'One of the parameters filekey, file, url is '
+                                           'required.')
+        title = self._normalize(f'File:{params.get("filename", "")}')
+        sha1 = hashlib.sha1(data).hexdigest()
+        versions = self.files.get(title, [])
+        if not params.get('ignorewarnings'):
+            warnings = {}
+            if versions:
+                warnings['exists'] = title.split(':', 1)[1]
+            duplicates = [other.split(':', 1)[1] for other, other_versions in self.files.items()
+                          if other_versions[-1]['sha1'] == sha1]
+            if duplicates:
+                warnings['duplicate'] = duplicates
+            if warnings:
+                return {'upload': {'result': 'Warning', 'warnings': warnings,
+                                   'filekey': secrets.token_hex(8)}}
+        version = self._save_file(title, data, session['user'], params.get('comment', ''))
+        if title not in self.pages:
+            # the file description page; its creation is in the upload log, not recent edits
+            self._save_revision(title, params.get('text') or params.get('comment', ''),
+                                session['user'], params.get('comment', ''), log_change=False)
+        return {'upload': {'result': 'Success', 'filename': title.split(':', 1)[1],
+                           'imageinfo': self._image_info(title, version,
+                                                         {'iiprop': 'timestamp|user|comment|'
+                                                                    'sha1|size|url|mime'})}}
+
+    # ---- state changes ----
+
+    def _save_revision(self, title: str, text: str, user: str, comment: str,
+                       log_change: bool = True) -> dict:
+        revisions = self.pages.setdefault(title, [])
+        if title not in self.page_ids:
+            self.page_ids[title] = self._take_id()
+        revision = {'revid': self._take_id(),
+                    'parentid': revisions[-1]['revid'] if revisions else 0,
+                    'timestamp': _now(), 'user': user, 'comment': comment, 'text': text,
+                    'sha1': hashlib.sha1(text.encode()).hexdigest()}
+        revisions.append(revision)
+        if log_change:
+            change_type = 'edit' if revision['parentid'] else 'new'
+            self._log_change(change_type, title, revision)
+        return revision
+
+    def _save_file(self, title: str, data: bytes, user: str, comment: str) -> dict:
+        width = height = 0
+        mime = 'application/octet-stream'
+        try:
+            with Image.open(BytesIO(data)) as image:
+                width, height = image.size
+                mime = Image.MIME.get(image.format, mime)
+        except UnidentifiedImageError:
+            pass
+        version = {'data': data, 'sha1': hashlib.sha1(data).hexdigest(), 'size': len(data),
+                   'width': width, 'height': height, 'mime': mime, 'timestamp': _now(),
+                   'user': user, 'comment': comment}
+        versions = self.files.setdefault(title, [])
+        versions.append(version)
+        upload = {'revid': 0, 'parentid': 0, 'timestamp': version['timestamp'], 'user': user,
+                  'comment': comment}
+        self._log_change('log', title, upload, logtype='upload',
+                         logaction='overwrite' if len(versions) > 1 else 'upload')
+        return version
+
+    def _log_change(self, change_type: str, title: str, revision: dict, **log_info):
+        change = {'type': change_type, 'ns': self._namespace(title), 'title': title,
+                  'pageid': self.page_ids.get(title, 0), 'revid': revision['revid'],
+                  'old_revid': revision['parentid'], 'rcid': self._take_id(),
+                  'timestamp': revision['timestamp'], 'user': revision['user'],
+                  'comment': revision['comment']}
+        if log_info:
+            change.update(log_info, logparams={})
+        self.recent_changes.append(change)
+
+    def _take_id(self) -> int:
+        new_id = self._next_id
+        self._next_id += 1
+        return new_id
+
+    # ---- titles ----
+
+    def _normalize(self, title: str) -> str:
+        """Normalize a title the way MediaWiki does, with first-letter case sensitivity."""
+        title = title.replace('_', ' ').strip()
+        namespace = ''
+        if ':' in title:
+            prefix, rest = title.split(':', 1)
+            prefix = prefix.strip().capitalize()
+            if prefix in NAMESPACES.values() and prefix:
+                namespace, title = prefix + ':', rest.strip()
+        if title:
+            title = title[0].upper() + title[1:]
+        return namespace + title
+
+    @staticmethod
+    def _namespace(title: str) -> int:
+        if ':' in title:
+            prefix = title.split(':', 1)[0]
+            for ns, name in NAMESPACES.items():
+                if name and name == prefix:
+                    return ns
+        return 0
+
+    def _redirect_target(self, title: str) -> Optional[str]:
+        revisions = self.pages.get(title)
+        if not revisions:
+            return None
+        text = revisions[-1]['text'].lstrip()
+        if text[:9].upper() != '#REDIRECT' or '[[' not in text:
+            return None
+        target = text.split('[[', 1)[1].split(']]', 1)[0].split('|', 1)[0]
+        return self._normalize(target)
+
+
+class FakeWikiRequestHandler(BaseHTTPRequestHandler):
+    """Serves api.php, and the contents of uploaded files under images/."""
+    server_version = 'FakeWiki/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith('/images/'):
+            data = self.server.wiki.file_data(unquote(url.path[len('/images/'):]))
+            if data is None:
+                self.send_error(404)
+                return
+            self._send(data, 'application/octet-stream')
+        elif url.path == '/api.php':
+            self._api(dict(parse_qsl(url.query, keep_blank_values=True)))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/api.php':
+            self.send_error(404)
+            return
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                if part.get_filename() is not None:
+                    params[name] = part.get_payload(decode=True)
+                else:
+                    params[name] = part.get_payload(decode=True).decode()
+        else:
+            params.update(parse_qsl(body.decode(), keep_blank_values=True))
+        self._api(params)
+
+    def _api(self, params: dict):
+        wiki = self.server.wiki
+        result, session_id = wiki.handle(params, self._session_id())
+        headers = {'Set-Cookie': f'{SESSION_COOKIE}={session_id}; Path=/; HttpOnly'}
+        if result.get('error', {}).get('code') == 'maxlag':
+            headers.update({'Retry-After': str(wiki.retry_after),
+                            'X-Database-Lag': str(int(params['maxlag']) + 1)})
+        self._send(json.dumps(result).encode(), 'application/json; charset=utf-8', headers)
+
+    def _session_id(self) -> Optional[str]:
+        for cookie in self.headers.get('Cookie', '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == SESSION_COOKIE:
+                return value
+        return None
+
+    def _send(self, data: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        log.debug('%s - %s', self.address_string(), format % args)
+
+
+class FakeWikiServer(ThreadingHTTPServer):
+    """HTTP server for a FakeWiki. Requests are answered concurrently, like a real wiki."""
+    daemon_threads = True
+
+    def __init__(self, wiki: FakeWiki, port: int = 0):
+        """Bind to the given port on localhost (0 picks any free port) without serving yet."""
+        super().__init__(('localhost', port), FakeWikiRequestHandler)
+        self.wiki = wiki
+        wiki.base_url = f'http://{self.host}/'
+
+    @property
+    def host(self) -> str:
+        """The host and port to give mwclient.Site to connect to this server."""
+        return f'localhost:{self.server_address[1]}'
+
+
+def start_fake_wiki(username: str, password: str, port: int = 0, **options) -> FakeWikiServer:
+    """Start a fake wiki server in a background thread, returning the running server.
+
+    Args:
+        username: the username that can log in
+        password: the password for that user
+        port: the port to listen on, or 0 for any free port
+        options: extra arguments for FakeWiki (latency, edit_limit, lag_rate)
+    """
+    server = FakeWikiServer(FakeWiki(username, password, **options), port)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local stand-in for the wiki API.')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--username', default='Bot@QBE')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds to wait before answering every request')
+    parser.add_argument('--edit-limit', type=int, default=None,
+                        help='edits and uploads allowed per minute before ratelimited errors')
+    parser.add_argument('--lag-rate', type=float, default=0.0,
+                        help='fraction of requests refused because of (pretend) replication lag')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG)
+    wiki = FakeWiki(args.username, args.password, args.latency, args.edit_limit, args.lag_rate)
+    server = FakeWikiServer(wiki, args.port)
+    print(f'Fake wiki running at http://{server.host}/api.php '
+          f'(username {args.username}, password {args.password})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
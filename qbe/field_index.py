@@ -0,0 +1,64 @@
+"""Index of the wiki template field values of all objects, for 'hasfield:' searches."""
+from typing import Collection, Dict, Iterable, Optional, Set
+
+# Fields worked out from an object's tiles, which for objects with several tile variants means
+# rendering all of them. They aren't indexed, so that nothing is rendered at startup (searches for
+# them look up the field of each object instead).
+IMAGE_FIELDS = ('image', 'gif', 'overrideimages', 'unidentifiedimage')
+
+
+class FieldIndex:
+    """The values of a list of wiki template fields for every wiki-eligible object, stored as one
+    column per field that maps object names to the field's value (as a string).
+
+    Many fields are derived from the object's blueprint by fairly slow properties of
+    QudObjectWiki, so they are worked out once for the whole game (see IndexBuilder) rather
+    than for every object each time a search is made."""
+
+    def __init__(self, fields: Iterable[str], gamever: str):
+        """Create an empty index. Objects are added with add().
+
+        Args:
+            fields: the names of the fields to index, such as config['Templates']['Fields']
+            gamever: the version of Caves of Qud the objects are from
+        """
+        self.fields = tuple(fields)
+        self.gamever = gamever
+        self.columns: Dict[str, Dict[str, str]] = {field: {} for field in self.fields
+                                                   if field not in IMAGE_FIELDS}
+        # the names of the objects having each value of a field, by field; filled in for a field
+        # the first time its values are searched for
+        self._values: Dict[str, Dict[str, Set[str]]] = {}
+
+    def is_current(self, fields: Iterable[str], gamever: str) -> bool:
+        """Whether the index is of the given fields and game version, so it is still usable."""
+        return self.fields == tuple(fields) and self.gamever == gamever
+
+    def add(self, qud_object):
+        """Add the field values of an object, if it is wiki-eligible."""
+        if not qud_object.is_wiki_eligible():
+            return
+        # all worked out before any are stored, so an object is never left half indexed
+        values = [(field, getattr(qud_object, field)) for field in self.columns]
+        for field, value in values:
+            if value is not None:
+                self.columns[field][qud_object.name] = str(value)
+
+    def covers(self, field: str) -> bool:
+        """Whether the given field is indexed (it is one of the fields, but not an image
+        field)."""
+        return field in self.columns
+
+    def objects_with(self, field: str, value: Optional[str] = None) -> Collection[str]:
+        """Return the names of the wiki-eligible objects that have an indexed field, or that have
+        the given value for it."""
+        column = self.columns[field]
+        if value is None:
+            return column.keys()
+        values = self._values.get(field)
+        if values is None:
+            values = {}
+            for name, object_value in column.items():
+                values.setdefault(object_value, set()).add(name)
+            self._values[field] = values
+        return values.get(value, set())
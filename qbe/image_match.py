@@ -0,0 +1,82 @@
+"""Fast pixel comparison of rendered images against images from the wiki."""
+import hashlib
+import threading
+import weakref
+from typing import Dict, Iterator, List
+
+from PIL import Image
+
+# point() lookup table that turns an alpha channel into a mask of the pixels that aren't fully
+# transparent
+_OPAQUE_MASK = [0] + [255] * 255
+# frame digests of our rendered animations, by id() of the animation. PIL images aren't hashable,
+# so entries are removed by a weakref finalizer when their animation is garbage collected
+_frame_digests: Dict[int, List[bytes]] = {}
+_frame_digests_lock = threading.Lock()
+
+
+def normalized_pixels(image: Image.Image) -> bytes:
+    """Return the RGBA pixel data of an RGBA image, with the color of all fully transparent
+    pixels set to (0, 0, 0, 0) so that it doesn't affect comparisons."""
+    if image.mode != 'RGBA':
+        raise ValueError('Unexpected non-RGBA image type')
+    alpha = image.getchannel('A')
+    if alpha.getextrema()[0] > 0:
+        return image.tobytes()  # no fully transparent pixels
+    blank = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    return Image.composite(image, blank, alpha.point(_OPAQUE_MASK)).tobytes()
+
+
+def images_match(image1: Image.Image, image2: Image.Image) -> bool:
+    """Determines if two RGBA images are the same, comparing all of their pixels at once. Will
+    ignore any color differences in fully transparent pixels."""
+    if image1.size != image2.size:
+        return False
+    return normalized_pixels(image1) == normalized_pixels(image2)
+
+
+def frame_digest(frame: Image.Image) -> bytes:
+    """Return a digest of the normalized pixels of a single image or animation frame, in any
+    mode. Frames that match (see images_match) always have the same digest."""
+    return hashlib.blake2b(normalized_pixels(frame.convert('RGBA')), digest_size=16).digest()
+
+
+def iter_frame_digests(gif: Image.Image) -> Iterator[bytes]:
+    """Yield the digest of each frame of an animation, decoding each frame only when its digest
+    is asked for. Raises EOFError if the animation ends before its reported number of frames."""
+    for index in range(getattr(gif, 'n_frames', 1)):
+        gif.seek(index)
+        yield frame_digest(gif)
+
+
+def frame_digests(gif: Image.Image) -> List[bytes]:
+    """Return the digests of all frames of one of our rendered animations (such as
+    QudObject.gif_image()), which are cached for as long as the animation is around."""
+    key = id(gif)
+    with _frame_digests_lock:
+        digests = _frame_digests.get(key)
+    if digests is None:
+        digests = list(iter_frame_digests(gif))
+        gif.seek(0)
+        with _frame_digests_lock:
+            if key not in _frame_digests:
+                weakref.finalize(gif, _frame_digests.pop, key, None)
+            _frame_digests[key] = digests
+    return digests
+
+
+def gifs_match(gif: Image.Image, rendered_gif: Image.Image) -> bool:
+    """Determines if an animation (such as one downloaded from the wiki) has the same frames as
+    one of our rendered animations. Will ignore any color differences in fully transparent pixels.
+
+    The digests of the rendered animation's frames are cached (see frame_digests), and the other
+    animation's frames are only decoded up to the first one that doesn't match."""
+    if gif.size != rendered_gif.size:
+        return False
+    ours = frame_digests(rendered_gif)
+    if getattr(gif, 'n_frames', 1) != len(ours):
+        return False
+    for theirs, our_digest in zip(iter_frame_digests(gif), ours):
+        if theirs != our_digest:
+            return False
+    return True
@@ -0,0 +1,46 @@
+"""Background building of the search indexes of all game objects."""
+import logging
+from typing import Iterable
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+log = logging.getLogger(__name__)
+
+
+class IndexBuilderSignals(QObject):
+    """Signals emitted by IndexBuilder. Created on the GUI thread, so that connected slots run
+    there."""
+    # the finished index
+    built = Signal(object)
+
+
+class IndexBuilder(QRunnable):
+    def __init__(self, index, qud_objects: Iterable):
+        """Adds a collection of objects to an index (such as a FieldIndex or BlueprintIndex) in a
+        background thread. Start it with QThreadPool.start(); the index is emitted by
+        signals.built unless the build is cancelled.
+
+        Args:
+            index: the empty index, which must have an add() method taking one object
+            qud_objects: the objects to index, such as all the values of GameRoot's object index
+        """
+        super().__init__()
+        self.setAutoDelete(False)  # the caller keeps a reference so that it can cancel the build
+        self.index = index
+        self.qud_objects = list(qud_objects)
+        self.signals = IndexBuilderSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop building the index, at the next object."""
+        self.cancelled = True
+
+    def run(self):
+        for qud_object in self.qud_objects:
+            if self.cancelled:
+                return
+            try:
+                self.index.add(qud_object)
+            except Exception:
+                log.exception('Indexing %s failed', qud_object.name)
+        self.signals.built.emit(self.index)
@@ -0,0 +1,87 @@
+"""Crash-safe record of the objects each wiki job has finished, so interrupted jobs can resume."""
+import json
+import sqlite3
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Iterable, List, Optional
+
+JOURNAL_FILE = 'job_journal.sqlite'
+
+
+class JobJournal:
+    """SQLite journal of background wiki jobs and the state of each object in them.
+
+    Each object's state is committed as soon as the object is finished, so if QBE crashes, is
+    closed, or the job is cancelled or fails partway, the journal still knows exactly which objects
+    are left. Journals of jobs that finished every object are deleted."""
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        """Open the journal database, creating it if necessary.
+
+        Args:
+            path: the filename of the SQLite database to use
+        """
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()  # one connection is shared by all upload worker threads
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode = WAL')  # cheap commits after every object
+            self._db.execute('CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY,'
+                             ' description TEXT, gamever TEXT, started TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS items (job_id INTEGER, key TEXT,'
+                             ' position INTEGER, state TEXT, result TEXT,'
+                             ' PRIMARY KEY (job_id, key))')
+
+    def start(self, description: str, gamever: str, keys: Iterable[str]) -> 'JournalEntry':
+        """Record a new job over the objects with the given keys (object IDs), all pending."""
+        started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock, self._db:
+            job_id = self._db.execute('INSERT INTO jobs (description, gamever, started)'
+                                      ' VALUES (?, ?, ?)',
+                                      (description, gamever, started)).lastrowid
+            self._db.executemany('INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, NULL)',
+                                 [(job_id, key, position, 'pending')
+                                  for position, key in enumerate(keys)])
+        return JournalEntry(self, job_id)
+
+    def unfinished(self, description: str, gamever: str) -> Optional['JournalEntry']:
+        """Return the most recent job with this description and game version that has objects
+        left to do, or None if there isn't one."""
+        with self._lock:
+            row = self._db.execute('SELECT id FROM jobs WHERE description = ? AND gamever = ?'
+                                   ' AND EXISTS (SELECT 1 FROM items WHERE items.job_id = jobs.id'
+                                   " AND items.state != 'done')"
+                                   ' ORDER BY id DESC LIMIT 1', (description, gamever)).fetchone()
+        return None if row is None else JournalEntry(self, row[0])
+
+
+class JournalEntry:
+    """The journal of one job. Passed to Job, which records each object as it is finished."""
+
+    def __init__(self, journal: JobJournal, job_id: int):
+        self._journal = journal
+        self.job_id = job_id
+
+    def items(self) -> List[tuple]:
+        """Return a (key, state, result) tuple for each object in the job, in their original
+        order. The state is 'pending', 'done' or 'failed', and the result is whatever was
+        recorded for a finished object (or None)."""
+        with self._journal._lock:
+            rows = self._journal._db.execute('SELECT key, state, result FROM items'
+                                             ' WHERE job_id = ? ORDER BY position',
+                                             (self.job_id,)).fetchall()
+        return [(key, state, None if result is None else json.loads(result))
+                for key, state, result in rows]
+
+    def record(self, key: str, succeeded: bool, result=None):
+        """Record that an object is finished, along with any JSON-serializable result."""
+        with self._journal._lock, self._journal._db:
+            self._journal._db.execute('UPDATE items SET state = ?, result = ?'
+                                      ' WHERE job_id = ? AND key = ?',
+                                      ('done' if succeeded else 'failed', json.dumps(result),
+                                       self.job_id, key))
+
+    def complete(self):
+        """Delete the journal, once every object is done (or the job is no longer wanted)."""
+        with self._journal._lock, self._journal._db:
+            self._journal._db.execute('DELETE FROM items WHERE job_id = ?', (self.job_id,))
+            self._journal._db.execute('DELETE FROM jobs WHERE id = ?', (self.job_id,))
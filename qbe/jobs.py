@@ -0,0 +1,135 @@
+"""Background jobs for long-running wiki operations, such as scanning and uploading."""
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from time import monotonic
+from typing import Callable, Iterable, Optional
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+log = logging.getLogger(__name__)
+
+
+class JobSignals(QObject):
+    """Signals emitted by a Job. Created on the GUI thread, so that connected slots run there."""
+    # items done, items total, throughput (items per second), estimated seconds remaining
+    progress = Signal(int, int, float, float)
+    # a short description of what the job is currently doing
+    message = Signal(str)
+    # items done, items failed, whether the job was cancelled
+    finished = Signal(int, int, bool)
+
+
+class Job(QRunnable):
+    def __init__(self, description: str, items: Iterable, handler: Callable,
+                 workers: int = 1, prepare: Optional[Callable[[list], None]] = None,
+                 describe: Callable[[object], str] = str, journal=None):
+        """A background job that calls a handler on each of a list of items.
+
+        Start the job with QThreadPool.start(). Progress is reported through the job's signals,
+        and the job can be stopped early with cancel(). An exception raised by the handler for
+        one item is logged and counted as a failure, but doesn't stop the job.
+
+        Args:
+            description: a short description of the job, for the status bar
+            items: the items to pass to the handler, one at a time
+            handler: a function taking one item, called in a background thread
+            workers: the number of items to handle at once
+            prepare: an optional function taking the list of all items, called in the background
+                     thread before any items are handled (for example, to batch network requests)
+            describe: a function returning a short description of an item, for the log. Must be
+                      unique to the item if a journal is given, since it is used as the item's key
+            journal: an optional JournalEntry (see job_journal.py) in which to record each item as
+                     it is finished, along with the handler's return value. The journal is
+                     completed once every item has been handled without failing
+        """
+        super().__init__()
+        self.setAutoDelete(False)  # the caller keeps a reference for as long as it needs one
+        self.description = description
+        self.items = list(items)
+        self.handler = handler
+        self.workers = workers
+        self.prepare = prepare
+        self.describe = describe
+        self.journal = journal
+        self.signals = JobSignals()
+        self._cancelled = False
+        self._start_time = 0.0
+        self._done = 0
+        self._failed = 0
+        self._count_lock = Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called on this job."""
+        return self._cancelled
+
+    def cancel(self):
+        """Stop the job as soon as the items currently being handled are finished."""
+        self._cancelled = True
+
+    def run(self):
+        """Called by QThreadPool in a background thread to do the job's work."""
+        self._start_time = monotonic()
+        try:
+            if self.prepare is not None and not self._cancelled:
+                self.signals.message.emit(f'{self.description}: preparing...')
+                self.prepare(self.items)
+            self._report_progress()
+            if self.workers > 1:
+                self._run_concurrently()
+            else:
+                for item in self.items:
+                    if self._cancelled:
+                        break
+                    self._handle(item)
+                    self._report_progress()
+        except Exception:
+            log.exception('%s failed', self.description)
+            self._failed += len(self.items) - self._done
+        finally:
+            if self.journal is not None and not self._cancelled and not self._failed \
+                    and self._done == len(self.items):
+                self.journal.complete()
+            self.signals.finished.emit(self._done, self._failed, self._cancelled)
+
+    def _run_concurrently(self):
+        """Handle the items in a pool of worker threads, reporting progress as each finishes."""
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            pending = {executor.submit(self._handle, item) for item in self.items}
+            while pending:
+                if self._cancelled:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    break
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if done:
+                    self._report_progress()
+        finally:
+            executor.shutdown(wait=True)
+
+    def _handle(self, item):
+        """Call the handler on one item, counting (rather than raising) any failure."""
+        failed = False
+        result = None
+        try:
+            result = self.handler(item)
+        except Exception:
+            log.exception('%s failed for %s', self.description, self.describe(item))
+            failed = True
+        if self.journal is not None:
+            try:
+                self.journal.record(self.describe(item), not failed, result)
+            except Exception:
+                log.exception('Unable to record %s in the job journal', self.describe(item))
+        with self._count_lock:
+            self._done += 1
+            self._failed += failed
+
+    def _report_progress(self):
+        """Emit the progress signal with current throughput and estimated time remaining."""
+        elapsed = monotonic() - self._start_time
+        rate = self._done / elapsed if elapsed > 0 else 0.0
+        remaining = len(self.items) - self._done
+        eta = remaining / rate if rate > 0 else 0.0
+        self.signals.progress.emit(self._done, len(self.items), rate, eta)
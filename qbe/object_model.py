@@ -0,0 +1,261 @@
+"""Item model for the tree of Qud objects shown in the main window."""
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from hagadias.qudobject import QudObject
+from PIL import Image, ImageQt
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, QObject, QPersistentModelIndex, \
+    QRunnable, QSize, QThreadPool, Qt, Signal
+from PySide6.QtGui import QColor, QFont, QIcon, QImage, QPixmap
+
+from qbe.config import config
+
+log = logging.getLogger(__name__)
+
+# the role under which each index holds its row's QudObject (the same role QStandardItem.data()
+# uses by default, so that the search filters can treat the population tree alike)
+OBJECT_ROLE = Qt.UserRole + 1
+# the column (display name) in which each object's tile is shown as an icon
+ICON_COLUMN = 1
+# the columns holding the results of wiki scans and uploads
+STATUS_COLUMNS = range(3, 9)
+# every icon that can be shown in a status column; each is stored as its position in this tuple
+STATUS_ICONS = ('', '✅', '❌', '⮿', '-')
+GREY = QColor.fromRgb(100, 100, 100)
+# Looking up Qt enum members is slow in PySide6, and data() is called for every cell shown, so
+# the roles it answers are looked up once here.
+DISPLAY_ROLE = Qt.ItemDataRole.DisplayRole
+DECORATION_ROLE = Qt.ItemDataRole.DecorationRole
+FONT_ROLE = Qt.ItemDataRole.FontRole
+FOREGROUND_ROLE = Qt.ItemDataRole.ForegroundRole
+ALIGNMENT_ROLE = Qt.ItemDataRole.TextAlignmentRole
+SIZE_HINT_ROLE = Qt.ItemDataRole.SizeHintRole
+ALIGN_CENTER = Qt.AlignmentFlag.AlignCenter
+ITEM_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+ICON_SIZE = QSize(250, 25)
+blank_image = Image.new('RGBA', (16, 24), color=(0, 0, 0, 0))
+
+
+class RowText(NamedTuple):
+    """The text shown in an object's row, which is worked out once the row is first shown."""
+    display_name: str
+    wiki_eligible: bool
+    article_override: str
+    namespace: str
+
+
+class IconSignals(QObject):
+    """Signals emitted by IconRenderer. Created on the GUI thread, so that connected slots run
+    there."""
+    # object name, rendered tile (a null QImage if the object has no tile to show)
+    rendered = Signal(str, QImage)
+
+
+class IconRenderer(QRunnable):
+    def __init__(self, qud_object, signals: IconSignals):
+        """Renders the small tile of an object in a background thread, for its tree icon."""
+        super().__init__()
+        self.qud_object = qud_object
+        self.signals = signals
+
+    def run(self):
+        image = QImage()
+        try:
+            tile = self.qud_object.tile
+            if tile is not None and not tile.hasproblems:
+                # a deep copy, since ImageQt only references the PIL image's data
+                image = ImageQt.ImageQt(tile.image).copy()
+        except Exception:
+            log.exception('Rendering the tile of %s failed', self.qud_object.name)
+        self.signals.rendered.emit(self.qud_object.name, image)
+
+
+class QudObjectModel(QAbstractItemModel):
+    """Model of the Qud object tree, read directly from the QudObject hierarchy.
+
+    Nothing is copied from the hierarchy up front: rows are looked up in the QudObjects' children
+    when a view asks for them, and each index points to its QudObject. The only state kept per
+    object is the icon in each status column, in a byte array with one byte per status column for
+    each object that has had a status set, and a few strings cached once they have been shown.
+
+    Rendering every tile in the game takes a while, so the tile icons in the display name column
+    are rendered in a background thread the first time a view asks for them (when their rows
+    become visible), with a blank placeholder shown until they are ready."""
+
+    def __init__(self, header_labels: List[str], parent=None):
+        super().__init__(parent)
+        self.header_labels = header_labels
+        self._root: Optional[QudObject] = None
+        # children of each object (by id) whose rows have been asked for, and the row of each
+        self._children: Dict[int, tuple] = {}
+        self._rows: Dict[int, int] = {}
+        # display name, wiki eligibility, article override and namespace of each shown object
+        self._row_text: Dict[int, RowText] = {}
+        # position of each object's statuses in _statuses, by object name
+        self._status_slots: Dict[str, int] = {}
+        self._statuses = bytearray()
+        self._bold = QFont()
+        self._bold.setBold(True)
+        self._icons: Dict[str, QIcon] = {}
+        # objects whose icons are being rendered, and where to show them once they are
+        self._rendering: Dict[str, QPersistentModelIndex] = {}
+        self._placeholder = QIcon(QPixmap.fromImage(ImageQt.ImageQt(blank_image)))
+        self._signals = IconSignals()
+        self._signals.rendered.connect(self._icon_rendered)
+        # a thread of its own, so icons don't wait for wiki jobs (and the GIL allows only one
+        # render at a time anyway)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+    def set_root(self, root: QudObject):
+        """Show the tree of QudObjects under root (usually the 'Object' object)."""
+        self.beginResetModel()
+        self._root = root
+        self._children.clear()
+        self._rows = {id(root): 0}
+        self._row_text.clear()
+        self._status_slots.clear()
+        self._statuses = bytearray()
+        self.endResetModel()
+
+    def index_of(self, qud_object: QudObject, column: int = 0) -> QModelIndex:
+        """Return the index of an object's row in the given column."""
+        if id(qud_object) not in self._rows:
+            self._child_objects(qud_object.parent)  # works out the rows of all its siblings
+        return self.createIndex(self._rows[id(qud_object)], column, qud_object)
+
+    def _child_objects(self, qud_object: QudObject) -> tuple:
+        children = self._children.get(id(qud_object))
+        if children is None:
+            children = self._children[id(qud_object)] = qud_object.children
+            for row, child in enumerate(children):
+                self._rows[id(child)] = row
+        return children
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        # checked here rather than with hasIndex(), which is much slower
+        if column < 0 or column >= len(self.header_labels) or row < 0:
+            return QModelIndex()
+        if not parent.isValid():
+            if row > 0 or self._root is None:
+                return QModelIndex()
+            return self.createIndex(row, column, self._root)
+        if parent.column() > 0:
+            return QModelIndex()
+        children = self._child_objects(parent.internalPointer())
+        if row >= len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        qud_object = index.internalPointer()
+        if qud_object is self._root:
+            return QModelIndex()
+        return self.index_of(qud_object.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if self._root is None:
+            return 0
+        if not parent.isValid():
+            return 1
+        if parent.column() > 0:
+            return 0
+        return len(self._child_objects(parent.internalPointer()))
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if not parent.isValid():
+            return self._root is not None
+        return parent.column() == 0 and not parent.internalPointer().is_leaf
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.header_labels)
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return ITEM_FLAGS
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.header_labels[section]
+        return None
+
+    def data(self, index: QModelIndex, role=DISPLAY_ROLE):
+        if not index.isValid():
+            return None
+        qud_object = index.internalPointer()
+        column = index.column()
+        if role == DISPLAY_ROLE:
+            if column == 0:
+                return qud_object.name
+            if column in STATUS_COLUMNS:
+                return self.status(qud_object, column)
+            text = self._text(qud_object)
+            if column == ICON_COLUMN:
+                return text.display_name
+            return text.article_override if column == 2 else text.namespace
+        if role == OBJECT_ROLE:
+            return qud_object
+        if role == DECORATION_ROLE and column == ICON_COLUMN:
+            return self._icon(qud_object, index)
+        if role == ALIGNMENT_ROLE and column > 2:
+            return ALIGN_CENTER
+        if role == FONT_ROLE and column == 0 and self._text(qud_object).wiki_eligible:
+            return self._bold
+        if role == FOREGROUND_ROLE:
+            if column == 0 and not self._text(qud_object).wiki_eligible:
+                return GREY
+            if column in STATUS_COLUMNS and self.status(qud_object, column) == '⮿':
+                return GREY
+        if role == SIZE_HINT_ROLE and column == ICON_COLUMN:
+            return ICON_SIZE
+        return None
+
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        """Set the icon shown in a status column."""
+        if not index.isValid() or index.column() not in STATUS_COLUMNS or role != Qt.EditRole:
+            return False
+        name = index.internalPointer().name
+        slot = self._status_slots.get(name)
+        if slot is None:
+            slot = self._status_slots[name] = len(self._statuses)
+            self._statuses.extend(bytes(len(STATUS_COLUMNS)))
+        self._statuses[slot + index.column() - STATUS_COLUMNS.start] = STATUS_ICONS.index(value)
+        self.dataChanged.emit(index, index, [DISPLAY_ROLE, FOREGROUND_ROLE])
+        return True
+
+    def status(self, qud_object: QudObject, column: int) -> str:
+        """Return the icon shown in one of an object's status columns."""
+        slot = self._status_slots.get(qud_object.name)
+        if slot is None:
+            return ''
+        return STATUS_ICONS[self._statuses[slot + column - STATUS_COLUMNS.start]]
+
+    def _text(self, qud_object: QudObject) -> RowText:
+        text = self._row_text.get(id(qud_object))
+        if text is None:
+            text = RowText(qud_object.displayname, qud_object.is_wiki_eligible(),
+                           config['Wiki']['Article overrides'].get(qud_object.name, ''),
+                           qud_object.wiki_namespace())
+            self._row_text[id(qud_object)] = text
+        return text
+
+    def _icon(self, qud_object: QudObject, index: QModelIndex) -> QIcon:
+        """Return the icon of an object, starting to render it if needed."""
+        icon = self._icons.get(qud_object.name)
+        if icon is not None:
+            return icon
+        if qud_object.name not in self._rendering:
+            self._rendering[qud_object.name] = QPersistentModelIndex(index)
+            self._pool.start(IconRenderer(qud_object, self._signals))
+        return self._placeholder
+
+    def _icon_rendered(self, name: str, image: QImage):
+        self._icons[name] = self._placeholder if image.isNull() \
+            else QIcon(QPixmap.fromImage(image))
+        index = self._rendering.pop(name, None)
+        if index is not None and index.isValid():
+            index = self.index(index.row(), index.column(), index.parent())
+            self.dataChanged.emit(index, index, [DECORATION_ROLE])
@@ -53,6 +53,8 @@ class Ui_MainWindow(object):
         self.actionUpload_extra_image_s_for_selected_objects.setObjectName(u"actionUpload_extra_image_s_for_selected_objects")
         self.actionDiff_template_against_wiki = QAction(MainWindow)
         self.actionDiff_template_against_wiki.setObjectName(u"actionDiff_template_against_wiki")
+        self.actionDiff_templates_for_selected_objects = QAction(MainWindow)
+        self.actionDiff_templates_for_selected_objects.setObjectName(u"actionDiff_templates_for_selected_objects")
         self.actionSuppress_image_comparison_popups = QAction(MainWindow)
         self.actionSuppress_image_comparison_popups.setObjectName(u"actionSuppress_image_comparison_popups")
         self.actionSuppress_image_comparison_popups.setCheckable(True)
@@ -282,6 +284,7 @@ class Ui_MainWindow(object):
         self.menuView.addAction(self.actionToggle_Qud_mode)
         self.menuWiki.addAction(self.actionScan_wiki)
         self.menuWiki.addAction(self.actionDiff_template_against_wiki)
+        self.menuWiki.addAction(self.actionDiff_templates_for_selected_objects)
         self.menuWiki.addAction(self.actionUpload_templates)
         self.menuWiki.addAction(self.actionUpload_tiles)
         self.menuWiki.addAction(self.actionUpload_extra_image_s_for_selected_objects)
@@ -309,6 +312,7 @@ class Ui_MainWindow(object):
         self.actionShow_help.setText(QCoreApplication.translate("MainWindow", u"Show help", None))
         self.actionUpload_extra_image_s_for_selected_objects.setText(QCoreApplication.translate("MainWindow", u"Upload extra image(s) for selected objects", None))
         self.actionDiff_template_against_wiki.setText(QCoreApplication.translate("MainWindow", u"Diff template against wiki", None))
+        self.actionDiff_templates_for_selected_objects.setText(QCoreApplication.translate("MainWindow", u"Diff templates for selected objects (report)", None))
         self.actionSuppress_image_comparison_popups.setText(QCoreApplication.translate("MainWindow", u"Suppress image comparison pop-ups", None))
         self.actionToggle_Qud_mode.setText(QCoreApplication.translate("MainWindow", u"Toggle Qud mode", None))
         self.tile_label.setText("")
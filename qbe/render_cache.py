@@ -0,0 +1,168 @@
+"""Persistent cache of rendered big tiles and GIF animations, so they are only rendered once."""
+import hashlib
+import importlib.metadata
+import sqlite3
+import time
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+from typing import Optional
+
+from hagadias.qudobject import QudObject
+from hagadias.qudtile import QudTile
+from PIL import Image
+
+from qbe.encoded_image import EncodedImage
+
+RENDER_CACHE_FILE = 'render_cache.sqlite'
+# The least recently used renders are evicted once the stored image data grows beyond this size.
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# Number of recently used renders that are also kept decoded in memory.
+MEMORY_ITEMS = 128
+# Part of every key, since a new hagadias version may render tiles differently.
+_HAGADIAS_VERSION = importlib.metadata.version('hagadias')
+
+
+class RenderCache:
+    """SQLite cache of the encoded PNG and GIF data of rendered tiles, with an in-memory LRU cache
+    of the most recently used ones in front of it.
+
+    Renders are keyed by everything that goes into them: the game and hagadias versions, the
+    object (which may add animations or a fake prefab overlay), the tile index, and the tile's
+    source path and colors. The data itself is stored once per distinct content (by SHA-1 hash),
+    so identical renders of different objects share their storage."""
+
+    def __init__(self, path: str = RENDER_CACHE_FILE, max_bytes: int = MAX_CACHE_BYTES,
+                 memory_items: int = MEMORY_ITEMS):
+        """Open the cache database, creating it if necessary.
+
+        Args:
+            path: the filename of the SQLite database to use
+            max_bytes: the size of the stored image data above which old renders are evicted
+            memory_items: the number of renders to also keep decoded in memory
+        """
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()  # one connection is shared by all upload worker threads
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory: 'OrderedDict[str, EncodedImage]' = OrderedDict()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode = WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY,'
+                             ' sha1 TEXT, used REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS renders_used ON renders (used)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS blobs (sha1 TEXT PRIMARY KEY,'
+                             ' size INTEGER, data BLOB)')
+
+    def big_tile(self, qud_object: QudObject, tile: QudTile, gamever: str,
+                 index: int = 0) -> EncodedImage:
+        """Return the big (160x240) PNG version of one of an object's tiles.
+
+        Parameters:
+            qud_object: the object the tile belongs to
+            tile: the tile, such as qud_object.tile or one of qud_object.tiles_and_metadata()[0]
+            gamever: the version of Caves of Qud
+            index: the index of the tile among the object's tiles
+        """
+        key = _render_key('png', qud_object, tile, gamever, index)
+        cached = self._get(key)
+        if cached is None:
+            cached = self._put(key, EncodedImage.png(tile.get_big_image()))
+        return cached
+
+    def animation(self, qud_object: QudObject, gamever: str,
+                  index: int = 0) -> Optional[EncodedImage]:
+        """Return the GIF animation of one of an object's tiles, or None if it isn't animated.
+
+        Parameters:
+            qud_object: the object
+            gamever: the version of Caves of Qud
+            index: the index of the tile among the object's tiles
+        """
+        if not qud_object.has_gif_tile():
+            return None
+        tiles = qud_object.tiles_and_metadata()[0] if index > 0 else [qud_object.tile]
+        if index >= len(tiles) or tiles[index] is None:
+            return None
+        key = _render_key('gif', qud_object, tiles[index], gamever, index)
+        cached = self._get(key)
+        if cached is None:
+            gif = qud_object.gif_image(index)
+            if gif is None:
+                return None
+            cached = self._put(key, EncodedImage.gif(gif))
+        return cached
+
+    def _get(self, key: str) -> Optional[EncodedImage]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            with self._db:
+                row = self._db.execute('SELECT data FROM renders JOIN blobs USING (sha1)'
+                                       ' WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                self._db.execute('UPDATE renders SET used = ? WHERE key = ?',
+                                 (time.time(), key))
+            encoded = _decode(row[0])
+            self._remember(key, encoded)
+        return encoded
+
+    def _put(self, key: str, encoded: EncodedImage) -> EncodedImage:
+        sha1 = hashlib.sha1(encoded.data).hexdigest()
+        with self._lock:
+            with self._db:
+                self._db.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)',
+                                 (sha1, encoded.data.nbytes, encoded.data))
+                self._db.execute('INSERT OR REPLACE INTO renders VALUES (?, ?, ?)',
+                                 (key, sha1, time.time()))
+                self._evict()
+            self._remember(key, encoded)
+        return encoded
+
+    def _remember(self, key: str, encoded: EncodedImage):
+        self._memory[key] = encoded
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop the least recently used renders until the stored data fits in max_bytes."""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute('SELECT key, sha1 FROM renders ORDER BY used').fetchall()
+        for key, sha1 in rows:
+            self._db.execute('DELETE FROM renders WHERE key = ?', (key,))
+            if self._db.execute('SELECT 1 FROM renders WHERE sha1 = ?', (sha1,)).fetchone():
+                continue  # still used by another render
+            size = self._db.execute('SELECT size FROM blobs WHERE sha1 = ?',
+                                    (sha1,)).fetchone()[0]
+            self._db.execute('DELETE FROM blobs WHERE sha1 = ?', (sha1,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Drop all stored renders."""
+        with self._lock, self._db:
+            self._memory.clear()
+            self._db.execute('DELETE FROM renders')
+            self._db.execute('DELETE FROM blobs')
+
+
+def _render_key(kind: str, qud_object: QudObject, tile: QudTile, gamever: str,
+                index: int) -> str:
+    parts = (kind, gamever, _HAGADIAS_VERSION, qud_object.name, index, tile.filename,
+             tile.colorstring, tile.raw_tilecolor, tile.raw_detailcolor, tile.raw_transparent)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _decode(data: bytes) -> EncodedImage:
+    """Return an EncodedImage for stored PNG or GIF data."""
+    buffer = BytesIO(data)
+    image = Image.open(buffer)
+    if image.format == 'PNG':
+        image.load()  # rather than lazily, in whichever thread first uses the shared image
+    return EncodedImage(image, buffer.getbuffer())
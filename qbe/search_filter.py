@@ -1,49 +1,139 @@
 """Search filters for the QBE application window."""
-from PySide6.QtCore import QSortFilterProxyModel, Qt, QRegularExpression, QItemSelectionModel
+import logging
+from bisect import bisect_right
+from typing import Callable, Collection, Iterable, List, Optional, Set, Tuple
+
+from PySide6.QtCore import QItemSelectionModel, QModelIndex, QObject, QRunnable, \
+    QSortFilterProxyModel, QThreadPool, QTimer, Signal
 from PySide6.QtWidgets import QLineEdit
 
+from qbe.blueprint_index import BlueprintIndex
+from qbe.field_index import FieldIndex
+from qbe.object_model import OBJECT_ROLE
+from qbe.search_index import SearchIndex, row_key
+from qbe.search_query import QueryError, Text, compile_query
 from qbe.tree_view import QudTreeView
 
+log = logging.getLogger(__name__)
+
+# how long typing has to pause before the search box searches
+SEARCH_DELAY_MS = 250
+
 
 class QudFilterModel(QSortFilterProxyModel):
-    """Custom QBE filter proxy for the object or population tree view."""
+    """Custom QBE filter proxy for the object or population tree view.
+
+    Searches are answered from a SearchIndex of the source model, which is built when the first
+    search is made. Each query is looked up in the index once, and the rows to show (the matches
+    and their ancestors, so that matching objects are displayed in their inheritance tree) are
+    kept in a set that filterAcceptsRow() checks."""
     def __init__(self, parent=None):
         super(QudFilterModel, self).__init__(parent)
-        self.setRecursiveFilteringEnabled = True
         self.setFilterKeyColumn(0)
-        self.filterSelections = []
-        self.filterSelectionIDs = []
-        # use of separate itemIDs list is a workaround for issue bugreports.qt.io/browse/PYSIDE-74,
-        # which causes errors when using the 'in' operator on the filterSelections list's QItems
-
-    def pop_selections(self):
-        """Wipe the list of filtered items and return what they previously were."""
-        val1 = self.filterSelections
-        val2 = self.filterSelectionIDs
-        self.filterSelections = []
-        self.filterSelectionIDs = []
-        return val1, val2
-
-    def _accept_index(self, idx) -> bool:
-        """Perform recursive search on an index.
-
-        Causes ancestors of matching objects to be displayed as an inheritance tree, even if the
-        ancestors themselves don't match the filter."""
-        if idx.isValid():
-            filter_str = self.filterRegularExpression().pattern().lower()
-            text = idx.data(role=Qt.DisplayRole).lower()
-            # use QRegularExpression method?
-            found = text.find(filter_str) >= 0
-            if found:
-                item = self.sourceModel().itemFromIndex(idx)
-                if item.isSelectable() and id(item) not in self.filterSelectionIDs:
-                    self.filterSelections.append(item)
-                    self.filterSelectionIDs.append(id(item))
-                return True
-            for childnum in range(idx.model().rowCount(idx)):
-                if self._accept_index(idx.model().index(childnum, 0, idx)):
-                    return True
-        return False
+        self._search_index = None
+        # the current query, the nodes of the search index that match it in tree order, and the
+        # nodes to show (None to show everything)
+        self.query = ''
+        self.matches: List[int] = []
+        self._accepted: Optional[Set[int]] = None
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        self._forget_search_index()
+        # the index is built again by the next search after the tree changes
+        model.modelReset.connect(self._forget_search_index)
+        model.rowsInserted.connect(self._forget_search_index)
+        model.rowsRemoved.connect(self._forget_search_index)
+
+    def _forget_search_index(self, *args):
+        # the nodes of the current query are numbered in the old index
+        self._search_index = None
+        self.query = ''
+        self.matches = []
+        self._accepted = None
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """The search index of the source model. Built on first use, which must be on the GUI
+        thread since it reads the source model."""
+        if self._search_index is None:
+            self._search_index = SearchIndex.from_model(self.sourceModel(), self.search_texts)
+        return self._search_index
+
+    def search_texts(self, idx: QModelIndex) -> Iterable[str]:
+        """Return the text(s) that a row can be found by, given the source model index of its
+        first column."""
+        return [idx.data()]
+
+    def plain_text(self, query: str) -> Optional[str]:
+        """Return the lowercase text that a query searches for, or None if it searches for
+        something else."""
+        return query.lower()
+
+    def query_matches(self, query: str, previous: Optional[Tuple[str, List[int]]] = None,
+                      search_index: Optional[SearchIndex] = None) -> List[int]:
+        """Return the search index nodes matching a search query, in tree order.
+
+        Args:
+            query: the search query
+            previous: an earlier query and its matches. If both queries are plain text and the
+                new one contains the earlier one (as it does while it is being typed), only the
+                earlier matches are searched again.
+            search_index: the search index to search, if not the current one
+        """
+        if search_index is None:
+            search_index = self.search_index
+        text = self.plain_text(query)
+        if previous is not None and text is not None:
+            previous_text = self.plain_text(previous[0])
+            if previous_text is not None and previous_text in text:
+                return search_index.refine(previous[1], text)
+        return self.evaluate_query(query, search_index)
+
+    def evaluate_query(self, query: str, search_index: SearchIndex) -> List[int]:
+        """Return the nodes of a search index matching a search query, in tree order, searching
+        all of them."""
+        return search_index.find(query.lower())
+
+    def filter_for(self, query: str, previous: Optional[Tuple[str, List[int]]] = None,
+                   search_index: Optional[SearchIndex] = None) \
+            -> Tuple[List[int], Optional[Set[int]]]:
+        """Return the search index nodes matching a search query and the nodes to show for it
+        (None to show everything), to be passed to apply_query().
+
+        Given a search index built beforehand on the GUI thread, it only uses that index (and
+        never the source model), so it can run in a background thread. See query_matches() for
+        the arguments."""
+        if not query:
+            return [], None
+        if search_index is None:
+            search_index = self.search_index
+        matches = self.query_matches(query, previous, search_index)
+        return matches, search_index.closure(matches)
+
+    def apply_query(self, query: str, matches: List[int], accepted: Optional[Set[int]]):
+        """Filter the tree to a query's filter, worked out by filter_for()."""
+        self.query = query
+        self.matches = matches
+        self._accepted = accepted
+        # Dropping the proxy's mapping of the tree is much faster than refiltering it row by row
+        # (which asks the source model for the parent of every row many times over), and only
+        # the rows the view shows are mapped again.
+        self.invalidate()
+
+    def set_query(self, query: str) -> List[int]:
+        """Filter the tree to the rows matching a search query (or show all rows if the query is
+        empty), and return the matching search index nodes in tree order."""
+        self.apply_query(query, *self.filter_for(query))
+        return self.matches
+
+    def node_at(self, source_index: QModelIndex) -> Optional[int]:
+        """Return the search index node of a source model index's row."""
+        return self.search_index.node_of.get(row_key(source_index.row(), source_index.parent()))
+
+    def source_index(self, node: int) -> QModelIndex:
+        """Return the source model index of the first column of a search index node's row."""
+        return self.search_index.model_index(self.sourceModel(), node)
 
     def filterAcceptsRow(self, source_row, source_parent):
         """Overrides filterAcceptsRow to determine if the row should be included.
@@ -54,79 +144,227 @@ class QudFilterModel(QSortFilterProxyModel):
 
         The default implementation returns true if the value held by the relevant item matches the
         filter string, wildcard string or regular expression."""
-        idx = self.sourceModel().index(source_row, 0, source_parent)  # 0 = first column
-        return self._accept_index(idx)
+        if self._accepted is None:
+            return True
+        return self.search_index.node_of.get(row_key(source_row, source_parent)) in self._accepted
 
 
 class QudObjFilterModel(QudFilterModel):
-    """Custom filter proxy for the object tree view."""
-
-    def _accept_index(self, idx) -> bool:
-        """Override function includes special handling for object search modifiers like 'hasfield:'
-        and 'haspart:'"""
-        if idx.isValid():
-            filter_str = self.filterRegularExpression().pattern().lower()
-            if filter_str.startswith('hasfield:'):
-                found = self._index_hasfield(idx, filter_str.split(':')[1])
-            elif filter_str.startswith('haspart:'):
-                found = self._index_haspart(idx,
-                                            self.filterRegularExpression().pattern().split(':')[1])
-            elif filter_str.startswith('hastag:'):
-                found = self._index_hastag(idx,
-                                           self.filterRegularExpression().pattern().split(':')[1])
+    """Custom filter proxy for the object tree view, which finds objects by their ID or display
+    name, and understands the query language of search_query.py (with search modifiers like
+    'hasfield:' and 'haspart:', comparisons, AND, OR and NOT).
+
+    Queries are compiled into a plan that is evaluated by an ObjectSearch of the indexes."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # the values of the wiki template fields, once they have been indexed in the background;
+        # until then, field searches look up the field of each object
+        self.field_index: Optional[FieldIndex] = None
+        # likewise, the parts and tags of all objects, for 'haspart:' and 'hastag:' searches
+        self.blueprint_index: Optional[BlueprintIndex] = None
+
+    def search_texts(self, idx: QModelIndex) -> Iterable[str]:
+        qud_object = idx.data(OBJECT_ROLE)
+        return [qud_object.name, qud_object.displayname]
+
+    def plain_text(self, query: str) -> Optional[str]:
+        """Override function returns None for queries using the query language."""
+        try:
+            plan = compile_query(query)
+        except QueryError:
+            return query.lower()
+        return plan.text if isinstance(plan, Text) else None
+
+    def evaluate_query(self, query: str, search_index: SearchIndex) -> List[int]:
+        """Override function evaluates the query language, treating queries that don't follow it
+        (such as one still being typed) as plain text."""
+        try:
+            plan = compile_query(query)
+        except QueryError:
+            return super().evaluate_query(query, search_index)
+        return sorted(plan.evaluate(ObjectSearch(search_index, self.field_index,
+                                                 self.blueprint_index)))
+
+    def search_modifiers(self) -> List[str]:
+        """Return the searches with modifiers that the indexes built so far know to be possible,
+        such as 'hasfield:tier' and 'haspart:Render', for completing searches."""
+        modifiers = []
+        if self.field_index is not None:
+            modifiers += [f'hasfield:{field}' for field in self.field_index.fields]
+        if self.blueprint_index is not None:
+            modifiers += [f'haspart:{part}' for part in self.blueprint_index.part_names()]
+            modifiers += [f'hastag:{tag}' for tag in self.blueprint_index.tag_names()]
+        return modifiers
+
+
+class ObjectSearch:
+    """Looks up the terms of a compiled query (see search_query.py) in one set of search
+    indexes, each method giving the set of search index nodes that match one term.
+
+    Terms the indexes can't answer (fields that aren't indexed, or any field, part or tag before
+    the indexes are built) look at the properties of each object instead, in whichever thread the
+    search runs in. That is safe in the same way as it is for IndexBuilder and the wiki jobs:
+    the properties are worked out from blueprints that nothing changes once the game is loaded,
+    so the worst that can happen when two threads work out an uncached property at once is that
+    both do the work and one of the (equal) results is kept."""
+
+    def __init__(self, search_index: SearchIndex, field_index: Optional[FieldIndex] = None,
+                 blueprint_index: Optional[BlueprintIndex] = None):
+        """
+        Args:
+            search_index: the search index of the object tree
+            field_index: the index of the wiki template fields, if it has been built; until
+                         then, field searches look up the field of each object
+            blueprint_index: likewise, the index of the parts and tags of all objects
+        """
+        self.search_index = search_index
+        self.field_index = field_index
+        self.blueprint_index = blueprint_index
+
+    def all_nodes(self) -> Set[int]:
+        return set(range(len(self.search_index)))
+
+    def nodes_with_text(self, text: str) -> Set[int]:
+        return set(self.search_index.find(text))
+
+    def nodes_inheriting(self, name: str) -> Set[int]:
+        node = self.search_index.object_node(name)
+        return set() if node is None else set(self.search_index.subtree(node))
+
+    def nodes_with_field(self, field: str, value: Optional[str] = None,
+                         test: Optional[Callable[[str], bool]] = None,
+                         within: Optional[Set[int]] = None) -> Set[int]:
+        """Return the nodes (in within, if given) of the wiki-eligible objects that have a wiki
+        template field, with the given value or one passing the given test, if any."""
+        objects = self.search_index.objects
+        if self.field_index is not None and self.field_index.covers(field):
+            column = self.field_index.columns[field]
+            if test is None:
+                return self._object_nodes(self.field_index.objects_with(field, value), within)
+            if within is None:
+                return self._object_nodes(
+                    {name for name, object_val in column.items() if test(object_val)}, within)
+            return {node for node in within
+                    if objects[node].name in column and test(column[objects[node].name])}
+        return {node for node in (within if within is not None else range(len(objects)))
+                if self._hasfield(objects[node], field, value, test)}
+
+    def nodes_with_element(self, element_tag: str, name: str, value: Optional[str] = None,
+                           within: Optional[Set[int]] = None) -> Set[int]:
+        """Return the nodes (in within, if given) of the wiki-eligible objects that have a part
+        or tag (element_tag 'part' or 'tag'), or the given value for one of its attributes."""
+        attr = f'{element_tag}_{name}'
+        objects = self.search_index.objects
+        if self.blueprint_index is not None:
+            if element_tag == 'part':
+                names = self.blueprint_index.objects_with_part(name)
             else:
-                text = idx.data(role=Qt.DisplayRole).lower()
-                # use QRegularExpression method?
-                found = text.find(self.filterRegularExpression().pattern().lower()) >= 0
-            if found:
-                item = self.sourceModel().itemFromIndex(idx)
-                if item.isSelectable() and id(item) not in self.filterSelectionIDs:
-                    self.filterSelections.append(item)
-                    self.filterSelectionIDs.append(id(item))
-                return True
-            for childnum in range(idx.model().rowCount(idx)):
-                if self._accept_index(idx.model().index(childnum, 0, idx)):
-                    return True
-        return False
+                names = self.blueprint_index.objects_with_tag(name)
+            nodes = self._object_nodes(names, within)
+            if value is None:
+                return nodes
+            return {node for node in nodes if self._has_value(objects[node], attr, value)}
+        return {node for node in (within if within is not None else range(len(objects)))
+                if self._haselement(objects[node], attr, value)}
 
-    def _index_hasfield(self, idx, field: str) -> bool:
+    def _object_nodes(self, names: Collection[str], within: Optional[Set[int]]) -> Set[int]:
+        """Return the nodes of the named objects (in within, if given)."""
+        if within is not None and len(within) < len(names):
+            objects = self.search_index.objects
+            return {node for node in within if objects[node].name in names}
+        nodes = {self.search_index.object_node(name) for name in names}
+        nodes.discard(None)
+        return nodes if within is None else nodes & within
+
+    @staticmethod
+    def _hasfield(qud_object, field: str, target_val: Optional[str],
+                  test: Optional[Callable[[str], bool]]) -> bool:
         """Perform 'hasfield:' search; match only objects with the specified wiki template field"""
-        target_val = None
-        if len(field.split('=')) == 2:
-            target_val = field.split('=')[1]
-            field = field.split('=')[0]
-        qud_object = self.sourceModel().itemFromIndex(idx).data()
         object_val = getattr(qud_object, field)
         if object_val is not None:
             if qud_object.is_wiki_eligible():
+                if test is not None:
+                    return test(str(object_val))
                 return target_val is None or target_val == str(object_val)
         return False
 
-    def _index_haspart(self, idx, part: str) -> bool:
-        """Perform 'haspart:' search; match only objects with the specified part (case sensitive)"""
-        qud_object = self.sourceModel().itemFromIndex(idx).data()
-        if getattr(qud_object, f'part_{part}') is not None:
+    @classmethod
+    def _haselement(cls, qud_object, attr: str, value: Optional[str]) -> bool:
+        """Perform 'haspart:' or 'hastag:' search; match only objects with the specified part or
+        tag (case sensitive)"""
+        if getattr(qud_object, attr) is not None:
             if qud_object.is_wiki_eligible():
-                return True
+                return value is None or cls._has_value(qud_object, attr, value)
         return False
 
-    def _index_hastag(self, idx, tag: str) -> bool:
-        """Perform 'hastag:' search; match only objects with the specified tag (case sensitive)"""
-        qud_object = self.sourceModel().itemFromIndex(idx).data()
-        if getattr(qud_object, f'tag_{tag}') is not None:
-            if qud_object.is_wiki_eligible():
-                return True
-        return False
+    @staticmethod
+    def _has_value(qud_object, attr: str, value: str) -> bool:
+        """Whether a part or tag attribute of an object has the given value (ignoring case)."""
+        return str(getattr(qud_object, attr)).lower() == value.lower()
 
 
 class QudPopFilterModel(QudFilterModel):
     """Custom filter proxy for the population tree view."""
 
 
+class SearchSignals(QObject):
+    """Signals emitted by SearchRunner. Created on the GUI thread, so that connected slots run
+    there."""
+    # the search's generation, query and search index, the matching nodes and the nodes to show
+    finished = Signal(int, str, object, object, object)
+
+
+class SearchRunner(QRunnable):
+    def __init__(self, generation: int, proxy: QudFilterModel, query: str,
+                 previous: Optional[Tuple[str, List[int]]], signals: SearchSignals):
+        """Works out the filter for a search query in a background thread (see
+        QudFilterModel.filter_for()), and emits it with signals.finished unless the search is
+        cancelled first. Only the search index captured when the search is made is used, so
+        that the tree model is never read from the background thread.
+
+        Args:
+            generation: the number of the search, so that results of stale searches that are
+                        emitted before they are cancelled can be told apart
+            proxy: the proxy filter
+            query: the search query
+            previous: the proxy's current query and matches, which the search may narrow down
+            signals: the signals to emit the filter with
+        """
+        super().__init__()
+        self.setAutoDelete(False)  # the handler keeps a reference so that it can cancel it
+        self.generation = generation
+        self.proxy = proxy
+        self.search_index = proxy.search_index  # built here, on the GUI thread, if need be
+        self.query = query
+        self.previous = previous
+        self.signals = signals
+        self.cancelled = False
+
+    def cancel(self):
+        """Drop the search, if it hasn't finished yet."""
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            matches, accepted = self.proxy.filter_for(self.query, self.previous, self.search_index)
+        except Exception:
+            log.exception('Searching for %s failed', self.query)
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, self.query, self.search_index, matches,
+                                       accepted)
+
+
 class QudSearchBehaviorHandler:
     def __init__(self, search_edit: QLineEdit, proxy: QudFilterModel, tree_view: QudTreeView):
         """Handles searching behavior for a search text box associated with a tree view.
 
+        Searches are made once typing pauses for SEARCH_DELAY_MS, and run in a background thread;
+        a search made before the previous one has finished cancels it.
+
         Args:
             search_edit: The search edit bar widget
             proxy: The proxy filter for the tree view
@@ -135,6 +373,17 @@ class QudSearchBehaviorHandler:
         self.search_edit = search_edit
         self.proxy_filter = proxy
         self.tree_view = tree_view
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.start_search)
+        self.search_signals = SearchSignals()
+        self.search_signals.finished.connect(self.search_finished)
+        # one search at a time, so a cancelled search never holds up the next one for long
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(1)
+        self._generation = 0
+        self.current_search: Optional[SearchRunner] = None
 
     @property
     def source_model(self):
@@ -146,43 +395,85 @@ class QudSearchBehaviorHandler:
 
         By default, the search box only begins filtering after 4 or more letters are entered.
         However, you can override that and search with fewer letters by hitting ENTER ('Forced'
-        mode). You can also hit ENTER to move to the next match for an existing/active search
-        query."""
-        if len(self.search_edit.text()) <= 3:
+        mode), which also searches without waiting for typing to pause. You can also hit ENTER to
+        move to the next match for an existing/active search query."""
+        text = self.search_edit.text()
+        if mode == 'Forced' and text != '':
+            self.search_timer.stop()
+            if text == self.proxy_filter.query and self.current_search is None:
+                self.select_next_match()  # the matches are already known
+            else:
+                self.start_search()
+        elif len(text) <= 3:
             self.clear_search_filter(False)
-        if len(self.search_edit.text()) > 3 \
-                or (mode == 'Forced' and self.search_edit.text() != ''):
-            self.proxy_filter.pop_selections()  # clear any lingering data in proxyfilter
-            self.proxy_filter.setFilterRegularExpression(  # apply the actual filtering
-                QRegularExpression(self.search_edit.text()))
-            self.tree_view.expandAll()  # expands to show everything visible after filter applied
-            items, item_ids = self.proxy_filter.pop_selections()
-            if len(items) > 0:
-                item = items[0]
-                if mode == 'Forced':  # go to next filtered item each time the user presses ENTER
-                    self.tree_view.items_selected = self.tree_view.selectedIndexes()
-                    if self.tree_view.items_selected is not None \
-                            and self.tree_view.selected_row_count() == 1:
-                        currentitem = self.source_model.itemFromIndex(
-                            self.proxy_filter.mapToSource(self.tree_view.items_selected[0]))
-                        if id(currentitem) in item_ids:
-                            newindex = item_ids.index(id(currentitem)) + 1
-                            if newindex < len(items):
-                                item = items[newindex]
-                idx = self.source_model.indexFromItem(item)
-                idx = self.proxy_filter.mapFromSource(idx)
-                self.tree_view.selectionModel().select(
-                    idx, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
-                self.scroll_to_selected()
+        else:
+            self.search_timer.start()  # restarted by each change while typing
 
     def search_changed_forced(self):
         self.search_changed('Forced')
 
+    def start_search(self):
+        """Search for the text in the search box in the background, cancelling any search still
+        running."""
+        self.cancel_search()
+        self._generation += 1
+        previous = (self.proxy_filter.query, self.proxy_filter.matches) \
+            if self.proxy_filter.query else None
+        self.current_search = SearchRunner(self._generation, self.proxy_filter,
+                                           self.search_edit.text(), previous, self.search_signals)
+        self._pool.start(self.current_search)
+
+    def cancel_search(self):
+        """Cancel the search in progress, if any."""
+        if self.current_search is not None:
+            self.current_search.cancel()
+            self._pool.tryTake(self.current_search)  # if it hasn't started yet
+            self.current_search = None
+            self._generation += 1  # drops its results, if they were emitted already
+
+    def search_finished(self, generation: int, query: str, search_index: SearchIndex,
+                        matches: List[int], accepted: Optional[Set[int]]):
+        """Show the results of a search, unless a newer search has been made since or the tree
+        has changed (so that the search index it used is out of date)."""
+        if generation != self._generation:
+            return
+        self.current_search = None
+        if search_index is not self.proxy_filter.search_index:
+            return
+        self.proxy_filter.apply_query(query, matches, accepted)
+        self.tree_view.expandAll()  # expands to show everything visible after filter applied
+        if len(matches) > 0:
+            self.select_node(matches[0])
+
+    def select_next_match(self):
+        """Select the match after the selected row, or the first match."""
+        matches = self.proxy_filter.matches
+        if len(matches) == 0:
+            return
+        node = matches[0]
+        self.tree_view.items_selected = self.tree_view.selectedIndexes()
+        if self.tree_view.items_selected is not None and self.tree_view.selected_row_count() == 1:
+            current = self.proxy_filter.node_at(
+                self.proxy_filter.mapToSource(self.tree_view.items_selected[0]))
+            position = bisect_right(matches, current) if current is not None else 0
+            if 0 < position < len(matches) and matches[position - 1] == current:
+                node = matches[position]
+        self.select_node(node)
+
+    def select_node(self, node: int):
+        """Select and scroll to the row of a search index node."""
+        idx = self.proxy_filter.mapFromSource(self.proxy_filter.source_index(node))
+        self.tree_view.selectionModel().select(
+            idx, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+        self.scroll_to_selected()
+
     def clear_search_filter(self, clearfield: bool = False):
         """Remove any filtering that has been applied to the tree view."""
+        self.search_timer.stop()
+        self.cancel_search()
         if clearfield and len(self.search_edit.text()) > 0:
             self.search_edit.clear()
-        self.proxy_filter.setFilterRegularExpression('')
+        self.proxy_filter.set_query('')
         self.scroll_to_selected()
 
     def scroll_to_selected(self):
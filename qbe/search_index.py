@@ -0,0 +1,161 @@
+"""Prebuilt index of the rows of a tree model, for searching the object and population trees."""
+from bisect import bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from PySide6.QtCore import QAbstractItemModel, QModelIndex
+
+from qbe.object_model import OBJECT_ROLE
+
+
+def row_key(row: int, parent: QModelIndex) -> tuple:
+    """Return a hashable key identifying a row of a tree model, given the index of its parent.
+
+    The key is worked out from the parent, so that filterAcceptsRow() doesn't have to look up the
+    index of the row itself."""
+    return row, parent.row(), parent.internalId()
+
+
+class SearchIndex:
+    """The rows of a tree model in preorder, with the lowercase search text of all of them joined
+    into one string.
+
+    Rows are referred to by their number in preorder ('node'), so a search for some text is a
+    scan of the joined string for it, and the rows a filter has to show are the matching nodes
+    plus their ancestors (see closure())."""
+
+    def __init__(self):
+        # for each node: its row_key(), its row under its parent, the node number of its parent
+        # (-1 for top level rows), and the data of its OBJECT_ROLE (its QudObject, if any)
+        self.keys: List[tuple] = []
+        self.rows: List[int] = []
+        self.parents: List[int] = []
+        self.objects: list = []
+        self.node_of: Dict[tuple, int] = {}
+        self._texts: List[str] = []
+        # the joined search text, and where each node's text starts in it
+        self._text = ''
+        self._starts: List[int] = []
+        # the node after the last descendant of each node, so that the descendants of node n are
+        # the nodes in range(n + 1, ends[n])
+        self.ends: List[int] = []
+        self._object_nodes: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_model(cls, model: QAbstractItemModel,
+                   texts: Callable[[QModelIndex], Iterable[str]]) -> 'SearchIndex':
+        """Index every row of a tree model.
+
+        Args:
+            model: the model, such as a QudObjectModel
+            texts: a function returning the text(s) a row can be found by, given the index of its
+                   first column
+        """
+        index = cls()
+        # rows still to add, with the number of rows, index and node of their parent
+        stack = [(0, model.rowCount(), QModelIndex(), -1)]
+        while stack:
+            row, rows, parent, parent_node = stack.pop()
+            if row >= rows:
+                continue
+            stack.append((row + 1, rows, parent, parent_node))  # its next sibling
+            child = model.index(row, 0, parent)
+            node = index.add(row_key(row, parent), row, parent_node, child.data(OBJECT_ROLE),
+                             texts(child))
+            if model.hasChildren(child):
+                # its first child, which comes before its next sibling
+                stack.append((0, model.rowCount(child), child, node))
+        return index.finish()
+
+    def add(self, key: tuple, row: int, parent: int, qud_object, texts: Iterable[str]) -> int:
+        """Add a node, after its parent and previous siblings. Returns its node number."""
+        node = len(self.keys)
+        self.keys.append(key)
+        self.rows.append(row)
+        self.parents.append(parent)
+        self.objects.append(qud_object)
+        self.node_of[key] = node
+        self._texts.append('\n'.join(text.lower() for text in texts if text))
+        return node
+
+    def finish(self) -> 'SearchIndex':
+        """Build the joined search text once all nodes have been added."""
+        self._starts = []
+        position = 0
+        for text in self._texts:
+            self._starts.append(position)
+            position += len(text) + 1
+        self._text = '\0'.join(self._texts)
+        self._texts = []
+        self.ends = [node + 1 for node in range(len(self.keys))]
+        for node in reversed(range(len(self.keys))):
+            parent = self.parents[node]
+            if parent >= 0 and self.ends[node] > self.ends[parent]:
+                self.ends[parent] = self.ends[node]
+        return self
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def find(self, text: str) -> List[int]:
+        """Return the nodes whose search text contains the given lowercase text, in preorder."""
+        nodes = []
+        if not text:
+            return nodes
+        position = self._text.find(text)
+        while position >= 0:
+            node = bisect_right(self._starts, position) - 1
+            nodes.append(node)
+            if node + 1 >= len(self._starts):
+                break
+            position = self._text.find(text, self._starts[node + 1])
+        return nodes
+
+    def node_text(self, node: int) -> str:
+        """Return the lowercase search text of a node."""
+        end = self._starts[node + 1] - 1 if node + 1 < len(self._starts) else len(self._text)
+        return self._text[self._starts[node]:end]
+
+    def refine(self, nodes: Iterable[int], text: str) -> List[int]:
+        """Return those of the given nodes whose search text contains the given lowercase text.
+
+        Used to narrow down the results of a search for some text contained in this text, which
+        are the only nodes that can match."""
+        return [node for node in nodes if text in self.node_text(node)]
+
+    def select(self, predicate: Callable[[object], bool]) -> List[int]:
+        """Return the nodes whose object (OBJECT_ROLE data) the predicate is true for, in
+        preorder."""
+        return [node for node, qud_object in enumerate(self.objects)
+                if qud_object is not None and predicate(qud_object)]
+
+    def subtree(self, node: int) -> range:
+        """Return a node and all of its descendants."""
+        return range(node, self.ends[node])
+
+    def object_node(self, name: str) -> Optional[int]:
+        """Return the node of the object with the given name, if there is one."""
+        if self._object_nodes is None:
+            self._object_nodes = {qud_object.name: node
+                                  for node, qud_object in enumerate(self.objects)
+                                  if qud_object is not None and hasattr(qud_object, 'name')}
+        return self._object_nodes.get(name)
+
+    def closure(self, nodes: Iterable[int]) -> Set[int]:
+        """Return the given nodes together with all of their ancestors."""
+        closure = set()
+        for node in nodes:
+            while node >= 0 and node not in closure:
+                closure.add(node)
+                node = self.parents[node]
+        return closure
+
+    def model_index(self, model: QAbstractItemModel, node: int) -> QModelIndex:
+        """Return the index of the first column of a node's row in the model."""
+        path = []
+        while node >= 0:
+            path.append(self.rows[node])
+            node = self.parents[node]
+        index = QModelIndex()
+        for row in reversed(path):
+            index = model.index(row, 0, index)
+        return index
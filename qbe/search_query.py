@@ -0,0 +1,318 @@
+"""Query language of the object search box, compiled into set operations over the search indexes.
+
+A query is made of terms, combined with AND, OR, NOT (in capitals) and parentheses. Terms next to
+each other are ANDed together, and AND binds more tightly than OR. The terms are:
+
+    some text            objects whose ID or display name contains the text (words that aren't
+                         part of another term are searched for together, as a phrase)
+    "some text"          the same, for text that would otherwise be read as another term
+    hasfield:tier        objects with a wiki template field
+    hasfield:tier=3      objects with that value for a field
+    haspart:Render_Tile  objects with a part, or a part attribute (case sensitive)
+    haspart:Physics_Takeable=false
+                         objects with that value for a part attribute
+    hastag:Tier          objects with a tag, or a tag attribute (case sensitive)
+    inherits:Item        an object and all objects that inherit from it
+    hp>=50               objects with a field compared to a number (also >, <, <=, = and !=)
+    tier:3..5            objects with a field in a range of numbers (either end may be left out)
+    tier:3               objects with that value for a field
+
+For example, 'inherits:Item tier=8 NOT hasfield:image' finds tier 8 items without a wiki tile.
+
+Comparisons and ranges must name one of the wiki template fields in config.yml. A query that
+doesn't follow the language (such as one with a misspelled field name, or a colon in text to search
+for) is searched for as text.
+"""
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+from qbe.config import config
+
+# a parenthesis, a quoted phrase, or a word
+_TOKEN = re.compile(r'\s*(?:([()])|"([^"]*)"?|([^\s()"]+))')
+_MODIFIER = re.compile(r'(hasfield|haspart|hastag|inherits):(.*)', re.IGNORECASE)
+_COMPARISON = re.compile(r'([a-z]\w*)(>=|<=|!=|>|<|=)(.+)', re.IGNORECASE)
+_FIELD_VALUE = re.compile(r'([a-z]\w*):(.+)', re.IGNORECASE)
+_OPERATORS = ('AND', 'OR', 'NOT')
+# the wiki template fields that comparisons and ranges can be made on
+_FIELDS = frozenset(config['Templates']['Fields'])
+
+
+class QueryError(ValueError):
+    """Raised for a search query that doesn't follow the query language."""
+
+
+def number(text: str) -> Optional[float]:
+    """Return the value of a field as a number, or None if it isn't one."""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class Plan:
+    """A compiled query (or part of one). Evaluated against an ObjectSearch (see search_filter.py),
+    which looks up the terms in the search indexes, giving the set of search index nodes that
+    match.
+
+    Terms that have to check the objects they find one by one (like comparisons of field values)
+    are evaluated after the others they are ANDed with, and only check the nodes those left."""
+    # whether the plan checks objects one by one
+    checks_objects = False
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        """Return the matching nodes (only those in within, if given)."""
+        raise NotImplementedError
+
+
+class Text(Plan):
+    def __init__(self, text: str):
+        self.text = text.lower()
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        return _restrict(indexes.nodes_with_text(self.text), within)
+
+
+class Field(Plan):
+    def __init__(self, field: str, value: Optional[str] = None,
+                 test: Optional[Callable[[str], bool]] = None):
+        """Objects having a wiki template field, with the given value (compared as in the old
+        'hasfield:' searches), or a value passing the given test."""
+        self.field = field.lower()
+        self.value = value
+        self.test = test
+        self.checks_objects = test is not None
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        return indexes.nodes_with_field(self.field, self.value, self.test, within)
+
+
+class Part(Plan):
+    def __init__(self, element_tag: str, name: str, value: Optional[str] = None):
+        """Objects having a part or tag (element_tag 'part' or 'tag'), or the given value for
+        one of its attributes."""
+        self.element_tag = element_tag
+        self.name = name
+        self.value = value
+        self.checks_objects = value is not None
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        return indexes.nodes_with_element(self.element_tag, self.name, self.value, within)
+
+
+class Inherits(Plan):
+    def __init__(self, name: str):
+        self.name = name
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        return _restrict(indexes.nodes_inheriting(self.name), within)
+
+
+class And(Plan):
+    def __init__(self, plans: List[Plan]):
+        # negated terms are subtracted from the others rather than complemented
+        wanted = [plan for plan in plans if not isinstance(plan, Not)]
+        self.wanted = sorted(wanted, key=lambda plan: plan.checks_objects)
+        self.unwanted = sorted((plan.plan for plan in plans if isinstance(plan, Not)),
+                               key=lambda plan: plan.checks_objects)
+        self.checks_objects = any(plan.checks_objects for plan in plans)
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        nodes = within if within is not None else indexes.all_nodes()
+        for plan in self.wanted:
+            if not nodes:
+                return nodes
+            nodes = plan.evaluate(indexes, nodes)
+        for plan in self.unwanted:
+            if not nodes:
+                break
+            nodes = nodes - plan.evaluate(indexes, nodes)
+        return nodes
+
+
+class Or(Plan):
+    def __init__(self, plans: List[Plan]):
+        self.plans = plans
+        self.checks_objects = any(plan.checks_objects for plan in plans)
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        nodes = set()
+        for plan in self.plans:
+            nodes |= plan.evaluate(indexes, within)
+        return nodes
+
+
+class Not(Plan):
+    def __init__(self, plan: Plan):
+        self.plan = plan
+        self.checks_objects = plan.checks_objects
+
+    def evaluate(self, indexes, within: Optional[Set[int]] = None) -> Set[int]:
+        nodes = within if within is not None else indexes.all_nodes()
+        return nodes - self.plan.evaluate(indexes, nodes)
+
+
+def _restrict(nodes: Set[int], within: Optional[Set[int]]) -> Set[int]:
+    return nodes if within is None else nodes & within
+
+
+def tokenize(query: str) -> List[Tuple[str, str]]:
+    """Split a query into (kind, text) tokens, kind being '(', ')', 'phrase' (quoted text),
+    'word' or one of the operators."""
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        paren, phrase, word = match.groups()
+        if paren:
+            tokens.append((paren, paren))
+        elif phrase is not None:
+            tokens.append(('phrase', phrase))
+        elif word in _OPERATORS:
+            tokens.append((word, word))
+        else:
+            tokens.append(('word', word))
+        position = match.end()
+    return tokens
+
+
+def compile_term(word: str) -> Optional[Plan]:
+    """Return the plan for a single word of a query, or None if it is plain text."""
+    match = _MODIFIER.fullmatch(word)
+    if match:
+        modifier, argument = match.group(1).lower(), match.group(2)
+        if modifier == 'inherits':
+            return Inherits(argument)
+        name, _, value = argument.partition('=')
+        if modifier == 'hasfield':
+            return Field(name, value.lower() if value else None)
+        return Part(modifier[3:], name, value if value else None)
+    match = _COMPARISON.fullmatch(word)
+    if match:
+        field, operator, value = match.groups()
+        field = _field_name(field)
+        if value[0] in '<>=!':
+            raise QueryError(f'{operator}{value[0]} is not a comparison')
+        if operator in ('=', '!='):
+            return Field(field, test=_equality_test(value, operator == '='))
+        target = number(value)
+        if target is None:
+            raise QueryError(f'{value} is not a number')
+        compare = {'>': float.__gt__, '<': float.__lt__,
+                   '>=': float.__ge__, '<=': float.__le__}[operator]
+        return Field(field, test=_numeric_test(lambda field_value: compare(field_value, target)))
+    match = _FIELD_VALUE.fullmatch(word)
+    if match:
+        field, value = match.groups()
+        field = _field_name(field)
+        if '..' in value:
+            low_text, high_text = value.split('..', 1)
+            low, high = number(low_text or 'nan'), number(high_text or 'nan')
+            if low is None or high is None:
+                raise QueryError(f'{value} is not a range of numbers')
+            # comparisons with NaN (a missing end) are always false
+            return Field(field, test=_numeric_test(
+                lambda field_value: not field_value < low and not field_value > high))
+        return Field(field, test=_equality_test(value, True))
+    return None
+
+
+def _field_name(name: str) -> str:
+    """Return the name of a wiki template field in lowercase. Raises QueryError if there is no
+    such field, so that a query with a misspelled field name, or with a colon or equals sign in
+    text to search for, is searched for as text instead."""
+    field = name.lower()
+    if field not in _FIELDS:
+        raise QueryError(f'{name} is not a wiki template field')
+    return field
+
+
+def _numeric_test(predicate: Callable[[float], bool]) -> Callable[[str], bool]:
+    """Return a test of whether a field value is a number for which the predicate is true."""
+    def test(text: str) -> bool:
+        value = number(text)
+        return value is not None and predicate(value)
+    return test
+
+
+def _equality_test(value: str, equal: bool) -> Callable[[str], bool]:
+    """Return a test of whether a field value is (or isn't) the given value, compared as numbers
+    if they both are numbers and otherwise as case-insensitive text."""
+    target = number(value)
+    value = value.lower()
+
+    def test(text: str) -> bool:
+        text_value = number(text) if target is not None else None
+        if text_value is not None:
+            return (text_value == target) == equal
+        return (text.lower() == value) == equal
+    return test
+
+
+@lru_cache(maxsize=64)
+def compile_query(query: str) -> Plan:
+    """Compile a search query into a plan. Raises QueryError if it can't be parsed."""
+    tokens = tokenize(query)
+    if not tokens:
+        raise QueryError('empty query')
+    plan, position = _parse_or(tokens, 0)
+    if position < len(tokens):
+        raise QueryError(f'unexpected {tokens[position][1]}')
+    return plan
+
+
+def _parse_or(tokens: list, position: int) -> Tuple[Plan, int]:
+    plans = []
+    while True:
+        plan, position = _parse_and(tokens, position)
+        plans.append(plan)
+        if position < len(tokens) and tokens[position][0] == 'OR':
+            position += 1
+        else:
+            break
+    return (plans[0] if len(plans) == 1 else Or(plans)), position
+
+
+def _parse_and(tokens: list, position: int) -> Tuple[Plan, int]:
+    plans = []
+    while position < len(tokens) and tokens[position][0] not in ('OR', ')'):
+        if tokens[position][0] == 'AND':
+            if not plans:
+                raise QueryError('AND without a term before it')
+            position += 1
+        plan, position = _parse_not(tokens, position)
+        plans.append(plan)
+    if not plans:
+        raise QueryError('missing search term')
+    return (plans[0] if len(plans) == 1 else And(plans)), position
+
+
+def _parse_not(tokens: list, position: int) -> Tuple[Plan, int]:
+    if position >= len(tokens):
+        raise QueryError('missing search term')
+    kind, text = tokens[position]
+    if kind == 'NOT':
+        plan, position = _parse_not(tokens, position + 1)
+        return Not(plan), position
+    if kind == '(':
+        plan, position = _parse_or(tokens, position + 1)
+        if position >= len(tokens) or tokens[position][0] != ')':
+            raise QueryError('missing )')
+        return plan, position + 1
+    if kind == 'phrase':
+        return Text(text), position + 1
+    if kind == 'word':
+        plan = compile_term(text)
+        if plan is not None:
+            return plan, position + 1
+        # plain words next to each other are one phrase, so that plain searches work as before
+        words = [text]
+        position += 1
+        while position < len(tokens) and tokens[position][0] == 'word' \
+                and compile_term(tokens[position][1]) is None:
+            words.append(tokens[position][1])
+            position += 1
+        return Text(' '.join(words)), position
+    raise QueryError(f'unexpected {text}')
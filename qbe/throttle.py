@@ -0,0 +1,125 @@
+"""Rate limiting for calls to the wiki."""
+import random
+from threading import Lock
+from time import monotonic, sleep
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Tokens are added continuously at a fixed rate, up to a maximum burst capacity. Each call to
+    acquire() takes one token, blocking until one is available. A single bucket is shared by all
+    upload workers so that together they stay within the bot account's edit rate."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """Create a new token bucket.
+
+        Args:
+            rate: the number of tokens added per second
+            capacity: the maximum number of tokens that can be saved up for a burst
+        """
+        if rate <= 0:
+            raise ValueError('Token bucket rate must be positive')
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        """Take one token from the bucket, waiting until one is available if necessary."""
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+
+
+class AdaptiveThrottle:
+    """Thread-safe pacing shared by every request to the wiki.
+
+    Writes are spaced out by a token bucket. When the wiki says we are going too fast (rate limit
+    errors, replication lag, Retry-After), all workers are paused together, rather than each
+    backing off on its own and retrying at the same moment. The edit rate is also halved, then
+    gradually restored as writes succeed again."""
+
+    def __init__(self, rate: float, min_rate: float = None, base_delay: float = 2.0,
+                 max_delay: float = 120.0):
+        """Create a new throttle.
+
+        Args:
+            rate: the maximum number of writes per second
+            min_rate: the rate to slow down to at most (default: a tenth of rate)
+            base_delay: the pause in seconds after the first refused request
+            max_delay: the longest pause in seconds, however many requests in a row were refused
+        """
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._bucket = TokenBucket(rate)
+        self._resume_at = 0.0
+        self._failures = 0
+        self._lock = Lock()
+
+    @property
+    def rate(self) -> float:
+        """The current number of writes allowed per second."""
+        return self._bucket.rate
+
+    def wait(self):
+        """Wait until any pause the wiki asked for is over. Call before reading from the wiki."""
+        while True:
+            with self._lock:
+                delay = self._resume_at - monotonic()
+            if delay <= 0:
+                return
+            sleep(delay)
+
+    def acquire(self):
+        """Wait until a write may be made. Call before every edit or upload."""
+        self.wait()
+        self._bucket.acquire()
+
+    def pause(self, seconds: float):
+        """Hold back all requests for the given number of seconds (from Retry-After, say)."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, monotonic() + seconds)
+
+    def throttled(self, retry_after: float = None) -> float:
+        """Report that the wiki refused a request for going too fast, and slow everyone down.
+
+        The pause grows exponentially with the number of refusals in a row, with random jitter
+        so that paused workers don't all retry at once.
+
+        Args:
+            retry_after: the number of seconds the wiki asked us to wait, if it said
+
+        Returns:
+            the number of seconds all requests are paused for
+        """
+        with self._lock:
+            now = monotonic()
+            if now < self._resume_at and retry_after is None:
+                # other workers' requests refused during a pause were sent before it started
+                return self._resume_at - now
+            self._failures += 1
+            cap = min(self.max_delay, self.base_delay * 2 ** (self._failures - 1))
+            delay = cap / 2 + random.uniform(0, cap / 2)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            self._resume_at = max(self._resume_at, now + delay)
+            self._bucket.rate = max(self.min_rate, self._bucket.rate / 2)
+        return delay
+
+    def succeeded(self):
+        """Report that a write went through, gradually restoring the full rate."""
+        with self._lock:
+            self._failures = 0
+            self._bucket.rate = min(self.max_rate, self._bucket.rate + self.max_rate / 10)
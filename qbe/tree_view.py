@@ -21,6 +21,9 @@ class QudTreeView(QTreeView):
         self.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setIndentation(10)
+        # every row is the same height, so the view doesn't have to ask the model for the size of
+        # each row when laying out the rows (such as after a search has expanded the tree)
+        self.setUniformRowHeights(True)
         self.header_labels = header_labels
         self.items_selected = []
         # used if we only want one of potential multiple items:
@@ -67,6 +70,9 @@ class QudObjTreeView(QudTreeView):
         self.tree_menu.addAction(self.context_action_upload_extra)
         self.context_action_diff = QAction('Diff template against wiki', self.tree_menu)
         self.tree_menu.addAction(self.context_action_diff)
+        self.context_action_diff_report = QAction('Diff templates for selected objects (report)',
+                                                  self.tree_menu)
+        self.tree_menu.addAction(self.context_action_diff_report)
         self.customContextMenuRequested.connect(self.on_context_menu)
 
     def on_context_menu(self, point):
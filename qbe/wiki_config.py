@@ -1,9 +1,145 @@
+"""Load the wiki.yml config file, and provide the shared connection to the wiki."""
+import atexit
+import json
+import logging
+import os
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
+
 import yaml
 
 from mwclient import Site
+from mwclient.errors import MaximumRetriesExceeded
+from mwclient.sleep import Sleeper, Sleepers
+from requests.cookies import create_cookie
+
+from qbe.throttle import AdaptiveThrottle
+
+if TYPE_CHECKING:
+    from qbe.fake_wiki import FakeWikiServer
+
+log = logging.getLogger(__name__)
+
+# Cookies and tokens of the last logged in session, so it can be reused next time QBE starts.
+# Only readable by the current user, since the cookies are as good as the bot password.
+SESSION_FILE = 'wiki_session.json'
 
 with open('wiki.yml') as f:
     wiki_config = yaml.safe_load(f)
 
-site = Site(wiki_config['base'], path=wiki_config['path'])
-site.login(wiki_config['username'], wiki_config['password'])
+# Sent with our requests, so that the wiki refuses them (and says when to retry) while its database
+# replicas are more than this many seconds behind, rather than letting bots add to the load.
+MAX_LAG = 5
+# All requests to the wiki go through this throttle, and all edits and uploads share its edit rate
+# (edits per minute, configured for the bot account in wiki.yml).
+wiki_throttle = AdaptiveThrottle(wiki_config.get('edit_rate', 60) / 60)
+
+_site = None
+_site_lock = Lock()  # upload workers may all need the wiki at once
+# the local stand-in for the wiki, if wiki.yml asks for one (see fake_wiki.py)
+fake_wiki_server: Optional['FakeWikiServer'] = None
+
+
+def get_site() -> Site:
+    """Return the shared wiki client, connecting and logging in the first time it is needed.
+
+    Connecting is left until a wiki operation needs it, so QBE starts quickly (and can be used to
+    browse objects) without a network connection. The session saved by the last run is reused if
+    the wiki still accepts it, so most runs don't need to log in at all."""
+    global _site, fake_wiki_server
+    with _site_lock:
+        if _site is None:
+            if 'fake_wiki' in wiki_config:
+                # only imported when asked for, so normal sessions don't load the test server
+                from qbe.fake_wiki import start_fake_wiki
+                if fake_wiki_server is None:
+                    fake_wiki_server = start_fake_wiki(wiki_config['username'],
+                                                       wiki_config['password'],
+                                                       **(wiki_config['fake_wiki'] or {}))
+                site = Site(fake_wiki_server.host, path='/', scheme='http', do_init=False)
+            else:
+                site = Site(wiki_config['base'], path=wiki_config['path'],
+                            scheme=wiki_config.get('scheme', 'https'), do_init=False)
+            site.sleepers = _ThrottledSleepers(site.sleepers.max_retries,
+                                               site.sleepers.retry_timeout)
+            _load_session(site)
+            site.site_init()  # also tells us whether the saved session is still logged in
+            if not _logged_in(site):
+                site.login(wiki_config['username'], wiki_config['password'])
+            _save_session(site)
+            atexit.register(_save_session, site)  # keep any cookies or tokens renewed since
+            _site = site
+        return _site
+
+
+def relogin():
+    """Log in to the wiki again after the session has expired.
+
+    Several upload workers may find out about the expired session at about the same time, so
+    the session is checked first, and only the first of them actually logs in."""
+    site = get_site()
+    with _site_lock:
+        site.site_init()  # refreshes user info, and clears the tokens of the old session
+        if not _logged_in(site):
+            site.login(wiki_config['username'], wiki_config['password'])
+        _save_session(site)
+
+
+class _ThrottledSleeper(Sleeper):
+    """mwclient's retry sleeper, changed to back off through the shared wiki_throttle.
+
+    mwclient retries by itself on replication lag (passing on the wiki's Retry-After), server
+    errors and connection errors. All of those mean every worker should slow down, not just the
+    one that happened to get the error."""
+
+    def sleep(self, min_time=0):
+        self.retries += 1
+        if self.retries > self.max_retries:
+            raise MaximumRetriesExceeded(self, self.args)
+        self.callback(self, self.retries, self.args)
+        delay = wiki_throttle.throttled(retry_after=min_time or None)
+        log.debug('Wiki request failed, retrying in %.1f seconds', delay)
+        wiki_throttle.wait()
+
+
+class _ThrottledSleepers(Sleepers):
+    def make(self, args=None):
+        return _ThrottledSleeper(args, self.max_retries, self.retry_timeout, self.callback)
+
+
+def _logged_in(site: Site) -> bool:
+    """Return whether the site's last user info shows us logged in as our bot user."""
+    # bot password usernames look like User@BotName, but the wiki only knows them as User
+    return site.logged_in and site.username == wiki_config['username'].split('@')[0]
+
+
+def _session_key(site: Site) -> str:
+    return f'{wiki_config["username"]}@{site.host}{site.path}'
+
+
+def _load_session(site: Site):
+    """Restore the cookies and tokens saved for this wiki and user, if any."""
+    try:
+        with open(SESSION_FILE) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return
+    if session.get('key') != _session_key(site):
+        return
+    for cookie in session['cookies']:
+        site.connection.cookies.set_cookie(create_cookie(**cookie))
+    site.tokens = session['tokens']
+
+
+def _save_session(site: Site):
+    """Save the site's cookies and tokens so that a later run can reuse the session."""
+    cookies = [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                'path': cookie.path, 'expires': cookie.expires, 'secure': cookie.secure}
+               for cookie in site.connection.cookies]
+    session = {'key': _session_key(site), 'cookies': cookies, 'tokens': site.tokens}
+    try:
+        fd = os.open(SESSION_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'w') as f:
+            json.dump(session, f)
+    except OSError as err:
+        log.warning('Unable to save wiki session: %s', err)
@@ -0,0 +1,206 @@
+"""Persistent local mirror of wiki article text, kept current through the wiki's recent changes."""
+import json
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import monotonic
+from typing import Dict, Iterable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+MIRROR_FILE = 'wiki_mirror.sqlite'
+# Minimum number of seconds between requests asking the wiki what has changed since the last sync.
+# Edits made by other users within this window can be missed, but mwclient sends the timestamp of
+# the revision we based an edit on, so the wiki refuses to overwrite them (edit conflict).
+SYNC_INTERVAL = 10
+# MediaWiki only keeps recent changes for a limited time ($wgRCMaxAge, 90 days by default). If the
+# mirror hasn't been synced for longer than this, it can't know what changed and starts over.
+MAX_SYNC_AGE = timedelta(days=30)
+# Recent changes are requested starting this long before the last sync, so that changes aren't
+# lost to clock differences between us and the wiki server. Seeing a change twice is harmless.
+SYNC_OVERLAP = timedelta(minutes=5)
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class WikiMirror:
+    """On-disk copy of the wikitext and metadata of the articles we have fetched from the wiki.
+
+    Entries are keyed by the title that was requested, and store the page info returned by the API
+    (including the revision id, timestamp and SHA-1 hash of the current revision) along with the
+    wikitext. Entries for pages that have been edited, created, moved or deleted since they were
+    stored are dropped by sync(), so anything returned by get() is still current.
+
+    The mirror also keeps a ledger of fingerprints of the template in each article we have seen or
+    uploaded, so that uploads which wouldn't change anything can be skipped."""
+
+    def __init__(self, path: str = MIRROR_FILE):
+        """Open the mirror database, creating it if necessary.
+
+        Args:
+            path: the filename of the SQLite database to use
+        """
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()  # one connection is shared by all upload worker threads
+        self._last_sync_check = None
+        with self._lock, self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS pages (title TEXT PRIMARY KEY,'
+                             ' resolved TEXT, revid INTEGER, timestamp TEXT, sha1 TEXT,'
+                             ' info TEXT, text TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS pages_resolved ON pages (resolved)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS templates (title TEXT PRIMARY KEY,'
+                             ' revid INTEGER, content TEXT, exact TEXT)')
+
+    def get(self, title: str) -> Optional[Tuple[dict, str]]:
+        """Return the stored (page info, wikitext) for a requested title, or None if not stored."""
+        with self._lock:
+            row = self._db.execute('SELECT info, text FROM pages WHERE title = ?',
+                                   (title,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def is_current(self, title: str, revid: Optional[int]) -> bool:
+        """Return whether the stored entry for a requested title is of the given revision (None
+        for a missing page), which means that revision is still the current one on the wiki."""
+        with self._lock:
+            row = self._db.execute('SELECT 1 FROM pages WHERE title = ? AND revid IS ?',
+                                   (title, revid)).fetchone()
+        return row is not None
+
+    def put(self, title: str, info: dict, text: str):
+        """Store the page info and wikitext fetched from the wiki for a requested title.
+
+        Args:
+            title: the title that was requested, which may be a redirect to info['title']
+            info: the page info returned by action=query&prop=info|revisions
+            text: the wikitext of the current revision ('' for a missing page)
+        """
+        info = dict(info)
+        revision = {}
+        if 'revisions' in info:
+            # keep the revision metadata, but don't store the content twice
+            revision = {key: value for key, value in info['revisions'][0].items()
+                        if key not in ('slots', '*')}
+            info['revisions'] = [revision]
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (title, info['title'], revision.get('revid'),
+                              revision.get('timestamp'), revision.get('sha1'),
+                              json.dumps(info), text))
+
+    def forget(self, titles: Iterable[str]):
+        """Drop the entries for the given titles, and for any titles that redirect to them."""
+        titles = list(titles)
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM pages WHERE title = ? OR resolved = ?',
+                                 [(title, title) for title in titles])
+
+    def forget_older(self, revisions: Dict[str, int]):
+        """Drop the entries for the given titles, and for any titles that redirect to them, unless
+        the stored revision is the given revision id or a later one."""
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM pages WHERE (title = ? OR resolved = ?)'
+                                 ' AND (revid IS NULL OR revid < ?)',
+                                 [(title, title, revid) for title, revid in revisions.items()])
+
+    def clear(self):
+        """Drop all stored pages."""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM pages')
+
+    def template_fingerprints(self, title: str, revid: int) -> Optional[Tuple[str, str]]:
+        """Return the fingerprints recorded for the template in a revision of an article.
+
+        Args:
+            title: the title of the article (not of a redirect to it)
+            revid: the current revision id of the article
+
+        Returns:
+            the (content, exact) fingerprints given to record_template(), or None if nothing was
+            recorded for this revision of the article
+        """
+        with self._lock:
+            row = self._db.execute('SELECT content, exact FROM templates'
+                                   ' WHERE title = ? AND revid = ?', (title, revid)).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def record_template(self, title: str, revid: int, content: str, exact: str):
+        """Record the fingerprints of the template in a revision of an article.
+
+        Unlike stored pages, these are kept until the article is next edited, since a changed
+        revision id is enough to tell that they are out of date.
+
+        Args:
+            title: the title of the article
+            revid: the revision id that has this template
+            content: fingerprint of the template's content, ignoring the game version
+            exact: fingerprint of the template exactly as it is
+        """
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO templates VALUES (?, ?, ?, ?)',
+                             (title, revid, content, exact))
+
+    def sync(self, site, force: bool = False):
+        """Drop the entries for all pages changed on the wiki since the last sync.
+
+        Uses list=recentchanges, so a single request is usually enough no matter how many pages
+        are stored. Does nothing if the last sync was less than SYNC_INTERVAL seconds ago, unless
+        force is set.
+
+        Args:
+            site: the mwclient Site to ask for recent changes
+            force: sync even if the last sync was very recent
+        """
+        if not force and self._last_sync_check is not None \
+                and monotonic() - self._last_sync_check < SYNC_INTERVAL:
+            return
+        sync_time = datetime.now(timezone.utc)
+        wiki = f'{site.host}{site.path}'
+        if self._get_meta('wiki') != wiki:
+            # the mirror was made for a different wiki (or is new)
+            self.clear()
+            with self._lock, self._db:
+                self._db.execute('DELETE FROM templates')
+            self._set_meta('wiki', wiki)
+            self._set_meta('last_sync', None)
+        last_sync = self._get_meta('last_sync')
+        if last_sync is not None:
+            last_sync = datetime.strptime(last_sync, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+            if sync_time - last_sync > MAX_SYNC_AGE:
+                log.info('Wiki mirror last synced %s, starting over', last_sync)
+                self.clear()
+            else:
+                start = (last_sync - SYNC_OVERLAP).strftime(TIMESTAMP_FORMAT)
+                changed = set()
+                edited = {}
+                for change in site.recentchanges(start=start, dir='newer',
+                                                 prop='title|ids|loginfo', type='edit|new|log'):
+                    if change['type'] in ('edit', 'new'):
+                        # revision ids only increase, so a stored revision at least as new as
+                        # this one already has the change (as happens within SYNC_OVERLAP)
+                        edited[change['title']] = max(change['revid'],
+                                                      edited.get(change['title'], 0))
+                        continue
+                    changed.add(change['title'])
+                    # moves also change the page at the destination title
+                    target = change.get('logparams', {}).get('target_title')
+                    if target is not None:
+                        changed.add(target)
+                if changed or edited:
+                    log.info('Wiki mirror: %d pages changed since last sync',
+                             len(changed | edited.keys()))
+                    self.forget(changed)
+                    self.forget_older(edited)
+        self._set_meta('last_sync', sync_time.strftime(TIMESTAMP_FORMAT))
+        self._last_sync_check = monotonic()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, key: str, value: Optional[str]):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
@@ -1,38 +1,205 @@
 """Class to assist with managing individual wiki articles on the Caves of Qud wiki."""
-import re
-from io import BytesIO
-from time import sleep
+import hashlib
+from time import gmtime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
 from mwclient.errors import InvalidPageTitle, APIError, AssertUserFailedError
+from mwclient.image import Image
+from mwclient.page import Page
+from mwclient.util import parse_timestamp
 
 from qbe.config import config
-from qbe.wiki_config import site, wiki_config
-
-# Link to work on or update regex:
-# https://regex101.com/r/suH7vR/4
-# 1st matching group: everything before template
-# 2th matching group: Template
-# 3rd matching group: everything after template.
-# First and last matching groups are added later in init
+from qbe.wiki_config import MAX_LAG, get_site, relogin, wiki_config, wiki_throttle
+from qbe.wiki_mirror import WikiMirror
+from qbe.wikitext import TemplateRegion, find_template, normalize_template
+
+# Markers around the region of each article that QBE manages (see wikitext.find_template)
 INTRO_STR = '<!-- START QBE: Autogenerated section - please leave this marker. ' \
                        'See the [[QBE]] page for more information. -->'
 FINAL_STR = '<!-- END QBE -->'
-# TEMPLATE_RE_OLD is the fallback version of this regex that doesn't require START QBE and END QBE
-# HTML tags to be present. We use this as a fallback if the wiki doesn't match TEMPLATE_RE and we
-# also use it for diffing against QBE, since QBE doesn't include those details either.
-TEMPLATE_RE_OLD = r"(?:<!--.+?-->)?\n*(?:{{As Of Patch\|[0-9.]+}})?\n*({{(?:Item|Character|Food|Corpse).*^}})\n*(?:\[\[Category:.+?\]\])?\n?(?:<!--.+?-->)?"  # noqa E501
-TEMPLATE_RE = r"(?:<!--.*?START QBE.*?-->)\n*(?:{{As Of Patch\|[0-9.]+}})?\n*({{(?:Item|Character|Food|Corpse).*^}})\n*(?:\[\[Category:.+?\]\])?\n?(?:<!--.*?END QBE.*?-->)"  # noqa E501
+# Maximum number of titles the MediaWiki API accepts in a single query when page content is
+# requested (higher for accounts with the apihighlimits right, but content is capped at 50).
+MAX_TITLES_PER_QUERY = 50
+# API error codes meaning that we should slow down and try again
+THROTTLE_ERRORS = {'ratelimited', 'actionthrottled', 'maxlag'}
+# Local copy of the articles we have fetched, so unchanged articles aren't downloaded again.
+mirror = WikiMirror()
+# Whether to edit articles whose template would only change in the game version it gives.
+VERSION_ONLY_EDITS = wiki_config.get('version_only_edits', False)
+
+
+def template_fingerprints(template: str) -> Tuple[str, str]:
+    """Return (content, exact) fingerprints of template text, ignoring the game version or not."""
+    content = hashlib.sha1(normalize_template(template).encode()).hexdigest()
+    exact = hashlib.sha1(template.strip().encode()).hexdigest()
+    return content, exact
+
+
+def article_name(qud_object) -> str:
+    """Return the title of the wiki article for a Qud object, including any namespace prefix."""
+    # is this page name overridden?
+    if qud_object.name in config['Wiki']['Article overrides']:
+        name = config['Wiki']['Article overrides'][qud_object.name]
+    else:
+        name = qud_object.displayname
+    # capitalize first character
+    if len(name) > 0:
+        name = name[0].upper() + name[1:]
+    namespace = qud_object.wiki_namespace()
+    if namespace is not None and namespace != 'Main':
+        name = f'{namespace}:{name}'
+    return name
+
+
+def _query_titles(titles: Iterable[str], **params) -> Iterator[Tuple[str, dict]]:
+    """Run an action=query request over many titles, yielding (title, page info) tuples.
+
+    Titles are sent to the wiki in batches of MAX_TITLES_PER_QUERY, following any continuations
+    the API asks for. Normalized titles and redirects are resolved, so the info yielded for a
+    redirect is that of its target. Invalid titles are skipped."""
+    titles = list(dict.fromkeys(titles))  # deduplicate, preserving order
+    for start in range(0, len(titles), MAX_TITLES_PER_QUERY):
+        batch = titles[start:start + MAX_TITLES_PER_QUERY]
+        infos = {}
+        aliases = {}  # requested title -> title the API resolved it to
+        continue_params = {}
+        while True:
+            wiki_throttle.wait()
+            result = get_site().post('query', redirects='', titles='|'.join(batch), **params,
+                                     maxlag=MAX_LAG, **continue_params)
+            query = result.get('query', {})
+            for alias in query.get('normalized', []) + query.get('redirects', []):
+                aliases[alias['from']] = alias['to']
+            for info in query.get('pages', {}).values():
+                # continuations only add properties that earlier responses were missing
+                infos.setdefault(info['title'], {}).update(info)
+            if 'continue' not in result:
+                break
+            continue_params = result['continue']
+        for title in batch:
+            resolved = title
+            seen = {title}
+            while aliases.get(resolved, resolved) not in seen:  # guard against redirect loops
+                resolved = aliases[resolved]
+                seen.add(resolved)
+            info = infos.get(resolved)
+            if info is not None and 'invalid' not in info:
+                yield title, info
+
+
+class PageState:
+    """The page info and wikitext of the current revision of an article, along with what has been
+    worked out from them so far. Shared by everything that needs the article during a session (see
+    fetch_pages), so a scan, diff and upload of the same object fetch and parse it only once."""
+
+    def __init__(self, info: dict, text: str):
+        """Hold the fetched page info and wikitext of an article.
+
+        Parameters:
+            info: the page info returned by action=query&prop=info|revisions
+            text: the wikitext of the current revision ('' for a missing page)
+            """
+        self.info = info
+        self.text = text
+        self.revid = info.get('revisions', [{}])[0].get('revid')
+        self._page = None
+        self._region = None
+        self._parsed = False
+
+    @property
+    def page(self) -> Page:
+        """An mwclient Page for the article, ready to be edited without fetching it again."""
+        if self._page is None:
+            self._page = _make_page(self.info)
+        return self._page
+
+    def template_region(self) -> Optional[TemplateRegion]:
+        """Return the region of the article managed by QBE (see wikitext.find_template)."""
+        if not self._parsed:
+            self._region = find_template(self.text)
+            self._parsed = True
+        return self._region
+
+
+# The state of each article requested during this session, by requested title. An entry is only
+# used while the mirror still has the same revision of the article, so entries for articles that
+# have been edited since (on the wiki or by us) are replaced as soon as they are next requested.
+_page_states: Dict[str, PageState] = {}
+
+
+def fetch_pages(titles: Iterable[str]) -> Dict[str, PageState]:
+    """Fetch the existence, redirect target and current wikitext of many articles at once.
+
+    Articles already requested during this session, or already in the local mirror, that haven't
+    changed on the wiki since are not downloaded again. The rest are fetched with one
+    action=query&prop=revisions request per MAX_TITLES_PER_QUERY titles. Redirects are followed,
+    so the page returned for a redirect is its target.
+
+    Returns a dictionary mapping each requested title to the PageState of its article, where the
+    text is an empty string for missing articles. Invalid titles are left out of the dictionary."""
+    titles = list(dict.fromkeys(titles))
+    mirror.sync(get_site())
+    fetched = {}
+    to_fetch = []
+    for title in titles:
+        state = _page_states.get(title)
+        if state is not None and mirror.is_current(title, state.revid):
+            fetched[title] = state
+            continue
+        stored = mirror.get(title)
+        if stored is None:
+            to_fetch.append(title)
+        else:
+            fetched[title] = _page_states[title] = PageState(*stored)
+    for title, info in _query_titles(to_fetch, prop='info|revisions', inprop='protection',
+                                     rvprop='content|ids|timestamp|sha1', rvslots='main'):
+        text = ''
+        if 'revisions' in info:
+            revision = info['revisions'][0]
+            text = revision['slots']['main']['*'] if 'slots' in revision else revision['*']
+        mirror.put(title, info, text)
+        fetched[title] = _page_states[title] = PageState(info, text)
+    return {title: fetched[title] for title in titles if title in fetched}
+
+
+def _make_page(info: dict) -> Page:
+    """Create an mwclient Page from page info, ready to be edited without fetching it again."""
+    page = Page(get_site(), info['title'], info=info)
+    timestamp = info.get('revisions', [{}])[0].get('timestamp')
+    if timestamp is not None:
+        # mwclient normally records these when the text is downloaded. The wiki uses them to
+        # refuse our edit if someone else has edited the article since the revision we have.
+        page.last_rev_time = parse_timestamp(timestamp)
+        page.edit_time = gmtime()
+    return page
+
+
+def fetch_images(filenames: Iterable[str]) -> dict:
+    """Fetch the file information (including SHA-1 hash and size) of many wiki images at once.
+
+    Uses one action=query&prop=imageinfo request per MAX_TITLES_PER_QUERY files, so no image data
+    is downloaded. Filenames of None are ignored.
+
+    Returns a dictionary mapping each requested filename to an mwclient Image, which will have
+    exists set to False for files that are not on the wiki."""
+    filenames = [filename for filename in filenames if filename is not None]
+    titles = {f'File:{filename}': filename for filename in filenames}
+    fetched = {}
+    for title, info in _query_titles(titles, prop='info|imageinfo', iiprop='sha1|size|url'):
+        fetched[titles[title]] = Image(get_site(), info['title'], info=info)
+    return fetched
 
 
 class WikiPage:
     """Represent an individual article."""
 
-    def __init__(self, qud_object, gamever):
+    def __init__(self, qud_object, gamever, state: PageState = None):
         """Load the Caves of Qud wiki page for the given Qud object.
 
         Parameters:
             qud_object: the QudObject to represent
             gamever: a string giving the patch version of CoQ
+            state: the already fetched state of the article (see fetch_pages), if any
             """
         self.namespace = qud_object.wiki_namespace()
         self.CREATED_SUMMARY = f'Created by {wiki_config["operator"]}' \
@@ -43,50 +210,73 @@ class WikiPage:
                               f' using {config["Wikified name"]} {config["Version"]}'
         self.intro_string = INTRO_STR + '\n'
         self.final_string = FINAL_STR
-        # Use base TEMPLATE_RE but surrounding text around template is also captured
-        self.template_re = '(.*?)' + TEMPLATE_RE + '(.*)'
-        self.template_re_old = '(.*?)' + TEMPLATE_RE_OLD + '(.*)'
-        # is this page name overridden?
-        if qud_object.name in config['Wiki']['Article overrides']:
-            article_name = config['Wiki']['Article overrides'][qud_object.name]
-        else:
-            article_name = qud_object.displayname
-        # capitalize first character
-        if len(article_name) > 0:
-            self.article_name = article_name[0].upper() + article_name[1:]
-        else:
-            self.article_name = article_name
-        if self.namespace is not None and self.namespace != 'Main':
-            self.article_name = f'{self.namespace}:{self.article_name}'
-        self.template_text = qud_object.wiki_template(gamever)
-        try:
-            self.page = site.pages[self.article_name]
-        except InvalidPageTitle:
-            print(f'Invalid page title: {self.article_name}')
-            raise
+        self.article_name = article_name(qud_object)
+        self.qud_object = qud_object
+        self.gamever = gamever
+        self._template_text = None
+        if state is None:
+            fetched = fetch_pages([self.article_name])
+            if self.article_name not in fetched:
+                print(f'Invalid page title: {self.article_name}')
+                raise InvalidPageTitle(self.article_name)
+            state = fetched[self.article_name]
+        self.state = state
+        self.page = state.page
+
+    @property
+    def template_text(self) -> str:
+        """The template generated for our object, which is only generated if it is needed."""
+        if self._template_text is None:
+            self._template_text = self.qud_object.wiki_template(self.gamever)
+        return self._template_text
+
+    def text(self) -> str:
+        """Return the wikitext of the article."""
+        return self.state.text
+
+    def template_region(self) -> Optional[TemplateRegion]:
+        """Return the region of the article managed by QBE, or None if it isn't recognized."""
+        return self.state.template_region()
+
+    def template_unchanged(self) -> bool:
+        """Return whether saving our template would leave the article effectively unchanged.
+
+        That is the case if the article already has exactly our template, or (unless
+        version_only_edits is set in wiki.yml) a template that differs only in its game version.
+        The fingerprints of the article's template are kept in the mirror's ledger, so the
+        article only has to be parsed once per revision."""
+        if not self.page.exists:
+            return False
+        wiki_fingerprints = mirror.template_fingerprints(self.page.name, self.page.revision)
+        if wiki_fingerprints is None:
+            region = self.template_region()
+            if region is None or not region.has_markers:
+                return False  # no QBE markers yet, so saving would at least add them
+            wiki_fingerprints = template_fingerprints(region.template(self.text()))
+            mirror.record_template(self.page.name, self.page.revision, *wiki_fingerprints)
+        content, exact = template_fingerprints(self.template_text)
+        if exact == wiki_fingerprints[1]:
+            return True
+        return content == wiki_fingerprints[0] and not VERSION_ONLY_EDITS
+
+    def upload_template(self) -> str:
+        """Write the template for our object into the article and save it.
 
-    def upload_template(self):
-        """Write the template for our object into the article and save it."""
+        Returns 'Success' if the article was saved, or 'Unchanged' if saving was skipped because
+        it wouldn't change the article (see template_unchanged)."""
+        if self.template_unchanged():
+            print(f'Not uploading: {self.article_name} is already up to date')
+            return 'Unchanged'
         if self.page.exists:
-            # complex case: have to get indices corresponding to beginning and end of the
-            # existing template
-            match = re.match(self.template_re, self.page.text(), re.MULTILINE | re.DOTALL)
-            if match is None:
-                # fall back to old regex that doesn't require START QBE and END QBE tags
-                match = re.match(self.template_re_old, self.page.text(), re.MULTILINE | re.DOTALL)
-                if match is None:
-                    raise ValueError('Article exists, but existing format not recognized. '
-                                     'Try a manual edit first.')
-            if match.group(1) is not None:
-                start = match.end(1)
-            else:
-                start = match.start(2)
-            if match.group(3) is not None:
-                end = match.start(3)
-            else:
-                end = match.end(2)
-            pre_template_text = self.page.text()[:start] + self.intro_string
-            post_template_text = self.final_string + self.page.text()[end:]
+            # complex case: have to replace the region of the existing article that QBE manages
+            # (falling back to just the template, if it isn't marked with START QBE and END QBE)
+            text = self.text()
+            region = self.template_region()
+            if region is None:
+                raise ValueError('Article exists, but existing format not recognized. '
+                                 'Try a manual edit first.')
+            pre_template_text = text[:region.start] + self.intro_string
+            post_template_text = self.final_string + text[region.end:]
             new_text = f"{pre_template_text}{self.template_text}{post_template_text}"
             summary_text = self.EDITED_SUMMARY
         else:
@@ -94,47 +284,94 @@ class WikiPage:
             new_text = f"{self.intro_string}{self.template_text}{self.final_string}" \
                        + "\n{{No Description}}"
             summary_text = self.CREATED_SUMMARY
-        backoff_delay = 3
         max_attempts = 7
         for attempt in range(1, max_attempts + 1):
+            wiki_throttle.acquire()
             try:
-                if attempt > max_attempts:
-                    raise RuntimeError(f'Unable to edit page after {max_attempts} attempts.')
-                elif attempt > 1:
-                    sleep(backoff_delay)
-                    backoff_delay *= 2
-                result = self.page.save(text=new_text, summary=summary_text)
+                result = self.page.save(text=new_text, summary=summary_text, maxlag=MAX_LAG)
                 break
-            except APIError:
-                print(f'Page edit rate-limited. Retrying in {backoff_delay} seconds...')
+            except APIError as err:
+                if err.code not in THROTTLE_ERRORS:
+                    raise
+                delay = wiki_throttle.throttled()
+                print(f'Page edit rate-limited. Retrying in {delay:.0f} seconds...')
             except AssertUserFailedError:
-                print(f'Session expired. Will re-login and wait {backoff_delay} seconds...')
-                site.login(wiki_config['username'], wiki_config['password'])
+                print('Session expired. Will re-login and try again...')
+                relogin()
+        else:
+            raise RuntimeError(f'Unable to edit page after {max_attempts} attempts.')
+        wiki_throttle.succeeded()
+        mirror.forget([self.article_name, self.page.name])
+        mirror.record_template(self.page.name, result.get('newrevid', self.page.revision),
+                               *template_fingerprints(self.template_text))
         print(result)
         return result['result']
 
 
-def upload_wiki_image(file: BytesIO, filename: str, gamever: str, sourcetilepath: str = ''):
+class _UploadReader:
+    """Read-only file over encoded image data, so that mwclient can upload it without copying it.
+
+    Reading to the end doesn't move the position. That way requests gets the whole file again when
+    mwclient retries the request by itself (after a server or connection error), where a BytesIO
+    would already be at its end and the retry would upload an empty file."""
+
+    def __init__(self, data):
+        self._data = memoryview(data)
+        self._position = 0
+
+    def read(self, size: int = -1) -> memoryview:
+        if size is None or size < 0:
+            return self._data[self._position:]
+        chunk = self._data[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self._position = (offset, self._position + offset, len(self._data) + offset)[whence]
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        pass
+
+
+def upload_wiki_image(data, filename: str, gamever: str, sourcetilepath: str = ''):
+    """Upload an image to the wiki, replacing any existing file of the same name.
+
+    Parameters:
+        data: the encoded image, such as EncodedImage.data (any bytes-like object)
+        filename: the name of the file on the wiki
+        gamever: a string giving the patch version of CoQ
+        sourcetilepath: the path of the game asset the image was rendered from, if any
+    """
     description = f'Rendered by {wiki_config["operator"]} with game version ' \
-            f'{gamever} using {config["Wikified name"]} {config["Version"]}.'
+                  f'{gamever} using {config["Wikified name"]} {config["Version"]}.'
     if len(sourcetilepath) > 0:
         description += f' Original game asset filepath: {sourcetilepath}'
     max_attempts = 5
     for attempt in range(1, max_attempts + 1):
+        wiki_throttle.acquire()
         try:
-            result = site.upload(file=file,
-                                 filename=filename,
-                                 description=description,
-                                 ignore=True,  # upload even if same file w diff name exists
-                                 comment=description
-                                 )
+            result = get_site().upload(file=_UploadReader(data),
+                                       filename=filename,
+                                       description=description,
+                                       ignore=True,  # upload even if same file w diff name exists
+                                       comment=description
+                                       )
+            wiki_throttle.succeeded()
             return result
         except APIError as err:
             if err.code == 'badtoken':
                 print('CSRF token expired, retrying...')
-                site.tokens = {}  # clear token cache
+                get_site().tokens = {}  # clear token cache
             elif err.code == 'mustbeloggedin':
                 print('Session expired. Will re-login and try again...')
-                site.login(wiki_config['username'], wiki_config['password'])
+                relogin()
+            elif err.code in THROTTLE_ERRORS:
+                delay = wiki_throttle.throttled()
+                print(f'Image upload rate-limited. Retrying in {delay:.0f} seconds...')
             else:
                 raise err
+    raise RuntimeError(f'Unable to upload {filename} after {max_attempts} attempts.')
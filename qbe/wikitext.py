@@ -0,0 +1,185 @@
+"""Single-pass parser for the part of a wiki article that QBE manages."""
+import re
+from typing import NamedTuple, Optional
+
+START_MARKER = 'START QBE'
+END_MARKER = 'END QBE'
+# the templates that QBE generates for objects (see QudObjectWiki.wiki_template_type)
+TEMPLATE_STARTS = ('{{Item', '{{Character', '{{Food', '{{Corpse')
+AS_OF_PATCH = '{{As Of Patch|'
+CATEGORY = '[[Category:'
+
+
+class TemplateRegion(NamedTuple):
+    """Offsets into an article of the region managed by QBE, as found by find_template().
+
+    The region runs from start to end, and is what is replaced when a template is uploaded. It
+    contains the object's template (from template_start to template_end), which may be preceded by
+    an {{As Of Patch}} template (from patch_start to patch_end, both None if there isn't one)."""
+    start: int
+    end: int
+    template_start: int
+    template_end: int
+    patch_start: Optional[int]
+    patch_end: Optional[int]
+    # whether the region is delimited by START QBE and END QBE comments
+    has_markers: bool
+
+    def template(self, text: str) -> str:
+        """Return the object's template from the text that this region was found in."""
+        return text[self.template_start:self.template_end]
+
+
+def normalize_template(template: str) -> str:
+    """Return template text without its 'gameversion' line, which changes with every patch."""
+    return re.sub(r'^\| gameversion = .*?$', '', template, flags=re.MULTILINE).strip()
+
+
+def find_template(text: str, require_markers: bool = False) -> Optional[TemplateRegion]:
+    """Find the QBE-managed region of a wiki article.
+
+    Articles written by current versions of QBE wrap the region in START QBE and END QBE
+    comments. Failing that (unless require_markers is set), the region is taken to be the first
+    Item, Character, Food or Corpse template, along with any comment, {{As Of Patch}} and category
+    link directly around it, as written by older versions of QBE and in QBE's own templates.
+
+    The template is matched by balancing its braces, as MediaWiki does, so later templates in the
+    article are never taken to be part of it. Each part of the text is looked at a bounded number
+    of times, so this takes time proportional to the length of the article.
+
+    Parameters:
+        text: the wikitext of the article
+        require_markers: only accept a region delimited by START QBE and END QBE comments
+
+    Returns:
+        the offsets of the region, or None if the article has no recognizable QBE template
+    """
+    position = 0
+    while True:
+        comment_start = text.find('<!--', position)
+        if comment_start == -1:
+            break
+        comment_end = text.find('-->', comment_start + 4)
+        if comment_end == -1:
+            break
+        position = comment_end + 3
+        if text.find(START_MARKER, comment_start, comment_end) != -1:
+            region = _marked_region(text, comment_start, position)
+            if region is not None:
+                return region
+    if require_markers:
+        return None
+    return _unmarked_region(text)
+
+
+def _marked_region(text: str, start: int, position: int) -> Optional[TemplateRegion]:
+    """Return the region starting with the START QBE comment from start to position, if the
+    rest of the region follows it."""
+    position = _skip_newlines(text, position)
+    patch_start = patch_end = None
+    if text.startswith(AS_OF_PATCH, position):
+        patch_end = _patch_end(text, position)
+        if patch_end is None:
+            return None
+        patch_start = position
+        position = _skip_newlines(text, patch_end)
+    if not text.startswith(TEMPLATE_STARTS, position):
+        return None
+    template_start = position
+    template_end = _template_end(text, template_start)
+    if template_end is None:
+        return None
+    position = _skip_category(text, template_end)
+    if not text.startswith('<!--', position):
+        return None
+    comment_end = text.find('-->', position + 4)
+    if comment_end == -1 or text.find(END_MARKER, position, comment_end) == -1:
+        return None
+    return TemplateRegion(start, comment_end + 3, template_start, template_end,
+                          patch_start, patch_end, True)
+
+
+def _unmarked_region(text: str) -> Optional[TemplateRegion]:
+    """Return the region around the first QBE template in the text, without markers."""
+    starts = [start for start in map(text.find, TEMPLATE_STARTS) if start != -1]
+    if not starts:
+        return None
+    template_start = min(starts)
+    template_end = _template_end(text, template_start)
+    if template_end is None:
+        return None
+    # extend the region back over whatever came directly before the template...
+    start = _skip_newlines_back(text, template_start)
+    patch_start = patch_end = None
+    if text.endswith('}}', 0, start):
+        candidate = text.rfind(AS_OF_PATCH, 0, start)
+        if candidate != -1 and _patch_end(text, candidate) == start:
+            patch_start, patch_end = candidate, start
+            start = _skip_newlines_back(text, candidate)
+    if text.endswith('-->', 0, start):
+        comment_start = text.rfind('<!--', 0, start - 3)
+        if comment_start != -1:
+            start = comment_start
+    # ...and forward over whatever came directly after it
+    end = _skip_category(text, template_end)
+    if text.startswith('<!--', end):
+        comment_end = text.find('-->', end + 4)
+        if comment_end != -1:
+            end = comment_end + 3
+    return TemplateRegion(start, end, template_start, template_end, patch_start, patch_end,
+                          False)
+
+
+def _template_end(text: str, position: int) -> Optional[int]:
+    """Return the offset just after the template starting at position, by balancing braces, or
+    None if the template is never closed."""
+    depth = 0
+    close = text.find('}}', position)
+    while close != -1:
+        opening = text.find('{{', position, close)
+        if opening != -1:
+            depth += 1
+            position = opening + 2
+        else:
+            depth -= 1
+            position = close + 2
+            if depth == 0:
+                return position
+            close = text.find('}}', position)
+    return None
+
+
+def _patch_end(text: str, position: int) -> Optional[int]:
+    """Return the offset just after the {{As Of Patch|version}} at position, or None if the
+    version isn't a version number."""
+    version_start = position + len(AS_OF_PATCH)
+    version_end = text.find('}}', version_start)
+    if version_end <= version_start \
+            or text[version_start:version_end].strip('0123456789.') != '':
+        return None
+    return version_end + 2
+
+
+def _skip_category(text: str, position: int) -> int:
+    """Skip the newlines and category link that may come between a template and the end of the
+    region. A category link here is part of the region, and is replaced along with it."""
+    position = _skip_newlines(text, position)
+    if text.startswith(CATEGORY, position):
+        category_end = text.find(']]', position)
+        if category_end != -1:
+            position = category_end + 2
+            if text.startswith('\n', position):
+                position += 1
+    return position
+
+
+def _skip_newlines(text: str, position: int) -> int:
+    while text.startswith('\n', position):
+        position += 1
+    return position
+
+
+def _skip_newlines_back(text: str, position: int) -> int:
+    while position > 0 and text[position - 1] == '\n':
+        position -= 1
+    return position
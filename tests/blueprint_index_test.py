@@ -0,0 +1,68 @@
+"""pytest unit tests for blueprint_index.py."""
+from object_model_test import make_model, FakeObject
+
+from qbe.blueprint_index import BlueprintIndex
+from qbe.search_filter import QudObjFilterModel
+
+
+class BlueprintObject(FakeObject):
+    """A FakeObject with resolved parts and tags, looked up like QudObject's virtual attributes."""
+    def __init__(self, name: str, parent=None, **all_attributes):
+        super().__init__(name, parent)
+        self.all_attributes = all_attributes
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'all_attributes':
+            raise AttributeError(attr)
+        element_tag, element_name, *attribute = attr.split('_')
+        value = self.all_attributes.get(element_tag, {}).get(element_name)
+        if value is not None and attribute:
+            value = value.get(attribute[0])
+        return value
+
+
+def make_objects():
+    root = BlueprintObject('Object', part={'Physics': {}})
+    weapon = BlueprintObject('Weapon', root, part={'Physics': {}, 'MeleeWeapon': {}},
+                             tag={'BaseObject': {}})
+    sword = BlueprintObject('Sword', weapon, part={'Physics': {'Weight': '5'}, 'MeleeWeapon': {}},
+                            tag={'Tier': {'Value': '3'}})
+    BlueprintObject('Rock', root, part={'Physics': {'Weight': '1'}})
+    return root, weapon, sword
+
+
+def test_blueprint_index():
+    root, weapon, sword = make_objects()
+    index = BlueprintIndex()
+    for qud_object in (root,) + root.descendants:
+        index.add(qud_object)
+    assert index.objects_with_part('Physics') == {'Sword', 'Rock'}  # the wiki-eligible ones
+    assert index.objects_with_part('MeleeWeapon') == {'Sword'}
+    assert index.objects_with_part('Physics_Weight') == {'Sword', 'Rock'}
+    assert index.objects_with_part('physics') == set()
+    assert index.objects_with_tag('Tier_Value') == {'Sword'}
+    assert index.objects_with_tag('BaseObject') == set()  # Weapon isn't wiki-eligible
+    assert index.part_names() == ['MeleeWeapon', 'Physics', 'Physics_Weight']
+    assert index.tag_names() == ['BaseObject', 'Tier', 'Tier_Value']
+
+
+def test_filter():
+    app, model, *_ = make_model()
+    root, weapon, sword = make_objects()
+    model.set_root(root)
+    index = BlueprintIndex()
+    for qud_object in (root,) + root.descendants:
+        index.add(qud_object)
+    proxy = QudObjFilterModel()
+    proxy.setSourceModel(model)
+    assert proxy.search_modifiers() == []
+    for blueprint_index in None, index:
+        proxy.blueprint_index = blueprint_index
+        for query, names in (('haspart:Physics_Weight', ['Sword', 'Rock']),
+                             ('haspart:MeleeWeapon', ['Sword']),
+                             ('hastag:Tier', ['Sword']),
+                             ('hastag:BaseObject', [])):
+            assert [proxy.search_index.objects[node].name
+                    for node in proxy.set_query(query)] == names
+    assert 'haspart:Physics_Weight' in proxy.search_modifiers()
+    assert 'hastag:Tier_Value' in proxy.search_modifiers()
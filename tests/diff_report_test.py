@@ -0,0 +1,32 @@
+"""pytest unit tests for diff_report.py."""
+from qbe.diff_report import diff_template, render_report
+
+OURS = '{{Item\n| title = sword\n| weight = 5\n| gameversion = 2.0.1\n}}\n'
+
+
+def article(template: str) -> str:
+    return f'<!-- START QBE -->\n{template}\n<!-- END QBE -->\nSwords are sharp.'
+
+
+def test_diff_template():
+    assert diff_template('Sword', 'Sword', OURS, None).status == 'missing'
+    assert diff_template('Sword', 'Sword', OURS, article(OURS.strip())).status == 'same'
+    old_version = OURS.replace('2.0.1', '2.0.0').strip()
+    diff = diff_template('Sword', 'Sword', OURS, article(old_version))
+    assert diff.status == 'version'
+    assert '-| gameversion = 2.0.0' in diff.lines and '+| gameversion = 2.0.1' in diff.lines
+    diff = diff_template('Sword', 'Sword', OURS, article(old_version.replace('5', '4')))
+    assert diff.status == 'changed'
+    assert '-| weight = 4' in diff.lines
+    assert diff_template('Sword', 'Sword', OURS, 'Hand-written.').status == 'unrecognized'
+
+
+def test_render_report():
+    diffs = [diff_template('Sword', 'Sword', OURS, article(OURS.replace('5', '<4>').strip())),
+             diff_template('Axe', 'Axe', OURS, None)]
+    report = render_report(diffs, '2.0.1')
+    assert '<a href="#changed">Template changed</a></td><td>1</td>' in report
+    assert '<a href="#missing">No article</a></td><td>1</td>' in report
+    assert '<a href="#same">Up to date</a></td><td>0</td>' in report
+    assert 'href="#object-Sword"' in report and 'id="object-Sword"' in report
+    assert '<span class="del">-| weight = &lt;4&gt;</span>' in report
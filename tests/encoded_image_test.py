@@ -0,0 +1,27 @@
+"""pytest unit tests for encoded_image.py."""
+from io import BytesIO
+
+from PIL import Image
+
+from qbe.encoded_image import EncodedImage
+
+
+def test_png():
+    image = Image.new('RGBA', (160, 240), (255, 0, 0, 255))
+    encoded = EncodedImage.png(image)
+    assert isinstance(encoded.data, memoryview)
+    assert encoded.image is image
+    decoded = Image.open(BytesIO(encoded.data))
+    assert decoded.format == 'PNG' and decoded.size == (160, 240)
+
+
+def test_gif_keeps_frames():
+    frames = [Image.new('P', (16, 24), color) for color in (1, 2, 3)]
+    data = BytesIO()
+    frames[0].save(data, format='GIF', save_all=True, append_images=frames[1:],
+                   duration=[100, 200, 300], loop=0)
+    gif = Image.open(data)
+    encoded = EncodedImage.gif(gif)
+    decoded = Image.open(BytesIO(encoded.data))
+    assert decoded.format == 'GIF'
+    assert decoded.n_frames == 3
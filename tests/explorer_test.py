@@ -0,0 +1,70 @@
+"""pytest unit tests for explorer.py."""
+from types import SimpleNamespace
+
+import pytest
+from object_model_test import make_model
+from PySide6.QtCore import QThread
+
+from qbe.job_journal import JobJournal
+
+try:
+    from qbe import explorer
+except FileNotFoundError:  # like QBE itself, the explorer needs a wiki.yml to be imported
+    pytest.skip('explorer.py needs a wiki.yml', allow_module_level=True)
+
+
+class FakeWindow:
+    """Stands in for MainWindow, with the parts of it that wiki_check_selected() uses."""
+    wiki_check_selected = explorer.MainWindow.wiki_check_selected
+    journal_rows = explorer.MainWindow.journal_rows
+    set_icon = explorer.MainWindow.set_icon
+
+    def __init__(self, model, qindex: dict, rows: list, journal=None):
+        self.qud_object_model = model
+        self.qindex = qindex
+        self.gameroot = SimpleNamespace(gamever='2.0.1')
+        self.rows = rows
+        self.journal = journal
+        self.jobs = []
+
+    def thread(self):
+        return QThread.currentThread()
+
+    def interrupted_job(self, description: str):
+        return self.journal
+
+    def selected_object_rows(self) -> list:
+        return self.rows
+
+    def start_job(self, job):
+        self.jobs.append(job)
+
+
+def test_wiki_check_selected(tmp_path, monkeypatch):
+    monkeypatch.setattr(explorer, 'job_journal', JobJournal(str(tmp_path / 'journal.sqlite')))
+    app, model, root, sword = make_model()
+    widget = root.children[1]
+
+    def cells(qud_object) -> list:
+        return [model.index_of(qud_object, column) for column in range(10)]
+
+    for qud_object in root, sword, widget:
+        for cell in cells(qud_object)[3:9]:
+            model.setData(cell, '❌')  # left over from an earlier scan
+    window = FakeWindow(model, {}, [(qud_object, cells(qud_object))
+                                    for qud_object in (root, sword)])
+    window.wiki_check_selected()
+    assert [model.status(root, column) for column in range(3, 9)] == ['⮿'] * 6
+    assert [model.status(sword, column) for column in range(3, 9)] == [''] * 6
+    [job] = window.jobs
+    assert [(qud_object.name, job_cells) for qud_object, job_cells in job.items] == \
+        [('Sword', cells(sword)[3:9])]
+    # resuming a scan: finished objects get their results back, the rest are blanked
+    journal = explorer.job_journal.start('Scanning wiki', '2.0.1', ['Sword', 'Widget'])
+    journal.record('Sword', True, ['✅', '✅', '✅', '❌', '-', '-'])
+    window = FakeWindow(model, {'Sword': sword, 'Widget': widget}, [], journal)
+    window.wiki_check_selected()
+    assert [model.status(sword, column) for column in range(3, 9)] == \
+        ['✅', '✅', '✅', '❌', '-', '-']
+    assert [model.status(widget, column) for column in range(3, 9)] == [''] * 6
+    assert [qud_object.name for qud_object, _ in window.jobs[0].items] == ['Widget']
@@ -0,0 +1,90 @@
+"""pytest unit tests for fake_wiki.py, using mwclient as QBE does."""
+from io import BytesIO
+
+import pytest
+from mwclient import Site
+from mwclient.errors import APIError, EditError
+from PIL import Image
+
+from qbe.fake_wiki import start_fake_wiki
+
+
+@pytest.fixture
+def server():
+    server = start_fake_wiki('Bot@QBE', 'password')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def site(server):
+    site = Site(server.host, path='/', scheme='http')
+    site.login('Bot@QBE', 'password')
+    return site
+
+
+def png_bytes(color) -> bytes:
+    data = BytesIO()
+    Image.new('RGBA', (16, 24), color).save(data, format='png')
+    return data.getvalue()
+
+
+def test_login(server, site):
+    assert site.logged_in
+    assert site.username == 'Bot'  # bot passwords edit as the main account
+    assert 'upload' in site.rights
+    anonymous = Site(server.host, path='/', scheme='http')
+    assert not anonymous.logged_in
+
+
+def test_edit_and_query(server, site):
+    server.wiki.add_page('Apples', '#REDIRECT [[Apple]]')
+    page = site.pages['Apple']
+    assert not page.exists
+    result = page.save(text='An apple.', summary='test')
+    assert result['result'] == 'Success'
+    redirect = site.pages['apples']  # normalized
+    assert redirect.name == 'Apples' and redirect.redirect
+    page = redirect.resolve_redirect()
+    assert page.name == 'Apple'
+    assert page.text() == 'An apple.'
+    assert page.save(text='An apple.')['nochange'] == ''
+
+
+def test_edit_conflict(server, site):
+    page = site.pages['Apple']
+    page.save(text='An apple.')
+    page = site.pages['Apple']
+    page.text()  # records the base timestamp
+    page.last_rev_time = (2000, 1, 1, 0, 0, 0, 0, 0, 0)
+    server.wiki.add_page('Apple', 'Someone else was here.')
+    with pytest.raises(EditError):
+        page.save(text='An apple.')
+
+
+def test_upload_and_imageinfo(server, site):
+    data = png_bytes((255, 0, 0, 255))
+    site.upload(file=BytesIO(data), filename='apple.png', description='An apple.', ignore=True)
+    image = site.images['Apple.png']
+    assert image.exists
+    assert image.imageinfo['size'] == len(data)
+    assert image.imageinfo['width'] == 16
+    assert image.download() == data
+
+
+def test_rate_limit(server, site):
+    server.wiki.edit_limit = 2
+    site.pages['Apple'].save(text='1')
+    site.pages['Apple'].save(text='2')
+    with pytest.raises(APIError) as err:
+        site.pages['Apple'].save(text='3')
+    assert err.value.code == 'ratelimited'
+
+
+def test_recent_changes(server, site):
+    site.pages['Apple'].save(text='An apple.')
+    server.wiki.add_file('Apple.png', png_bytes((0, 255, 0, 255)))
+    changes = list(site.recentchanges(dir='newer', prop='title|loginfo', type='edit|new|log'))
+    assert [change['title'] for change in changes] == ['Apple', 'File:Apple.png']
+    assert changes[0]['type'] == 'new'
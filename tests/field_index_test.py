@@ -0,0 +1,80 @@
+"""pytest unit tests for field_index.py."""
+from object_model_test import make_model, FakeObject
+
+from qbe.field_index import FieldIndex
+from qbe.index_builder import IndexBuilder
+from qbe.search_filter import QudObjFilterModel
+
+
+class FieldObject(FakeObject):
+    """A FakeObject with some wiki template fields, counting how often they are worked out."""
+    def __init__(self, name: str, parent=None, **fields):
+        super().__init__(name, parent)
+        self.fields = fields
+        self.lookups = 0
+
+    def __getattr__(self, field):
+        if field.startswith('_') or field == 'fields':
+            raise AttributeError(field)
+        self.lookups += 1
+        return self.fields.get(field)
+
+
+def test_field_index():
+    root = FieldObject('Object')
+    dagger = FieldObject('Dagger', root, tier=1, pv=2)
+    sword = FieldObject('Sword', root, tier=3, pv=2, twohanded=False)
+    FieldObject('Bones', root, tier=3)
+    index = FieldIndex(['tier', 'pv', 'twohanded'], '2.0.0')
+    for qud_object in root.descendants:
+        index.add(qud_object)
+    index.add(root)  # not wiki-eligible, so has no fields
+    assert index.is_current(['tier', 'pv', 'twohanded'], '2.0.0')
+    assert not index.is_current(['tier', 'pv'], '2.0.0')
+    assert not index.is_current(['tier', 'pv', 'twohanded'], '2.0.1')
+    assert index.covers('pv') and not index.covers('hp')
+    assert set(index.objects_with('tier')) == {'Dagger', 'Sword', 'Bones'}
+    assert set(index.objects_with('twohanded')) == {'Sword'}
+    assert index.objects_with('tier', '3') == {'Sword', 'Bones'}
+    assert index.objects_with('twohanded', 'False') == {'Sword'}
+    assert index.objects_with('tier', '9') == set()
+    assert dagger.lookups == sword.lookups == 3  # each field was only worked out once
+
+    # image fields aren't indexed, so no tiles are rendered to index them
+    index = FieldIndex(['tier', 'image', 'overrideimages'], '2.0.0')
+    dagger.lookups = 0
+    index.add(dagger)
+    assert dagger.lookups == 1 and index.columns == {'tier': {'Dagger': '1'}}
+    assert index.covers('tier') and not index.covers('image')
+
+
+def test_builder_and_filter():
+    app, model, *_ = make_model()
+    root = FieldObject('Object')
+    weapon = FieldObject('Weapon', root)
+    FieldObject('Sword', weapon, tier=3)
+    FieldObject('Dagger', weapon, tier=1)
+    FieldObject('Bones', root)
+    model.set_root(root)
+    builder = IndexBuilder(FieldIndex(['tier'], '2.0.0'), root.descendants)
+    built = []
+    builder.signals.built.connect(built.append)
+    builder.run()
+    assert built == [builder.index]
+    proxy = QudObjFilterModel()
+    proxy.setSourceModel(model)
+    for field_index in None, builder.index:
+        proxy.field_index = field_index
+        for qud_object in root.descendants:
+            qud_object.lookups = 0
+        assert [proxy.search_index.objects[node].name
+                for node in proxy.set_query('hasfield:tier')] == ['Sword', 'Dagger']
+        assert [proxy.search_index.objects[node].name
+                for node in proxy.set_query('hasfield:tier=1')] == ['Dagger']
+        # with the index, no fields are worked out again
+        assert any(qud_object.lookups for qud_object in root.descendants) == (field_index is None)
+    cancelled = IndexBuilder(FieldIndex(['tier'], '2.0.0'), root.descendants)
+    cancelled.signals.built.connect(built.append)
+    cancelled.cancel()
+    cancelled.run()
+    assert len(built) == 1
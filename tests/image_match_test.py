@@ -0,0 +1,52 @@
+"""pytest unit tests for image_match.py."""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from qbe.image_match import frame_digests, gifs_match, images_match, normalized_pixels
+
+
+def tile(background=(0, 0, 0, 0)) -> Image.Image:
+    image = Image.new('RGBA', (160, 240), background)
+    image.paste((200, 50, 50, 255), (40, 60, 120, 180))
+    return image
+
+
+def test_images_match():
+    assert images_match(tile(), tile())
+    # the color of fully transparent pixels doesn't matter, but partial transparency does
+    assert images_match(tile(), tile((255, 255, 255, 0)))
+    assert not images_match(tile(), tile((255, 255, 255, 1)))
+    changed = tile()
+    changed.putpixel((80, 120), (200, 50, 51, 255))
+    assert not images_match(tile(), changed)
+    assert not images_match(tile(), tile().crop((0, 0, 160, 239)))
+    with pytest.raises(ValueError):
+        normalized_pixels(tile().convert('RGB'))
+
+
+def animation(colors) -> Image.Image:
+    frames = []
+    for color in colors:
+        frame = tile()
+        frame.paste(color, (60, 90, 100, 150))
+        frames.append(frame)
+    data = BytesIO()
+    frames[0].save(data, format='GIF', save_all=True, append_images=frames[1:], duration=100,
+                   loop=0, disposal=2)
+    return Image.open(data)
+
+
+def test_gifs_match():
+    colors = [(255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255)]
+    ours = animation(colors)
+    assert gifs_match(animation(colors), ours)
+    assert len(frame_digests(ours)) == 3
+    assert frame_digests(ours) is frame_digests(ours)  # cached
+    assert not gifs_match(animation(colors[:2] + [(0, 0, 254, 255)]), ours)
+    assert not gifs_match(animation(colors[:2]), ours)
+    # stops decoding at the first frame that differs
+    different = animation([(255, 0, 1, 255)] + colors[1:])
+    assert not gifs_match(different, ours)
+    assert different.tell() == 0
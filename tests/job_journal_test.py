@@ -0,0 +1,64 @@
+"""pytest unit tests for job_journal.py."""
+import pytest
+
+from qbe.job_journal import JobJournal
+from qbe.jobs import Job
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'journal.sqlite')
+
+
+def test_record_and_resume(journal_path):
+    journal = JobJournal(journal_path)
+    entry = journal.start('Scanning wiki', '2.0.1', ['Apple', 'Banana', 'Cherry'])
+    entry.record('Apple', True, ['✅', '❌'])
+    entry.record('Banana', False)
+    # as if QBE was restarted
+    journal = JobJournal(journal_path)
+    assert journal.unfinished('Scanning wiki', '2.0.0') is None
+    entry = journal.unfinished('Scanning wiki', '2.0.1')
+    assert entry.items() == [('Apple', 'done', ['✅', '❌']), ('Banana', 'failed', None),
+                             ('Cherry', 'pending', None)]
+    entry.complete()
+    assert journal.unfinished('Scanning wiki', '2.0.1') is None
+
+
+def test_latest_job(journal_path):
+    journal = JobJournal(journal_path)
+    journal.start('Uploading tiles', '2.0.1', ['Apple'])
+    latest = journal.start('Uploading tiles', '2.0.1', ['Banana'])
+    assert journal.unfinished('Uploading tiles', '2.0.1').job_id == latest.job_id
+    assert journal.unfinished('Uploading templates', '2.0.1') is None
+
+
+def test_finished_job(journal_path):
+    journal = JobJournal(journal_path)
+    entry = journal.start('Scanning wiki', '2.0.1', ['Apple', 'Banana'])
+    entry.record('Apple', True)
+    entry.record('Banana', True)
+    # every object is done, though the journal wasn't completed (say QBE crashed just then)
+    assert journal.unfinished('Scanning wiki', '2.0.1') is None
+    earlier = journal.start('Scanning wiki', '2.0.1', ['Cherry'])
+    journal.start('Scanning wiki', '2.0.1', ['Apple']).record('Apple', True)
+    assert journal.unfinished('Scanning wiki', '2.0.1').job_id == earlier.job_id
+
+
+def fail_on_banana(name):
+    if name == 'Banana':
+        raise ValueError(name)
+    return name.lower()
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_job_records_items(journal_path, workers):
+    journal = JobJournal(journal_path)
+    entry = journal.start('Uploading templates', '2.0.1', ['Apple', 'Banana', 'Cherry'])
+    Job('Uploading templates', ['Apple', 'Banana', 'Cherry'], fail_on_banana, workers=workers,
+        journal=entry).run()
+    assert entry.items() == [('Apple', 'done', 'apple'), ('Banana', 'failed', None),
+                             ('Cherry', 'done', 'cherry')]
+    # resuming with just the object that failed finishes the job
+    Job('Uploading templates', ['Banana'], str.lower, journal=entry).run()
+    assert journal.unfinished('Uploading templates', '2.0.1') is None
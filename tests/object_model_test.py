@@ -0,0 +1,97 @@
+"""pytest unit tests for object_model.py."""
+from anytree import NodeMixin
+from PIL import Image
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QIcon
+from PySide6.QtTest import QAbstractItemModelTester
+from PySide6.QtWidgets import QApplication
+
+from qbe.object_model import ICON_COLUMN, OBJECT_ROLE, QudObjectModel
+
+LABELS = ['Object Name', 'Display Name', 'Wiki Title Override', 'Article?', 'Article matches?',
+          'Image?', 'Image matches?', 'Extra images?', 'Extra images match?', 'Namespace']
+
+
+class FakeTile:
+    hasproblems = False
+    image = Image.new('RGBA', (16, 24), (200, 50, 50, 255))
+
+
+class FakeObject(NodeMixin):
+    """Stands in for a QudObjectWiki, counting how often its tile is rendered."""
+    def __init__(self, name: str, parent=None, tile=None):
+        self.name = name
+        self.displayname = name.lower()
+        self.parent = parent
+        self.renders = 0
+        self._tile = tile
+
+    @property
+    def tile(self):
+        self.renders += 1
+        return self._tile
+
+    def is_wiki_eligible(self) -> bool:
+        return self.is_leaf
+
+    def wiki_namespace(self) -> str:
+        return ''
+
+
+def make_model():
+    app = QApplication.instance() or QApplication([])
+    root = FakeObject('Object')
+    item = FakeObject('Item', root)
+    sword = FakeObject('Sword', item, FakeTile())
+    FakeObject('Widget', root)
+    model = QudObjectModel(LABELS)
+    QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Fatal, model)
+    model.set_root(root)
+    return app, model, root, sword
+
+
+def test_model():
+    app, model, root, sword = make_model()
+    assert model.rowCount() == 1
+    root_index = model.index(0, 0)
+    assert root_index.data() == 'Object' and root_index.data(OBJECT_ROLE) is root
+    assert [model.index(row, 0, root_index).data() for row in range(2)] == ['Item', 'Widget']
+    sword_index = model.index_of(sword)
+    assert sword_index.parent().parent() == root_index
+    assert sword_index.siblingAtColumn(1).data() == 'sword'
+    assert sword_index.data(Qt.FontRole).bold()
+    assert root_index.data(Qt.ForegroundRole) is not None  # greyed out, not wiki eligible
+    # status columns
+    cell = model.index_of(sword, 5)
+    assert cell.data() == ''
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append(first))
+    assert model.setData(cell, '⮿')
+    assert cell.data() == '⮿' and cell.data(Qt.ForegroundRole) is not None
+    assert model.setData(model.index_of(sword, 3), '✅')
+    assert [model.status(sword, column) for column in range(3, 9)] == ['✅', '', '⮿', '', '', '']
+    assert changed == [cell, model.index_of(sword, 3)]
+    assert not model.setData(model.index_of(sword, 2), '✅')
+
+
+def test_lazy_icons():
+    app, model, root, sword = make_model()
+    # nothing is rendered until a view asks for an icon
+    assert sword.renders == 0
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append(first.data()))
+    sword_icon = model.index_of(sword, ICON_COLUMN)
+    assert isinstance(sword_icon.data(Qt.DecorationRole), QIcon)
+    sword_icon.data(Qt.DecorationRole)  # asked again before the render finishes
+    model.index(0, ICON_COLUMN).data(Qt.DecorationRole)
+    for _ in range(100):
+        model._pool.waitForDone()
+        app.processEvents()
+        if len(changed) == 2:
+            break
+    assert sorted(changed) == ['object', 'sword']
+    assert sword.renders == 1 and root.renders == 1
+    icon = sword_icon.data(Qt.DecorationRole)
+    assert icon.pixmap(16, 24).toImage().pixelColor(8, 12).red() == 200
+    assert model.index(0, ICON_COLUMN).data(Qt.DecorationRole) is not icon
+    assert model.index(0, 0).data(Qt.DecorationRole) is None
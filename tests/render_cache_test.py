@@ -0,0 +1,62 @@
+"""pytest unit tests for render_cache.py."""
+from PIL import Image
+
+from qbe.render_cache import RenderCache
+
+
+class FakeTile:
+    """Stands in for a hagadias QudTile, counting how often its big image is rendered."""
+    filename = 'Creatures/sw_snapjaw.bmp'
+    colorstring = '&w'
+    raw_tilecolor = None
+    raw_detailcolor = 'W'
+    raw_transparent = 'transparent'
+
+    def __init__(self, color=(200, 50, 50, 255)):
+        self.color = color
+        self.renders = 0
+
+    def get_big_image(self) -> Image.Image:
+        self.renders += 1
+        return Image.new('RGBA', (160, 240), self.color)
+
+
+class FakeObject:
+    def __init__(self, name: str):
+        self.name = name
+
+
+def test_render_cache(tmp_path):
+    path = str(tmp_path / 'render_cache.sqlite')
+    tile = FakeTile()
+    snapjaw = FakeObject('Snapjaw')
+    encoded = RenderCache(path).big_tile(snapjaw, tile, '2.0.1')
+    assert tile.renders == 1
+    # a new cache (as after a restart) finds the render on disk
+    cache = RenderCache(path)
+    cached = cache.big_tile(snapjaw, tile, '2.0.1')
+    assert tile.renders == 1
+    assert cached.data == encoded.data
+    assert cached.image.mode == 'RGBA' and cached.image.size == (160, 240)
+    assert cache.big_tile(snapjaw, tile, '2.0.1') is cached  # from memory
+    # anything that goes into the render is part of its key
+    cache.big_tile(snapjaw, tile, '2.0.2')
+    cache.big_tile(FakeObject('Snapjaw hunter'), tile, '2.0.1')
+    cache.big_tile(snapjaw, tile, '2.0.1', index=1)
+    assert tile.renders == 4
+
+
+def test_eviction(tmp_path):
+    cache = RenderCache(str(tmp_path / 'render_cache.sqlite'), memory_items=1)
+    tiles = [FakeTile((value, 0, 0, 255)) for value in range(3)]
+    for index, tile in enumerate(tiles):
+        cache.big_tile(FakeObject(f'Object {index}'), tile, '2.0.1')
+    size = cache.big_tile(FakeObject('Object 2'), tiles[2], '2.0.1').data.nbytes
+    cache.max_bytes = size * 2
+    # identical renders share their stored data
+    cache.big_tile(FakeObject('Object 3'), FakeTile((2, 0, 0, 255)), '2.0.1')
+    # the least recently used render (Object 0) is evicted to make room
+    cache.big_tile(FakeObject('Object 1'), tiles[1], '2.0.1')
+    cache.big_tile(FakeObject('Object 4'), FakeTile((4, 0, 0, 255)), '2.0.1')
+    cache.big_tile(FakeObject('Object 0'), tiles[0], '2.0.1')
+    assert [tile.renders for tile in tiles] == [2, 1, 1]
@@ -0,0 +1,103 @@
+"""pytest unit tests for search_filter.py."""
+from object_model_test import LABELS, make_model
+
+from PySide6.QtTest import QTest
+from PySide6.QtWidgets import QLineEdit
+
+from qbe.object_model import OBJECT_ROLE
+from qbe.search_filter import QudObjFilterModel, QudSearchBehaviorHandler
+from qbe.tree_view import QudTreeView
+
+
+def make_handler():
+    app, model, root, sword = make_model()
+    sword.displayname = 'long sword'
+    proxy = QudObjFilterModel()
+    proxy.setSourceModel(model)
+    tree_view = QudTreeView(lambda indices: None, LABELS)
+    tree_view.setModel(proxy)
+    handler = QudSearchBehaviorHandler(QLineEdit(), proxy, tree_view)
+    handler.search_edit.textChanged.connect(handler.search_changed)
+    return app, proxy, tree_view, handler
+
+
+def selected(tree_view) -> str:
+    return tree_view.selectedIndexes()[0].data()
+
+
+def wait_for_search(handler):
+    for _ in range(100):
+        if handler.current_search is None and not handler.search_timer.isActive():
+            return
+        QTest.qWait(20)
+    raise TimeoutError('search not finished')
+
+
+def test_query_matches_refines():
+    app, proxy, tree_view, handler = make_handler()
+    assert proxy.set_query('swor') == [2]
+    assert proxy.query_matches('sword', ('swor', proxy.matches)) == [2]
+    assert proxy.query_matches('object', ('swor', proxy.matches)) == [0]  # not a refinement
+    # narrowed down from the earlier matches only, which here are wrong on purpose
+    assert proxy.query_matches('sword', ('swor', [3])) == []
+    assert proxy.query_matches('sword', ('hasfield:tier', [3])) == [2]
+    assert proxy.plain_text('"Long Sword"') == 'long sword'
+    assert proxy.plain_text('NOT sword') is None
+
+
+def test_search_as_you_type():
+    app, proxy, tree_view, handler = make_handler()
+    handler.search_edit.setText('wor')  # too short to search
+    assert not handler.search_timer.isActive() and proxy.query == ''
+    for text in 'word', 'words', 'wor', 'sword':
+        handler.search_edit.setText(text)
+    # only the last text is searched for, once typing pauses
+    assert proxy.query == '' and handler.search_timer.isActive()
+    wait_for_search(handler)
+    assert proxy.query == 'sword' and proxy.matches == [2]
+    assert selected(tree_view) == 'Sword'
+
+
+def test_forced_search_and_next_match():
+    app, proxy, tree_view, handler = make_handler()
+    handler.search_edit.setText('t')
+    handler.search_changed_forced()  # searches without waiting, though the text is short
+    wait_for_search(handler)
+    assert proxy.matches == [0, 1, 3] and selected(tree_view) == 'Object'
+    evaluated = []
+    proxy.evaluate_query = lambda query: evaluated.append(query)
+    for name in 'Item', 'Widget', 'Object':
+        handler.search_changed_forced()
+        assert selected(tree_view) == name
+    assert evaluated == []  # walked the matches without searching again
+    handler.search_edit.setText('nothing')
+    handler.search_changed_forced()
+    handler.clear_search_filter(True)  # cancels the search
+    QTest.qWait(50)
+    assert proxy.query == '' and proxy.rowCount(proxy.index(0, 0)) == 2
+
+
+def test_search_uses_captured_index():
+    app, proxy, tree_view, handler = make_handler()
+    search_index = proxy.search_index
+    proxy.sourceModel().set_root(proxy.sourceModel().index(0, 0).data(OBJECT_ROLE))
+    # as if the tree changed while a search was running: the captured index is searched, and
+    # the index isn't built again (from the model) by the search
+    assert proxy.filter_for('sword', None, search_index) == ([2], {0, 1, 2})
+    assert proxy._search_index is None
+    # and the results are dropped, since they are for the old index
+    handler.search_finished(handler._generation, 'sword', search_index, [2], {0, 1, 2})
+    assert proxy.query == '' and proxy.matches == []
+
+
+def test_unindexed_field_search():
+    app, proxy, tree_view, handler = make_handler()
+    for qud_object in proxy.search_index.objects:
+        qud_object.tier = '3' if qud_object.name == 'Widget' else None
+    # no field index yet, so the objects' fields are looked up, in the background like any search
+    handler.search_edit.setText('tier=3')
+    assert handler.search_timer.isActive()
+    handler.start_search()
+    assert handler.current_search is not None
+    wait_for_search(handler)
+    assert proxy.matches == [3] and selected(tree_view) == 'Widget'
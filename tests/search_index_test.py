@@ -0,0 +1,60 @@
+"""pytest unit tests for search_index.py."""
+from object_model_test import make_model, FakeObject
+
+from qbe.object_model import OBJECT_ROLE
+from qbe.search_filter import QudObjFilterModel
+from qbe.search_index import SearchIndex
+
+
+def make_index():
+    app, model, root, sword = make_model()
+    sword.displayname = 'long blade'
+    index = SearchIndex.from_model(model,
+                                   lambda idx: [idx.data(), idx.data(OBJECT_ROLE).displayname])
+    return app, model, index
+
+
+def test_find():
+    app, model, index = make_index()
+    assert len(index) == 4
+    assert [index.objects[node].name for node in range(4)] == ['Object', 'Item', 'Sword', 'Widget']
+    assert index.find('sword') == [2]
+    assert index.find('blade') == [2]
+    assert index.find('e') == [0, 1, 2, 3]  # Sword only once, though both its texts match
+    assert index.find('t') == [0, 1, 3]
+    assert index.find('dblade') == []  # doesn't match across the texts of a row
+    assert index.find('') == []
+
+
+def test_refine():
+    app, model, index = make_index()
+    assert index.node_text(2) == 'sword\nlong blade' and index.node_text(1) == 'item\nitem'
+    assert index.refine(index.find('e'), 'blade') == index.find('blade') == [2]
+    assert index.refine([0, 3], 'swo') == []  # only the given nodes are searched
+
+
+def test_closure_and_model_index():
+    app, model, index = make_index()
+    assert index.closure(index.find('sword')) == {0, 1, 2}
+    assert index.closure([]) == set()
+    assert index.model_index(model, 2).data() == 'Sword'
+    assert index.node_of[(0, 0, index.model_index(model, 1).internalId())] == 2
+
+
+def test_filter_model():
+    app, model, index = make_index()
+    proxy = QudObjFilterModel()
+    proxy.setSourceModel(model)
+    assert proxy.rowCount(proxy.index(0, 0)) == 2
+    assert proxy.set_query('blade') == [2]
+    root = proxy.index(0, 0)
+    assert proxy.rowCount(root) == 1
+    item = proxy.index(0, 0, root)
+    assert item.data() == 'Item' and proxy.index(0, 0, item).data() == 'Sword'
+    assert proxy.node_at(proxy.mapToSource(proxy.index(0, 0, item))) == 2
+    assert proxy.set_query('nothing') == [] and proxy.rowCount() == 0
+    proxy.set_query('')
+    assert proxy.rowCount(proxy.index(0, 0)) == 2
+    # the index is built again once the tree changes
+    model.set_root(FakeObject('Blade'))
+    assert proxy.set_query('blade') == [0]
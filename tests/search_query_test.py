@@ -0,0 +1,87 @@
+"""pytest unit tests for search_query.py."""
+import pytest
+from object_model_test import make_model, FakeObject
+
+from qbe.blueprint_index import BlueprintIndex
+from qbe.field_index import FieldIndex
+from qbe.search_filter import QudObjFilterModel
+from qbe.search_query import QueryError, compile_query, tokenize
+
+
+class QueryObject(FakeObject):
+    """A FakeObject with wiki template fields and resolved parts."""
+    def __init__(self, name: str, parent=None, parts=None, **fields):
+        super().__init__(name, parent)
+        self.fields = fields
+        self.all_attributes = {'part': parts or {}}
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('fields', 'all_attributes'):
+            raise AttributeError(attr)
+        if attr.startswith('part_'):
+            name, _, attribute = attr[5:].partition('_')
+            part = self.all_attributes['part'].get(name)
+            return part.get(attribute) if part is not None and attribute else part
+        return self.fields.get(attr)
+
+
+def make_proxy():
+    app, model, *_ = make_model()
+    root = QueryObject('Object')
+    item = QueryObject('Item', root)
+    weapon = QueryObject('MeleeWeapon', item)
+    QueryObject('Dagger', weapon, {'Physics': {}}, tier='1', hp='10', image='dagger.png')
+    QueryObject('Long Sword', weapon, {'Physics': {}}, tier='8', hp='60')
+    QueryObject('Boulder', item, {'Physics': {'Takeable': 'false'}}, tier='8', hp='500')
+    QueryObject('Slug:Lead', item)
+    creature = QueryObject('Creature', root)
+    QueryObject('Snapjaw', creature, tier='2', hp='50', image='snapjaw.png')
+    model.set_root(root)
+    proxy = QudObjFilterModel()
+    proxy.setSourceModel(model)
+    return app, model, proxy
+
+
+def names(proxy, query: str) -> list:
+    return [proxy.search_index.objects[node].name for node in proxy.query_matches(query)]
+
+
+def test_parse():
+    assert tokenize('(a OR "b c") NOT d') == [('(', '('), ('word', 'a'), ('OR', 'OR'),
+                                              ('phrase', 'b c'), (')', ')'), ('NOT', 'NOT'),
+                                              ('word', 'd')]
+    assert compile_query('long sword').text == 'long sword'  # plain words are one phrase
+    for query in ('(tier=8', 'tier=8)', 'OR tier=8', 'tier=8 AND', 'NOT', 'hp>=many',
+                  'tier:x..3', '()', '', 'teir>=5', 'hp=>50', 'x:y', 'sword Tier:3..5x'):
+        with pytest.raises(QueryError):
+            compile_query(query)
+
+
+def test_queries():
+    app, model, proxy = make_proxy()
+    for field_index, blueprint_index in (None, None), (FieldIndex(['tier', 'hp', 'image'], '1'),
+                                                       BlueprintIndex()):
+        if field_index is not None:
+            for qud_object in proxy.search_index.objects:
+                field_index.add(qud_object)
+                blueprint_index.add(qud_object)
+        proxy.field_index, proxy.blueprint_index = field_index, blueprint_index
+        assert names(proxy, 'long sword') == ['Long Sword']
+        assert names(proxy, 'sword OR snap') == ['Long Sword', 'Snapjaw']
+        assert names(proxy, 'hasfield:image') == ['Dagger', 'Snapjaw']
+        assert names(proxy, 'hasfield:TIER=8') == ['Long Sword', 'Boulder']
+        assert names(proxy, 'hp>=50') == ['Long Sword', 'Boulder', 'Snapjaw']
+        assert names(proxy, 'hp<50 OR hp>100') == ['Dagger', 'Boulder']
+        assert names(proxy, 'tier:2..8 hp!=500') == ['Long Sword', 'Snapjaw']
+        assert names(proxy, 'tier:..1') == ['Dagger']
+        assert names(proxy, 'tier:8') == ['Long Sword', 'Boulder']
+        assert names(proxy, 'inherits:MeleeWeapon') == ['MeleeWeapon', 'Dagger', 'Long Sword']
+        assert names(proxy, 'inherits:Nothing') == []
+        assert names(proxy, 'haspart:Physics_Takeable=FALSE') == ['Boulder']
+        # tier 8 takeable items without a wiki tile
+        assert names(proxy, 'inherits:Item tier=8 NOT haspart:Physics_Takeable=false '
+                            'AND NOT hasfield:image') == ['Long Sword']
+        assert names(proxy, 'NOT (inherits:Item OR inherits:Creature)') == ['Object']
+        assert names(proxy, '(tier=8') == []  # not a valid query, so searched for as text
+        assert names(proxy, 'teir>=5') == []  # misspelled field, searched for as text
+        assert names(proxy, 'slug:lead') == ['Slug:Lead']  # not a field, so plain text
@@ -0,0 +1,55 @@
+"""pytest unit tests for throttle.py."""
+from time import monotonic
+
+import pytest
+
+from qbe.throttle import AdaptiveThrottle, TokenBucket
+
+
+def test_token_bucket_burst():
+    bucket = TokenBucket(rate=1, capacity=3)
+    start = monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert monotonic() - start < 0.5  # a full bucket doesn't wait
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(rate=20)
+    bucket.acquire()
+    start = monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert monotonic() - start >= 0.15  # 4 tokens at 20/second take at least 0.2 seconds
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_adaptive_throttle_pauses_everyone():
+    throttle = AdaptiveThrottle(rate=100, base_delay=0.2)
+    delay = throttle.throttled()
+    assert 0.1 <= delay <= 0.2  # jittered between half and all of the base delay
+    start = monotonic()
+    throttle.wait()  # readers wait out the pause too
+    assert monotonic() - start >= 0.05
+
+
+def test_adaptive_throttle_retry_after():
+    throttle = AdaptiveThrottle(rate=100, base_delay=0.01)
+    assert throttle.throttled(retry_after=0.3) == 0.3
+
+
+def test_adaptive_throttle_rate():
+    throttle = AdaptiveThrottle(rate=10, base_delay=0.1)
+    throttle.throttled()
+    assert throttle.rate == 5
+    throttle.throttled()  # refused during the same pause, so sent before it
+    assert throttle.rate == 5
+    throttle.succeeded()
+    assert throttle.rate == 6
+    for _ in range(10):
+        throttle.succeeded()
+    assert throttle.rate == 10
@@ -0,0 +1,78 @@
+"""pytest unit tests for wiki_mirror.py."""
+import pytest
+
+from qbe.wiki_mirror import WikiMirror
+
+
+class FakeSite:
+    """Just enough of an mwclient Site to sync a mirror against."""
+    host = 'wiki.example.com'
+    path = '/'
+
+    def __init__(self, changes=()):
+        self.changes = list(changes)
+        self.requests = 0
+
+    def recentchanges(self, **kwargs):
+        self.requests += 1
+        return iter(self.changes)
+
+
+def page_info(title, revid=1):
+    return {'title': title, 'pageid': revid,
+            'revisions': [{'revid': revid, 'timestamp': '2026-01-01T00:00:00Z',
+                           'sha1': 'abc', 'slots': {'main': {'*': 'wikitext'}}}]}
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return WikiMirror(str(tmp_path / 'mirror.sqlite'))
+
+
+def test_put_get(mirror):
+    assert mirror.get('Apple') is None
+    mirror.put('Apple', page_info('Apple', 42), 'wikitext')
+    info, text = mirror.get('Apple')
+    assert text == 'wikitext'
+    assert info['revisions'][0]['revid'] == 42
+    assert 'slots' not in info['revisions'][0]  # content isn't stored twice
+
+
+def test_forget_redirect(mirror):
+    mirror.put('Apples', page_info('Apple'), 'wikitext')
+    mirror.forget(['Apple'])
+    assert mirror.get('Apples') is None
+
+
+def test_sync_drops_changed_pages(mirror):
+    site = FakeSite()
+    mirror.sync(site)  # first sync: nothing to drop
+    mirror.put('Apple', page_info('Apple'), 'wikitext')
+    mirror.put('Banana', page_info('Banana'), 'wikitext')
+    mirror.put('Old cherry', page_info('Old cherry'), 'wikitext')
+    site.changes = [{'type': 'edit', 'title': 'Apple', 'revid': 2},
+                    {'type': 'edit', 'title': 'Banana', 'revid': 1},
+                    {'type': 'log', 'title': 'Cherry', 'logparams': {'target_title': 'Old cherry'}}]
+    mirror.sync(site, force=True)
+    assert mirror.get('Apple') is None
+    assert mirror.get('Banana') is not None  # the stored revision already has that edit
+    assert mirror.is_current('Banana', 1) and not mirror.is_current('Banana', 2)
+    assert mirror.get('Old cherry') is None
+    mirror.sync(site)
+    assert site.requests == 1  # the last sync came too soon after the one before to ask the wiki
+
+
+def test_sync_other_wiki(mirror):
+    mirror.sync(FakeSite())
+    mirror.put('Apple', page_info('Apple'), 'wikitext')
+    other_site = FakeSite()
+    other_site.host = 'localhost'
+    mirror.sync(other_site, force=True)
+    assert mirror.get('Apple') is None
+
+
+def test_template_ledger(mirror):
+    assert mirror.template_fingerprints('Apple', 1) is None
+    mirror.record_template('Apple', 1, 'content', 'exact')
+    assert mirror.template_fingerprints('Apple', 1) == ('content', 'exact')
+    assert mirror.template_fingerprints('Apple', 2) is None  # the article has been edited since
@@ -0,0 +1,45 @@
+"""pytest unit tests for wikitext.py."""
+from qbe.wikitext import find_template
+
+TEMPLATE = '{{Item\n| title = {{Qud text|&Ysword}}\n| gameversion = 2.0.1\n}}'
+MARKED = 'Intro.\n<!-- START QBE: please leave this marker. -->\n{{As Of Patch|2.0.1}}\n' \
+         + TEMPLATE + '\n[[Category:Swords]]\n<!-- END QBE -->\n{{Navbox\n| swords\n}}\n'
+
+
+def test_marked():
+    region = find_template(MARKED)
+    assert region.has_markers
+    assert region.template(MARKED) == TEMPLATE
+    assert MARKED[region.start:].startswith('<!-- START QBE')
+    assert MARKED[:region.end].endswith('<!-- END QBE -->')
+    assert MARKED[region.patch_start:region.patch_end] == '{{As Of Patch|2.0.1}}'
+    assert find_template(MARKED, require_markers=True) == region
+
+
+def test_unmarked():
+    text = 'Intro.\n<!-- old comment -->\n' + TEMPLATE + '\n\nProse.\n{{Navbox\n| swords\n}}\n'
+    region = find_template(text)
+    assert not region.has_markers
+    assert region.patch_start is None
+    # later templates in the article are not part of the template, even at the start of a line
+    assert region.template(text) == TEMPLATE
+    assert text[:region.start] == 'Intro.\n'
+    assert text[region.end:] == 'Prose.\n{{Navbox\n| swords\n}}\n'
+    assert find_template(text, require_markers=True) is None
+
+
+def test_qbe_template():
+    text = TEMPLATE + '\n'
+    region = find_template(text)
+    assert (region.start, region.end) == (0, len(text))
+    assert region.template(text) == TEMPLATE
+
+
+def test_unrecognized():
+    assert find_template('Just prose, with a {{Navbox}}.') is None
+    assert find_template('<!-- START QBE -->\n{{Item\n| title = unclosed\n') is None
+    # markers with something else between them fall back to the template alone
+    text = '<!-- START QBE -->\nHand-written notes.\n' + TEMPLATE + '\n<!-- END QBE -->'
+    region = find_template(text)
+    assert not region.has_markers
+    assert region.template(text) == TEMPLATE